@@ -0,0 +1,97 @@
+"""
+启动耗时基准
+在全新的子进程中测量：
+  - 导入主窗口模块耗时
+  - 进程启动 -> 主窗口显示 (time-to-window)
+  - 主窗口显示 -> 第一次模板识别完成 (time-to-first-detection)
+用法: python -m benchmarks.bench_startup [--runs 5] [--json]
+(无显示器时自动使用 Qt offscreen 平台)
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 子进程脚本：按阶段打点，最后以 JSON 输出
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, ".")
+from PyQt6.QtWidgets import QApplication
+app = QApplication(sys.argv)
+t_qt = time.perf_counter()
+from gui.main_window import MainWindow
+t_import = time.perf_counter()
+window = MainWindow()
+window.show()
+app.processEvents()
+t_window = time.perf_counter()
+heavy = sorted(m for m in ("cv2", "numpy", "mss", "pydirectinput", "win32gui") if m in sys.modules)
+
+import cv2
+from core.vision import Vision
+from core.frame_source import StaticFrameSource
+vision = Vision(window.cfg)
+screen = cv2.imread("resources/images/templates/cast_icon.png")
+screen = cv2.copyMakeBorder(screen, 200, 200, 300, 300, cv2.BORDER_CONSTANT, value=(40, 40, 40))
+vision.attach_source(StaticFrameSource(screen))
+found = vision.find_template("cast", confidence=0.7, grayscale=True)
+t_detect = time.perf_counter()
+
+print(json.dumps({
+    "qt_init": t_qt - t0,
+    "import_main_window": t_import - t_qt,
+    "window": t_window - t0,
+    "first_detection": t_detect - t_window,
+    "found": bool(found),
+    "heavy_modules_before_window": heavy,
+}))
+"""
+
+
+def run_once():
+    env = dict(os.environ)
+    if sys.platform != "win32" and not env.get("DISPLAY"):
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", CHILD], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    wall = time.perf_counter() - start
+    result = json.loads(out.strip().splitlines()[-1])
+    # 子进程内部打点不含解释器启动时间，这里补上父进程看到的总耗时
+    result["process_to_window"] = wall - result["first_detection"]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动耗时基准")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出")
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    keys = ("qt_init", "import_main_window", "window", "process_to_window", "first_detection")
+    summary = {k: statistics.median(r[k] for r in runs) for k in keys}
+    summary["found"] = all(r["found"] for r in runs)
+    summary["heavy_modules_before_window"] = runs[-1]["heavy_modules_before_window"]
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print(f"启动基准 ({args.runs} 次中位数)")
+    print(f"  Qt 初始化          : {summary['qt_init'] * 1000:8.1f} ms")
+    print(f"  导入主窗口模块     : {summary['import_main_window'] * 1000:8.1f} ms")
+    print(f"  脚本开始 -> 窗口   : {summary['window'] * 1000:8.1f} ms")
+    print(f"  进程启动 -> 窗口   : {summary['process_to_window'] * 1000:8.1f} ms")
+    print(f"  窗口 -> 首次识别   : {summary['first_detection'] * 1000:8.1f} ms (识别成功: {summary['found']})")
+    print(f"  窗口显示前已加载的重量级模块: {summary['heavy_modules_before_window'] or '无'}")
+
+
+if __name__ == "__main__":
+    main()
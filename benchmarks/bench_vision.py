@@ -0,0 +1,281 @@
+"""
+Vision 原语微基准
+在确定性合成画面上计时：
+  - find_template (彩色 / 灰度，全屏 / ROI)
+  - detect_color_rect
+  - play_minigame 单帧处理 (截取 + HSV + 游标识别 + 命中判定)
+  - 主循环一个 tick 的全部状态检测：逐项 probe vs ProbeExecutor (一次截图 + 线程池并行匹配)
+结果以 JSON 输出，并与保存的基线对比，超出容差即以非零退出码失败。
+
+单次耗时在共享机器上波动很大 (同一代码的全屏匹配中位数可相差 30% 以上)，因此对比的不是绝对毫秒数，
+而是相对耗时：每次计时前紧挨着跑一次校准负载 (固定尺寸的 cv2.matchTemplate)，取每对耗时之比的中位数。
+CPU 频率、抢占和机器差异对相邻的两次调用影响大致相同，比值只在代码变化时才明显改变。
+容差按用例设置 (TOLERANCES)，亚毫秒级用例受计时开销影响更大，容差更宽。
+
+用法:
+  python -m benchmarks.bench_vision                       # 运行并与基线对比
+  python -m benchmarks.bench_vision --output result.json  # 另存本次结果
+  python -m benchmarks.bench_vision --update-baseline     # 用本次结果覆盖基线
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks import synthetic
+from core.frame_source import StaticFrameSource
+from core.probe_executor import ProbeExecutor
+from core.vision import PROBE_PRIORITY, Vision
+from utils.config_manager import ConfigManager
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_TOLERANCE = 0.30  # 相对耗时比基线高 30% 以上视为退化
+# 按用例名前缀覆盖默认容差 (最长前缀优先)
+TOLERANCES = {
+    "detect_color_rect.": 0.60,
+    "play_minigame.": 0.60,
+}
+# 校准负载尺寸 (灰度画面 / 模板)
+CALIBRATION_SHAPE = (720, 1280)
+CALIBRATION_TEMPLATE = (64, 64)
+
+
+def measure(fn, repeat, warmup=3):
+    """返回每次调用耗时 (毫秒) 的列表"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t) * 1000.0)
+    return samples
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "median_ms": statistics.median(ordered),
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "min_ms": ordered[0],
+        "runs": len(ordered),
+    }
+
+
+def calibration_task():
+    """校准负载：固定随机画面上的一次模板匹配"""
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, CALIBRATION_SHAPE, dtype=np.uint8)
+    template = image[100:100 + CALIBRATION_TEMPLATE[0], 200:200 + CALIBRATION_TEMPLATE[1]].copy()
+    return lambda: cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED)
+
+
+def measure_relative(fn, reference, repeat, warmup=3):
+    """
+    交替计时 reference 与 fn
+    :return: (fn 每次耗时 (毫秒) 列表, 每对 fn / reference 耗时之比列表)
+    """
+    for _ in range(warmup):
+        reference()
+        fn()
+    samples, ratios = [], []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        reference()
+        ref = time.perf_counter() - t
+        t = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t
+        samples.append(elapsed * 1000.0)
+        ratios.append(elapsed / ref)
+    return samples, ratios
+
+
+def tolerance_for(name, default):
+    """用例的容差：TOLERANCES 中最长的匹配前缀，没有则为 default"""
+    matches = [prefix for prefix in TOLERANCES if name.startswith(prefix)]
+    return TOLERANCES[max(matches, key=len)] if matches else default
+
+
+def near(found, expected, tol=3):
+    return found is not None and abs(found[0] - expected[0]) <= tol and abs(found[1] - expected[1]) <= tol
+
+
+def build_cases(cfg):
+    """构造基准用例: name -> (callable, check_callable)"""
+    settings = cfg.settings
+    screen, expected = synthetic.make_screen(settings.images)
+    vision = Vision(cfg)
+    vision.attach_source(StaticFrameSource(screen))
+
+    bite_roi = settings.roi('bite')
+    msg_roi = settings.roi('msg_tips')
+    game_roi = synthetic.MINIGAME_ROI
+
+    cases = {
+        "find_template.color.full.bite": (
+            lambda: vision.find_template('bite'),
+            lambda r: near(r, expected['bite'])),
+        "find_template.gray.full.cast": (
+            lambda: vision.find_template('cast', confidence=0.7, grayscale=True),
+            lambda r: near(r, expected['cast'])),
+        "find_template.gray.full.result": (
+            lambda: vision.find_template('result', confidence=0.7, grayscale=True),
+            lambda r: near(r, expected['result'])),
+        "find_template.color.roi.bite": (
+            lambda: vision.find_template('bite', region=bite_roi),
+            lambda r: near(r, expected['bite'])),
+        "find_template.gray.roi.full_warning": (
+            lambda: vision.find_template('full_warning', region=msg_roi, confidence=0.75, grayscale=True),
+            lambda r: near(r, expected['full_warning'])),
+        "find_template.color.roi.full_warning": (
+            lambda: vision.find_template('full_warning', region=msg_roi, confidence=0.75),
+            lambda r: near(r, expected['full_warning'])),
+        "detect_color_rect.yellow": (
+            lambda: vision.detect_color_rect(game_roi, 'yellow'),
+            lambda r: len(r) == 1),
+        "detect_color_rect.cursor": (
+            lambda: vision.detect_color_rect(game_roi, 'cursor'),
+            lambda r: len(r) >= 1),
+    }
+
+    # play_minigame 单帧：与 FishingBot.play_minigame 循环体一致
+    y_low, y_high = settings.color_bounds('yellow')
+    c_low, c_high = settings.color_bounds('cursor')
+    monitor = {"left": game_roi[0], "top": game_roi[1], "width": game_roi[2], "height": game_roi[3]}
+
+    def minigame_frame():
+        img_np = np.array(vision.sct.grab(monitor))
+        img_bgr = cv2.cvtColor(img_np, cv2.COLOR_BGRA2BGR)
+        img_hsv = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2HSV)
+        cursor_x, cursor_w = vision.locate_cursor(img_hsv, c_low, c_high)
+        if cursor_x == -1:
+            return None
+        return vision.in_color_zone(img_hsv, cursor_x + cursor_w // 2, y_low, y_high)
+
+    cases["play_minigame.frame"] = (minigame_frame, lambda r: r is True)
+
+    # 空闲 tick 的全部状态检测 (画面中没有任何图标，每一项都要匹配完)
+    idle_screen, _ = synthetic.make_screen(settings.images, keys=[], with_minigame=False)
+    idle = Vision(cfg)
+    idle.attach_source(StaticFrameSource(idle_screen))
+
+    def sequential_tick():
+        for key in PROBE_PRIORITY:
+            found = idle.probe(key, settings)
+            if found:
+                return key, found
+        return None, None
+
+    executor = ProbeExecutor(settings.probe_workers, settings.cv_threads)
+    cases["tick.idle.sequential"] = (sequential_tick, lambda r: r == (None, None))
+    cases["tick.idle.probe_executor"] = (lambda: executor.detect(idle, settings), lambda r: r == (None, None))
+    return cases
+
+
+def machine_info():
+    return {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "cpu_count": os.cpu_count(),
+        "cv_threads": cv2.getNumThreads(),
+    }
+
+
+def run(repeat, only=None):
+    cfg = ConfigManager()
+    reference = calibration_task()
+    results = {}
+    for name, (fn, check) in build_cases(cfg).items():
+        if only and only not in name:
+            continue
+        ok = bool(check(fn()))
+        samples, ratios = measure_relative(fn, reference, repeat)
+        entry = summarize(samples)
+        entry["relative"] = statistics.median(ratios)
+        entry["correct"] = ok
+        results[name] = entry
+    calibration = summarize(measure(reference, repeat))["median_ms"]
+    return {"machine": machine_info(), "calibration_ms": calibration, "results": results}
+
+
+def compare(current, baseline, tolerance):
+    """
+    返回退化/失败列表 [(name, message)]
+    按相对耗时 (用例耗时 / 相邻一次校准负载耗时 的中位数) 对比；没有相对耗时的旧基线不参与对比
+    """
+    problems = []
+    base_results = baseline.get("results", {})
+    for name, entry in current["results"].items():
+        if not entry["correct"]:
+            problems.append((name, "识别结果错误"))
+        base = base_results.get(name)
+        if base is None or "relative" not in base:
+            continue
+        allowed = tolerance_for(name, tolerance)
+        ratio = entry["relative"] / base["relative"]
+        if ratio > 1 + allowed:
+            problems.append((name, f"相对耗时 {entry['relative']:.3f} > 基线 {base['relative']:.3f} "
+                                   f"(+{ratio - 1:.0%}，容差 {allowed:.0%}；{entry['median_ms']:.3f} ms)"))
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vision 原语微基准")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--only", help="只运行名称包含该字符串的用例")
+    parser.add_argument("--output", help="把结果写入 JSON 文件")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    current = run(args.repeat, args.only)
+
+    print(f"{'calibration':40s} median {current['calibration_ms']:8.3f} ms")
+    for name, e in current["results"].items():
+        flag = "" if e["correct"] else "  ❌ 结果错误"
+        print(f"{name:40s} median {e['median_ms']:8.3f} ms   p95 {e['p95_ms']:8.3f} ms   "
+              f"min {e['min_ms']:8.3f} ms   x{e['relative']:8.3f}{flag}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+        print(f"基线已更新: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("未找到基线文件，跳过对比 (使用 --update-baseline 生成)")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("machine", {}).get("platform") != current["machine"]["platform"]:
+        print("⚠️ 基线来自不同的机器/平台，对比结果仅供参考")
+    if "calibration_ms" not in baseline:
+        print("⚠️ 基线没有相对耗时 (旧格式)，只检查识别结果，请用 --update-baseline 重新生成")
+
+    problems = compare(current, baseline, args.tolerance)
+    if problems:
+        print("\n❌ 性能退化 / 结果错误:")
+        for name, msg in problems:
+            print(f"   {name}: {msg}")
+        return 1
+    print(f"\n✅ 全部用例的相对耗时在基线容差以内 (默认 +{args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
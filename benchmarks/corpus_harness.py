@@ -0,0 +1,250 @@
+"""
+标注帧语料回归测试
+语料格式：一个目录，包含若干整屏截图 (PNG) 和 manifest.json：
+{
+  "version": 1,
+  "rois": {"bite": [x, y, w, h], ...},          // 可选：覆盖 settings.json 中的 ROI
+  "frames": [
+    {"file": "0001.png",
+     "expect": {"bite": [1273, 440], "cast": null, ...}}   // 坐标为模板中心；null = 不应检测到
+  ]
+}
+未在 expect 中列出的检测器不参与该帧的统计。
+
+Harness 在多个工作进程中对每帧运行 Vision.probe (与主循环参数一致)，
+统计每个检测器的精确率、召回率、定位误差和每帧耗时，并与基线对比。
+
+用法:
+  python -m benchmarks.corpus_harness make-synthetic corpus_dir --count 40
+  python -m benchmarks.corpus_harness run corpus_dir [--workers 4] [--update-baseline]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+MANIFEST = "manifest.json"
+BASELINE = "baseline.json"
+DETECTORS = ('result', 'pos_error', 'full_warning', 'bite', 'cast')
+LOCATION_TOLERANCE = 8   # 像素：超出视为定位错误 (记 FP + FN)
+DEFAULT_TIME_TOLERANCE = 0.30
+
+
+def load_manifest(corpus_dir):
+    with open(os.path.join(corpus_dir, MANIFEST), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ================= 工作进程 =================
+
+_worker = {}
+
+
+def _init_worker(config_path, roi_overrides):
+    """每个工作进程只加载一次配置和模板"""
+    from core.frame_source import StaticFrameSource
+    from core.vision import Vision
+    from utils.config_manager import ConfigManager
+
+    # 单进程内不再使用 OpenCV 多线程，避免与进程池互相抢占
+    cv2.setNumThreads(1)
+    cfg = ConfigManager(config_path)
+    for name, roi in (roi_overrides or {}).items():
+        cfg.set('rois', name, roi)
+    source = StaticFrameSource()
+    vision = Vision(cfg)
+    vision.attach_source(source)
+    vision.templates  # 预热模板缓存
+    _worker.update(cfg=cfg, vision=vision, source=source)
+
+
+def _evaluate_frame(task):
+    path, detectors = task
+    frame = cv2.imread(path, cv2.IMREAD_COLOR)
+    if frame is None:
+        return path, None
+    source, vision = _worker["source"], _worker["vision"]
+    settings = _worker["cfg"].settings
+    source.set_frame(frame)
+
+    out = {}
+    for key in detectors:
+        start = time.perf_counter()
+        found = vision.probe(key, settings)
+        out[key] = {"found": list(found) if found else None,
+                    "ms": (time.perf_counter() - start) * 1000.0}
+    return path, out
+
+
+# ================= 统计 =================
+
+def score(manifest, outputs):
+    """按检测器汇总 TP / FP / FN、定位误差与耗时"""
+    stats = {k: {"tp": 0, "fp": 0, "fn": 0, "tn": 0, "errors": [], "ms": []} for k in DETECTORS}
+    for entry in manifest["frames"]:
+        result = outputs.get(entry["file"])
+        if result is None:
+            continue
+        for key, expected in entry["expect"].items():
+            if key not in result:
+                continue
+            st = stats[key]
+            found = result[key]["found"]
+            st["ms"].append(result[key]["ms"])
+            if expected is None:
+                st["fp" if found else "tn"] += 1
+            elif found is None:
+                st["fn"] += 1
+            else:
+                err = float(np.hypot(found[0] - expected[0], found[1] - expected[1]))
+                if err <= LOCATION_TOLERANCE:
+                    st["tp"] += 1
+                    st["errors"].append(err)
+                else:
+                    st["fp"] += 1
+                    st["fn"] += 1
+
+    report = {}
+    for key, st in stats.items():
+        if not st["ms"]:
+            continue
+        tp, fp, fn = st["tp"], st["fp"], st["fn"]
+        report[key] = {
+            "frames": len(st["ms"]),
+            "tp": tp, "fp": fp, "fn": fn, "tn": st["tn"],
+            "precision": tp / (tp + fp) if tp + fp else 1.0,
+            "recall": tp / (tp + fn) if tp + fn else 1.0,
+            "mean_location_error_px": float(np.mean(st["errors"])) if st["errors"] else 0.0,
+            "ms_per_frame": float(np.mean(st["ms"])),
+            "p95_ms": float(np.percentile(st["ms"], 95)),
+        }
+    return report
+
+
+def compare(report, baseline, time_tolerance):
+    problems = []
+    for key, cur in report["detectors"].items():
+        base = baseline.get("detectors", {}).get(key)
+        if base is None:
+            continue
+        for metric in ("precision", "recall"):
+            if cur[metric] + 1e-9 < base[metric]:
+                problems.append(f"{key}: {metric} {cur[metric]:.3f} < 基线 {base[metric]:.3f}")
+        if cur["ms_per_frame"] > base["ms_per_frame"] * (1 + time_tolerance):
+            problems.append(f"{key}: {cur['ms_per_frame']:.2f} ms/帧 > 基线 {base['ms_per_frame']:.2f} ms/帧")
+    return problems
+
+
+def run_corpus(corpus_dir, workers=None, config_path="config/settings.json", detectors=DETECTORS):
+    manifest = load_manifest(corpus_dir)
+    tasks = []
+    for entry in manifest["frames"]:
+        keys = tuple(k for k in entry["expect"] if k in detectors)
+        if keys:
+            tasks.append((os.path.join(corpus_dir, entry["file"]), keys))
+
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(config_path, manifest.get("rois"))) as pool:
+        results = list(pool.map(_evaluate_frame, tasks, chunksize=4))
+    wall = time.perf_counter() - start
+
+    outputs = {os.path.relpath(path, corpus_dir).replace(os.sep, "/"): out for path, out in results}
+    missing = [p for p, out in outputs.items() if out is None]
+    return {"frames": len(tasks), "workers": workers, "wall_s": wall,
+            "unreadable": missing, "detectors": score(manifest, outputs)}
+
+
+# ================= 合成语料 =================
+
+def make_synthetic(corpus_dir, count, seed=0):
+    """用 benchmarks.synthetic 生成一份带标注的语料 (每帧随机出现一部分元素)"""
+    from benchmarks import synthetic
+    from utils.config_manager import ConfigManager
+
+    images = ConfigManager().settings.images
+    rng = np.random.default_rng(seed)
+    os.makedirs(corpus_dir, exist_ok=True)
+    frames = []
+    for i in range(count):
+        keys = [k for k in ('result', 'bite', 'cast') if rng.random() < 0.5]
+        message = rng.choice(['full_warning', 'pos_error', None])
+        if message:
+            keys.append(str(message))
+        screen, expected = synthetic.make_screen(images, keys=keys, seed=int(rng.integers(1 << 30)),
+                                                 with_minigame=bool(rng.random() < 0.3))
+        name = f"{i:04d}.png"
+        cv2.imwrite(os.path.join(corpus_dir, name), screen)
+        frames.append({"file": name,
+                       "expect": {k: list(expected[k]) if k in expected else None for k in DETECTORS}})
+    with open(os.path.join(corpus_dir, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "frames": frames}, f, indent=2)
+    print(f"已生成 {count} 帧合成语料: {corpus_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="标注帧语料回归测试")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_run = sub.add_parser("run", help="运行语料并与基线对比")
+    p_run.add_argument("corpus")
+    p_run.add_argument("--workers", type=int)
+    p_run.add_argument("--config", default="config/settings.json")
+    p_run.add_argument("--baseline", help="基线文件 (默认 <语料目录>/baseline.json)")
+    p_run.add_argument("--time-tolerance", type=float, default=DEFAULT_TIME_TOLERANCE)
+    p_run.add_argument("--update-baseline", action="store_true")
+    p_run.add_argument("--json", action="store_true")
+
+    p_make = sub.add_parser("make-synthetic", help="生成合成语料")
+    p_make.add_argument("corpus")
+    p_make.add_argument("--count", type=int, default=40)
+    p_make.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    if args.cmd == "make-synthetic":
+        make_synthetic(args.corpus, args.count, args.seed)
+        return 0
+
+    report = run_corpus(args.corpus, args.workers, args.config)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{report['frames']} 帧, {report['workers']} 进程, 总耗时 {report['wall_s']:.2f}s")
+        print(f"{'detector':14s} {'prec':>6s} {'recall':>6s} {'err px':>7s} {'ms/帧':>8s} {'p95':>8s}  tp/fp/fn/tn")
+        for key, r in report["detectors"].items():
+            print(f"{key:14s} {r['precision']:6.3f} {r['recall']:6.3f} {r['mean_location_error_px']:7.2f} "
+                  f"{r['ms_per_frame']:8.2f} {r['p95_ms']:8.2f}  {r['tp']}/{r['fp']}/{r['fn']}/{r['tn']}")
+    if report["unreadable"]:
+        print(f"❌ 无法读取的帧: {report['unreadable']}")
+        return 1
+
+    baseline_path = args.baseline or os.path.join(args.corpus, BASELINE)
+    if args.update_baseline:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"基线已更新: {baseline_path}")
+        return 0
+    if not os.path.exists(baseline_path):
+        print("未找到基线文件，跳过对比 (使用 --update-baseline 生成)")
+        return 0
+
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    problems = compare(report, baseline, args.time_tolerance)
+    if problems:
+        print("\n❌ 检测退化:")
+        for msg in problems:
+            print(f"   {msg}")
+        return 1
+    print("\n✅ 与基线一致")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
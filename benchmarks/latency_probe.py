@@ -0,0 +1,219 @@
+"""
+端到端反应延迟探测 (画面变化 -> 按键事件)
+MarkerTarget 是一个与 mss 接口兼容的本地靶子：小游戏进度条上的黄色命中区固定不动，
+游标停在区域外，在已知时刻跳进命中区 (标记变化)。真实的 MinigameSession 逐帧识别，
+命中后经 RecordingInputBackend (包装任意输入后端) 发出空格，记录每个环节的时间戳：
+  - frame_wait  标记变化 -> 第一次 "看到" 变化的截图开始 (取决于循环周期 / 轮询间隔)
+  - capture     这次截图的耗时
+  - processing  截图返回 -> 调用 key_down (颜色转换、识别、命中判定)
+  - input       key_down 本身的耗时 (pydirectinput / xdotool / 空实现)
+  - total       标记变化 -> key_down 返回
+输出各阶段的延迟分布，供调整 hit_cooldown、轮询间隔等参数时参考 (--json 输出完整报告)。
+
+--capture mss 时每次截图都会用 mss 真实截取同一块屏幕区域 (小游戏 ROI 的位置与大小，只计时，
+画面仍用靶子)，capture 阶段即为本机真实的截图耗时；需要图形界面。
+
+用法:
+  python -m benchmarks.latency_probe --samples 200
+  python -m benchmarks.latency_probe --samples 200 --json > latency.json
+  python -m benchmarks.latency_probe --capture mss --backend win32   # 注意：会真实发送空格键
+"""
+import argparse
+import datetime
+import json
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks import synthetic
+from core.backends import InputBackend, NullWindowBackend, create_input_backend
+
+STAGES = ("frame_wait", "capture", "processing", "input", "total")
+QUANTILES = (50, 90, 99)
+
+
+class MarkerTarget:
+    """
+    接口与 mss 兼容：grab(monitor) 返回请求区域 (BGRA)
+    标记关闭时游标在黄色区域左侧；到达 change_at 后游标位于黄色区域内，直到收到按键
+    :param gap: 按键后到下一次标记变化的随机间隔 (秒)，应大于 hit_cooldown
+    """
+
+    def __init__(self, roi=synthetic.MINIGAME_ROI, gap=(0.25, 0.4), seed=0, capture=None,
+                 clock=time.perf_counter):
+        self.left, self.top, self.width, self.height = (int(v) for v in roi)
+        self.gap = gap
+        self.rng = np.random.default_rng(seed)
+        self.capture = capture # 真实截图 (只计时)，None = 不截图
+        self.clock = clock
+
+        zone = (self.width // 2 - 40, self.width // 2 + 48)
+        off = synthetic.make_minigame_bar(self.width, self.height, cursor_x=zone[0] - 100, zones=(zone,), noise=0)
+        on = synthetic.make_minigame_bar(self.width, self.height, cursor_x=self.width // 2, zones=(zone,), noise=0)
+        self._frames = {False: cv2.cvtColor(off, cv2.COLOR_BGR2BGRA), True: cv2.cvtColor(on, cv2.COLOR_BGR2BGRA)}
+
+        full = {"left": self.left, "top": self.top, "width": self.width, "height": self.height}
+        self.monitors = [full, full]
+
+        self.samples = []
+        self.spurious = 0 # 标记未出现时的按键
+        self.grabs = 0
+        self._seen = None # (截图开始, 截图结束)：第一次看到当前标记的截图
+        self._schedule(clock())
+
+    def _schedule(self, now):
+        self.change_at = now + self.rng.uniform(*self.gap)
+        self._seen = None
+
+    def grab(self, monitor):
+        start = self.clock()
+        if self.capture is not None:
+            # 截取与请求相同的屏幕区域 (含 ROI 的偏移)，而不是屏幕左上角
+            self.capture.grab({"left": int(monitor["left"]), "top": int(monitor["top"]),
+                               "width": int(monitor["width"]), "height": int(monitor["height"])})
+        visible = start >= self.change_at
+        y0 = int(monitor["top"]) - self.top
+        x0 = int(monitor["left"]) - self.left
+        frame = self._frames[visible][y0:y0 + int(monitor["height"]), x0:x0 + int(monitor["width"])]
+        end = self.clock()
+        self.grabs += 1
+        if visible and self._seen is None:
+            self._seen = (start, end)
+        return frame
+
+    def close(self):
+        pass
+
+    def on_key(self, called, returned):
+        """RecordingInputBackend 发出空格后回调：记录一次样本并安排下一次标记变化"""
+        if self._seen is None or called < self.change_at:
+            self.spurious += 1
+            return
+        seen_start, seen_end = self._seen
+        self.samples.append({
+            "frame_wait": seen_start - self.change_at,
+            "capture": seen_end - seen_start,
+            "processing": called - seen_end,
+            "input": returned - called,
+            "total": returned - self.change_at,
+        })
+        self._schedule(returned)
+
+
+class RecordingInputBackend(InputBackend):
+    """包装真实的输入后端，记录每个按键事件的调用 / 返回时间"""
+    name = "recording"
+
+    def __init__(self, inner, target, clock=time.perf_counter):
+        self.inner = inner
+        self.target = target
+        self.clock = clock
+        self.events = [] # [(调用时间, 返回时间, 类型, 按键)]
+
+    def key_down(self, key):
+        called = self.clock()
+        self.inner.key_down(key)
+        returned = self.clock()
+        self.events.append((called, returned, "down", key))
+        if key == "space":
+            self.target.on_key(called, returned)
+
+    def key_up(self, key):
+        called = self.clock()
+        self.inner.key_up(key)
+        self.events.append((called, self.clock(), "up", key))
+
+    def click(self, x, y):
+        called = self.clock()
+        self.inner.click(x, y)
+        self.events.append((called, self.clock(), "click", (x, y)))
+
+
+def summarize(samples):
+    """每个阶段的分位数 / 均值 / 最大值 (毫秒)"""
+    stages = {}
+    for stage in STAGES:
+        values = np.array([s[stage] for s in samples]) * 1000.0
+        if not len(values):
+            continue
+        stats = {f"p{q}": float(np.percentile(values, q)) for q in QUANTILES}
+        stats.update(mean=float(values.mean()), max=float(values.max()))
+        stages[stage] = stats
+    return stages
+
+
+def run_probe(cfg, samples=200, backend="null", capture="synthetic", timeout=120.0, seed=0):
+    """用真实的 MinigameSession 对着 MarkerTarget 测量 samples 次反应延迟"""
+    from core.bot_logic import FishingBot, MinigameSession
+
+    grabber = None
+    if capture == "mss":
+        import mss
+        grabber = mss.mss()
+    settings = cfg.settings
+    # 标记间隔必须超过命中冷却，否则按键会被冷却吞掉
+    gap = (settings.hit_cooldown + 0.05, settings.hit_cooldown + 0.2)
+    target = MarkerTarget(gap=gap, seed=seed, capture=grabber)
+    recorder = RecordingInputBackend(create_input_backend(backend), target)
+    bot = FishingBot(cfg, input_backend=recorder, window_backend=NullWindowBackend())
+    bot.vision.attach_source(target)
+    bot.is_running = True
+
+    session = MinigameSession(bot, (target.left, target.top, target.width, target.height))
+    deadline = time.perf_counter() + timeout
+    try:
+        while len(target.samples) < samples and time.perf_counter() < deadline:
+            session.step()
+            if session.poll_interval:
+                time.sleep(session.poll_interval)
+    finally:
+        if grabber is not None:
+            grabber.close()
+
+    return {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "backend": recorder.inner.name,
+        "capture": capture,
+        "samples": len(target.samples),
+        "spurious_presses": target.spurious,
+        "grabs": target.grabs,
+        "rows_per_frame": session.captured_rows / max(session.frames, 1),
+        "settings": {"hit_cooldown": settings.hit_cooldown,
+                     "minigame_poll_interval": settings.minigame_poll_interval,
+                     "minigame_band": settings.minigame_band},
+        "stages_ms": summarize(target.samples),
+    }
+
+
+def main():
+    from utils.config_manager import ConfigManager
+
+    parser = argparse.ArgumentParser(description="端到端反应延迟：画面变化 -> 按键事件")
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--backend", default="null", choices=["null", "win32", "x11", "auto"],
+                        help="实际发送按键的输入后端 (非 null 时会真实按下空格)")
+    parser.add_argument("--capture", default="synthetic", choices=["synthetic", "mss"],
+                        help="mss = 每帧额外做一次同尺寸的真实截图，计入 capture 阶段")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出完整报告")
+    args = parser.parse_args()
+
+    cfg = ConfigManager()
+    report = run_probe(cfg, args.samples, args.backend, args.capture, args.timeout, args.seed)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['samples']} samples, backend={report['backend']}, capture={report['capture']}, "
+          f"{report['rows_per_frame']:.1f} rows/frame, {report['spurious_presses']} spurious presses")
+    print(f"{'stage (ms)':12s} " + " ".join(f"{f'p{q}':>8s}" for q in QUANTILES) + f" {'mean':>8s} {'max':>8s}")
+    for stage, stats in report["stages_ms"].items():
+        print(f"{stage:12s} " + " ".join(f"{stats[f'p{q}']:8.3f}" for q in QUANTILES) +
+              f" {stats['mean']:8.3f} {stats['max']:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
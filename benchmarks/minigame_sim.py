@@ -0,0 +1,361 @@
+"""
+闭环小游戏模拟器
+  - MinigameSimulator: 按固定刷新率渲染钓鱼进度条 (移动的白色游标 + 黄色命中区)，
+    接口与 mss 兼容，可直接 attach 到 Vision
+  - SimInputBackend: 接收 Bot 的空格按键 (可附加输入延迟)，交给模拟器判定命中 / 未命中
+  - 运行入口：对比不同识别器、轮询策略、输入延迟下的命中率与 CPU 开销，无需显示器
+
+用法:
+  python -m benchmarks.minigame_sim
+  python -m benchmarks.minigame_sim --duration 8 --latency 0 0.03 0.06 --poll 0 0.002 --json
+  python -m benchmarks.minigame_sim --band on off      # 对比扫描带 / 完整 ROI
+"""
+import argparse
+import bisect
+import json
+import time
+import types
+
+import cv2
+import numpy as np
+
+from benchmarks import synthetic
+from core.backends import InputBackend, NullWindowBackend
+from core.vision import Vision
+
+
+class MinigameSimulator:
+    """
+    进度条状态是时间的确定函数：游标在 [0, width - cursor_w] 之间往返匀速运动，
+    命中后黄色区域随机换位。帧按 refresh_hz 量化，同一帧只渲染一次。
+    """
+
+    def __init__(self, roi=synthetic.MINIGAME_ROI, speed=1000.0, zone_width=50, zone_count=1,
+                 cursor_w=8, noise=4.0, refresh_hz=60.0, duration=10.0, seed=0,
+                 clock=time.perf_counter):
+        self.left, self.top, self.width, self.height = (int(v) for v in roi)
+        self.speed = float(speed)
+        self.zone_width = int(zone_width)
+        self.zone_count = int(zone_count)
+        self.cursor_w = int(cursor_w)
+        self.refresh_hz = float(refresh_hz)
+        self.duration = float(duration)
+        self.clock = clock
+        self.rng = np.random.default_rng(seed)
+
+        # 预生成噪声图块，渲染时轮流叠加 (避免每帧生成随机数的开销计入 Bot)
+        shape = (self.height, self.width, 3)
+        self._noise = [self.rng.normal(0, noise, shape).astype(np.int16) for _ in range(8)] if noise else None
+
+        # 黄色区域历史：[(生效时间, zones)]，按时间查找当前区域
+        self._zone_times = [0.0]
+        self._zone_history = [self._random_zones()]
+
+        self.presses = []  # [{"t", "hit", "error_s", "cursor"}]
+        self.frames_rendered = 0
+        self.grabs = 0
+        self.render_time = 0.0
+        self._frame_idx = -1
+        self._frame = None
+
+        self.monitors = []
+        self.start()
+
+    # ---------- 状态 ----------
+
+    def start(self):
+        """重置起始时间 (模拟器的 t=0)"""
+        self.t0 = self.clock()
+        full = {"left": self.left, "top": self.top, "width": self.width, "height": self.height}
+        self.monitors = [full, full]
+
+    def now(self):
+        return self.clock() - self.t0
+
+    @property
+    def finished(self):
+        return self.now() > self.duration
+
+    def _random_zones(self):
+        span = self.width - self.zone_width
+        starts = self.rng.integers(0, span, self.zone_count)
+        return [(int(x), int(x) + self.zone_width) for x in sorted(starts)]
+
+    def zones_at(self, t):
+        i = bisect.bisect_right(self._zone_times, t) - 1
+        return self._zone_history[max(i, 0)]
+
+    def cursor_at(self, t):
+        """游标左边缘位置 (往返运动)，结束后返回 None"""
+        if t > self.duration:
+            return None
+        travel = self.width - self.cursor_w
+        pos = (self.speed * t) % (2 * travel)
+        return pos if pos <= travel else 2 * travel - pos
+
+    # ---------- mss 兼容接口 ----------
+
+    def grab(self, monitor):
+        self.grabs += 1
+        idx = int(self.now() * self.refresh_hz)
+        if idx != self._frame_idx:
+            t_frame = idx / self.refresh_hz
+            start = time.perf_counter()
+            self._frame = self._render(t_frame, idx)
+            self.render_time += time.perf_counter() - start
+            self._frame_idx = idx
+            self.frames_rendered += 1
+        x0 = int(monitor["left"]) - self.left
+        y0 = int(monitor["top"]) - self.top
+        return self._frame[y0:y0 + int(monitor["height"]), x0:x0 + int(monitor["width"])]
+
+    def close(self):
+        pass
+
+    def _render(self, t, idx):
+        cursor = self.cursor_at(t)
+        bar = synthetic.make_minigame_bar(self.width, self.height, cursor_x=cursor,
+                                          zones=self.zones_at(t), cursor_w=self.cursor_w, noise=0)
+        if self._noise is not None:
+            bar = np.clip(bar.astype(np.int16) + self._noise[idx % len(self._noise)], 0, 255).astype(np.uint8)
+        return cv2.cvtColor(bar, cv2.COLOR_BGR2BGRA)
+
+    # ---------- 按键判定 ----------
+
+    def press(self, t=None):
+        """
+        在时间 t (默认当前) 按下空格：游标中心落在黄色区域内即命中
+        timing_error: 游标中心到最近黄色区域中心的距离换算成秒 (带符号)
+        """
+        if t is None:
+            t = self.now()
+        cursor = self.cursor_at(t)
+        if cursor is None:
+            return None
+        center = cursor + self.cursor_w / 2.0
+        zones = self.zones_at(t)
+        nearest = min(zones, key=lambda z: abs(center - (z[0] + z[1]) / 2.0))
+        error_px = center - (nearest[0] + nearest[1]) / 2.0
+        hit = any(z0 <= center <= z1 for z0, z1 in zones)
+        record = {"t": t, "hit": hit, "error_s": error_px / self.speed, "cursor": center}
+        self.presses.append(record)
+        if hit:
+            # 命中后黄色区域换位
+            self._zone_times.append(t)
+            self._zone_history.append(self._random_zones())
+        return record
+
+    def score(self):
+        hits = [p for p in self.presses if p["hit"]]
+        errors = np.abs([p["error_s"] for p in self.presses]) if self.presses else np.zeros(1)
+        return {
+            "presses": len(self.presses),
+            "hits": len(hits),
+            "misses": len(self.presses) - len(hits),
+            "hit_rate": len(hits) / len(self.presses) if self.presses else 0.0,
+            "mean_abs_error_ms": float(errors.mean() * 1000.0),
+            "p95_abs_error_ms": float(np.percentile(errors, 95) * 1000.0),
+        }
+
+
+class SimInputBackend(InputBackend):
+    """把空格按下事件转交给模拟器；latency 模拟输入到游戏生效的延迟"""
+    name = "sim"
+
+    def __init__(self, simulator, latency=0.0):
+        self.sim = simulator
+        self.latency = float(latency)
+        self.events = []  # [(sim_time, kind, key)]
+
+    def key_down(self, key):
+        t = self.sim.now()
+        self.events.append((t, "down", key))
+        if key == 'space':
+            self.sim.press(t + self.latency)
+
+    def key_up(self, key):
+        self.events.append((self.sim.now(), "up", key))
+
+    def click(self, x, y):
+        self.events.append((self.sim.now(), "click", (x, y)))
+
+
+# ================= 可替换的识别器 =================
+
+def _contour_cursor(self, img_hsv, lower, upper):
+    """旧实现：findContours + 逐个轮廓 contourArea / boundingRect"""
+    contours, _ = cv2.findContours(cv2.inRange(img_hsv, lower, upper), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if contours:
+        max_cnt = max(contours, key=cv2.contourArea)
+        if cv2.contourArea(max_cnt) > 20:
+            x, y, w, h = cv2.boundingRect(max_cnt)
+            if h > 5:
+                return x, w
+    return -1, 0
+
+
+def _contour_blobs(img_hsv, lower, upper):
+    """findContours 版本的色块提取 (只沿边界追踪，结果按轮廓面积计)，与 Vision.color_blobs 同格式"""
+    contours, _ = cv2.findContours(cv2.inRange(img_hsv, lower, upper), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    blobs = [cv2.boundingRect(c) + (area,) for c in contours if (area := cv2.contourArea(c)) > 20]
+    return np.array(blobs, dtype=np.float64).reshape(-1, 5)
+
+
+def _contour_blobs_cursor(self, img_hsv, lower, upper):
+    blobs = _contour_blobs(img_hsv, lower, upper)
+    if len(blobs):
+        x, y, w, h, _ = blobs[blobs[:, 4].argmax()]
+        if h > 5:
+            return int(x), int(w)
+    return -1, 0
+
+
+def _contour_blobs_zone(self, img_hsv, center_x, lower, upper):
+    blobs = _contour_blobs(img_hsv, lower, upper)
+    x = blobs[:, 0]
+    return bool(((x <= center_x) & (center_x <= x + blobs[:, 2])).any())
+
+
+def _component_cursor(self, img_hsv, lower, upper):
+    """connectedComponentsWithStats 版本 (Vision.color_blobs，8 连通域)"""
+    blobs = Vision.color_blobs(img_hsv, lower, upper)
+    if len(blobs):
+        x, y, w, h, _ = blobs[blobs[:, 4].argmax()]
+        if h > 5:
+            return int(x), int(w)
+    return -1, 0
+
+
+def _component_zone(self, img_hsv, center_x, lower, upper):
+    blobs = Vision.color_blobs(img_hsv, lower, upper)
+    x = blobs[:, 0]
+    return bool(((x <= center_x) & (center_x <= x + blobs[:, 2])).any())
+
+
+def _contour_zone(self, img_hsv, center_x, lower, upper):
+    contours, _ = cv2.findContours(cv2.inRange(img_hsv, lower, upper), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    for cnt in contours:
+        if cv2.contourArea(cnt) > 20:
+            x, y, w, h = cv2.boundingRect(cnt)
+            if x <= center_x <= x + w:
+                return True
+    return False
+
+
+def _column_scan_cursor(self, img_hsv, lower, upper):
+    """按列统计掩码像素：最长的一段连续 "高列" 作为游标"""
+    cols = np.count_nonzero(cv2.inRange(img_hsv, lower, upper), axis=0) > 5
+    if not cols.any():
+        return -1, 0
+    xs = np.flatnonzero(cols)
+    breaks = np.flatnonzero(np.diff(xs) > 1)
+    starts = np.concatenate(([xs[0]], xs[breaks + 1]))
+    ends = np.concatenate((xs[breaks], [xs[-1]]))
+    i = int(np.argmax(ends - starts))
+    return int(starts[i]), int(ends[i] - starts[i] + 1)
+
+
+def _column_scan_zone(self, img_hsv, center_x, lower, upper):
+    """只检查游标中心所在的一列"""
+    col = img_hsv[:, int(center_x):int(center_x) + 1]
+    return np.count_nonzero(cv2.inRange(col, lower, upper)) > 3
+
+
+DETECTORS = {
+    "blobs": None,  # Vision 默认实现 (按列投影的游程 + 游标中心列的命中判定)
+    "components": (_component_cursor, _component_zone),
+    "contours": (_contour_cursor, _contour_zone),
+    "contour_blobs": (_contour_blobs_cursor, _contour_blobs_zone),
+    "column_scan": (_column_scan_cursor, _column_scan_zone),
+}
+
+
+def run_trial(cfg, detector="blobs", latency=0.0, poll_interval=None, band=None, **sim_kwargs):
+    """用真实的 FishingBot.play_minigame 跑一局模拟，返回命中率与 CPU 开销"""
+    from core.bot_logic import FishingBot
+
+    sim = MinigameSimulator(**sim_kwargs)
+    bot = FishingBot(cfg, input_backend=SimInputBackend(sim, latency), window_backend=NullWindowBackend())
+    bot.vision.attach_source(sim)
+
+    impl = DETECTORS[detector]
+    if impl is not None:
+        bot.vision.locate_cursor = types.MethodType(impl[0], bot.vision)
+        bot.vision.in_color_zone = types.MethodType(impl[1], bot.vision)
+
+    if poll_interval is not None:
+        cfg.set('game_params', 'minigame_poll_interval', poll_interval)
+    if band is not None:
+        cfg.set('game_params', 'minigame_band', band)
+
+    roi = (sim.left, sim.top, sim.width, sim.height)
+    bot.is_running = True
+    sim.start()
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    bot.play_minigame(roi)
+    cpu = time.process_time() - cpu0
+    wall = time.perf_counter() - wall0
+
+    result = sim.score()
+    stats = bot.last_minigame_stats or {}
+    result.update({
+        "detector": detector,
+        "band": cfg.settings.minigame_band,
+        "rows_per_frame": stats.get("rows_per_frame", 0.0),
+        "bytes_per_frame": stats.get("bytes_per_frame", 0.0),
+        "latency_ms": latency * 1000.0,
+        "poll_interval_ms": cfg.settings.minigame_poll_interval * 1000.0,
+        "grabs": sim.grabs,
+        "grabs_per_s": sim.grabs / wall,
+        "cpu_percent": 100.0 * cpu / wall,
+        "cpu_ms_per_grab": 1000.0 * (cpu - sim.render_time) / max(sim.grabs, 1),
+    })
+    return result
+
+
+def main():
+    from utils.config_manager import ConfigManager
+
+    parser = argparse.ArgumentParser(description="闭环小游戏模拟：命中率 vs 识别延迟")
+    parser.add_argument("--duration", type=float, default=6.0, help="每局时长 (秒)")
+    parser.add_argument("--speed", type=float, default=1000.0, help="游标速度 (像素/秒)")
+    parser.add_argument("--zone-width", type=int, default=50)
+    parser.add_argument("--noise", type=float, default=4.0)
+    parser.add_argument("--refresh", type=float, default=60.0, help="画面刷新率 (Hz)")
+    parser.add_argument("--detector", nargs="+", default=list(DETECTORS), choices=list(DETECTORS))
+    parser.add_argument("--latency", nargs="+", type=float, default=[0.0, 0.03], help="输入延迟 (秒)")
+    parser.add_argument("--poll", nargs="+", type=float, default=[0.0, 0.005], help="循环休眠 (秒)")
+    parser.add_argument("--band", nargs="+", choices=["on", "off"], default=["on"], help="是否启用扫描带")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    cfg = ConfigManager()
+    results = []
+    for detector in args.detector:
+        for band in args.band:
+            for poll in args.poll:
+                for latency in args.latency:
+                    results.append(run_trial(
+                        cfg, detector=detector, latency=latency, poll_interval=poll, band=band == "on",
+                        speed=args.speed, zone_width=args.zone_width, noise=args.noise,
+                        refresh_hz=args.refresh, duration=args.duration, seed=args.seed))
+    # 恢复内存中的配置 (不写入文件)
+    cfg.load_config()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'detector':12s} {'band':>4s} {'poll':>6s} {'lat':>6s} {'press':>6s} {'hit%':>6s} {'|err|ms':>8s} "
+          f"{'grab/s':>8s} {'cpu%':>6s} {'ms/grab':>8s} {'rows':>5s} {'KB/frame':>8s}")
+    for r in results:
+        print(f"{r['detector']:12s} {'on' if r['band'] else 'off':>4s} {r['poll_interval_ms']:6.1f} "
+              f"{r['latency_ms']:6.0f} {r['presses']:6d} "
+              f"{r['hit_rate'] * 100:6.1f} {r['mean_abs_error_ms']:8.1f} {r['grabs_per_s']:8.0f} "
+              f"{r['cpu_percent']:6.0f} {r['cpu_ms_per_grab']:8.3f} {r['rows_per_frame']:5.1f} "
+              f"{r['bytes_per_frame'] / 1024:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
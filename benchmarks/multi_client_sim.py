@@ -0,0 +1,248 @@
+"""
+多窗口调度模拟
+FishingCycleSimulator 模拟一个完整的钓鱼循环 (抛竿 -> 等待 -> 咬钩 -> 小游戏 -> 结算)，
+画面由 benchmarks.synthetic 合成，小游戏部分复用 MinigameSimulator。
+每个模拟客户端自带帧源和输入后端，交给 MultiFishingBot 调度，
+对比 1..N 个客户端时每个客户端与合计的吞吐 (钓到的鱼 / 分钟)。
+
+用法:
+  python -m benchmarks.multi_client_sim --clients 1 2 3 --duration 30
+"""
+import argparse
+import json
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks import synthetic
+from benchmarks.minigame_sim import MinigameSimulator
+from core.backends import InputBackend, NullWindowBackend
+
+
+class FishingCycleSimulator:
+    """
+    状态机：cast (显示抛竿图标) -> waiting -> bite (显示咬钩图标，超时则鱼跑掉) ->
+    minigame (进度条) -> result (结算画面，按 esc 回到 cast)
+    设置 inventory 时背包装满后进入贩卖流程：full (背包满提示) -按 t-> bag (贩卖按钮)，
+    点过确认贩卖后按 esc 清空背包回到 cast
+    接口与 mss 兼容：grab(monitor) 只返回请求的区域
+    :param inventory: 背包容量 (条)，None = 永远不满
+    """
+
+    def __init__(self, images, seed=0, bite_delay=(4.0, 8.0), bite_window=1.5,
+                 qte_duration=3.0, qte_speed=600.0, inventory=None, clock=time.perf_counter):
+        self.rng = np.random.default_rng(seed)
+        self.seed = seed
+        self.bite_delay = bite_delay
+        self.bite_window = bite_window
+        self.qte_duration = qte_duration
+        self.qte_speed = qte_speed
+        self.inventory = inventory
+        self.clock = clock
+
+        # 每个状态的静态画面只合成一次
+        layouts = {"cast": ["cast"], "waiting": [], "bite": ["bite"], "result": ["result"],
+                   "full": ["cast", "full_warning"],
+                   "bag": ["btn_sell_mode", "btn_select_all", "btn_check", "btn_confirm"]}
+        self._screens = {}
+        for state, keys in layouts.items():
+            screen, _ = synthetic.make_screen(images, keys=keys, seed=seed, with_minigame=False)
+            self._screens[state] = cv2.cvtColor(screen, cv2.COLOR_BGR2BGRA)
+        self._screens["minigame"] = self._screens["waiting"]
+
+        w, h = synthetic.SCREEN_SIZE
+        full = {"left": 0, "top": 0, "width": w, "height": h}
+        self.monitors = [full, full]
+
+        # 贩卖界面按钮的屏幕矩形 (判断点击落在哪个按钮上)
+        self._buttons = {}
+        for key in layouts["bag"]:
+            x, y = synthetic.PLACEMENTS[key]
+            h, w = synthetic.load_template(key, images).shape[:2]
+            self._buttons[key] = (x, y, w, h)
+
+        self.state = "cast"
+        self.bite_at = None
+        self.qte = None
+        self.bag = 0 # 背包里的鱼
+        self.sold = False # 本次贩卖是否已点确认
+        self.counts = {"casts": 0, "bites": 0, "escaped": 0, "caught": 0, "qte_presses": 0, "qte_hits": 0,
+                       "sells": 0, "clicks": 0, "missed_clicks": 0}
+        self.grabs = 0
+        self.t0 = clock()
+
+    def now(self):
+        return self.clock() - self.t0
+
+    def _advance(self, t):
+        """按时间推进的状态转换"""
+        if self.state == "waiting" and t >= self.bite_at:
+            self.state = "bite"
+            self.counts["bites"] += 1
+        if self.state == "bite" and t >= self.bite_at + self.bite_window:
+            self.state = "cast"
+            self.counts["escaped"] += 1
+        if self.state == "minigame" and self.qte.finished:
+            score = self.qte.score()
+            self.counts["qte_presses"] += score["presses"]
+            self.counts["qte_hits"] += score["hits"]
+            self.counts["caught"] += 1
+            self.bag += 1
+            self.state = "result"
+
+    # ---------- mss 兼容接口 ----------
+
+    def grab(self, monitor):
+        self.grabs += 1
+        self._advance(self.now())
+        x, y = int(monitor["left"]), int(monitor["top"])
+        w, h = int(monitor["width"]), int(monitor["height"])
+        frame = self._screens[self.state][y:y + h, x:x + w]
+        if self.state != "minigame":
+            return frame
+
+        # 进度条与请求区域的交集由 MinigameSimulator 实时渲染
+        rx, ry, rw, rh = synthetic.MINIGAME_ROI
+        ix0, iy0 = max(x, rx), max(y, ry)
+        ix1, iy1 = min(x + w, rx + rw), min(y + h, ry + rh)
+        if ix0 >= ix1 or iy0 >= iy1:
+            return frame
+        frame = frame.copy()
+        bar = self.qte.grab({"left": ix0, "top": iy0, "width": ix1 - ix0, "height": iy1 - iy0})
+        frame[iy0 - y:iy1 - y, ix0 - x:ix1 - x] = bar
+        return frame
+
+    def close(self):
+        pass
+
+    # ---------- 输入 ----------
+
+    def key_down(self, key):
+        t = self.now()
+        self._advance(t)
+        if key == "space":
+            if self.state == "cast":
+                self.state = "waiting"
+                self.counts["casts"] += 1
+                self.bite_at = t + self.rng.uniform(*self.bite_delay)
+            elif self.state == "bite":
+                self.state = "minigame"
+                self.qte = MinigameSimulator(speed=self.qte_speed, duration=self.qte_duration,
+                                             seed=int(self.rng.integers(1 << 30)), clock=self.clock)
+            elif self.state == "minigame":
+                self.qte.press()
+        elif key == "esc" and self.state == "result":
+            self.state = "full" if self.inventory and self.bag >= self.inventory else "cast"
+        elif key == "t" and self.state == "full":
+            self.state = "bag"
+            self.sold = False
+        elif key == "esc" and self.state == "bag":
+            if self.sold:
+                self.bag = 0
+                self.counts["sells"] += 1
+            self.state = "full" if self.inventory and self.bag >= self.inventory else "cast"
+
+    def click(self, x, y):
+        self.counts["clicks"] += 1
+        if self.state != "bag":
+            self.counts["missed_clicks"] += 1
+            return
+        hit = next((key for key, (bx, by, bw, bh) in self._buttons.items()
+                    if bx <= x < bx + bw and by <= y < by + bh), None)
+        if hit is None:
+            self.counts["missed_clicks"] += 1
+        elif hit == "btn_confirm":
+            self.sold = True
+
+
+class CycleInputBackend(InputBackend):
+    """把按键交给 FishingCycleSimulator"""
+    name = "sim"
+
+    def __init__(self, simulator):
+        self.sim = simulator
+
+    def key_down(self, key):
+        self.sim.key_down(key)
+
+    def key_up(self, key):
+        pass
+
+    def click(self, x, y):
+        self.sim.click(x, y)
+
+
+def run_trial(cfg, clients, duration, seed=0, verbose=False, **sim_kwargs):
+    """用 MultiFishingBot 调度 clients 个模拟客户端 duration 秒，返回吞吐统计"""
+    from core.bot_logic import FishingBot
+    from core.orchestrator import MultiFishingBot
+
+    orchestrator = MultiFishingBot(cfg, window_backend=NullWindowBackend())
+    if verbose:
+        orchestrator.log_signal.connect(print)
+    sims = []
+    for i in range(clients):
+        sim = FishingCycleSimulator(cfg.settings.images, seed=seed + i, **sim_kwargs)
+        bot = FishingBot(cfg, input_backend=CycleInputBackend(sim), window_backend=NullWindowBackend(),
+                         clock=orchestrator.clock)
+        bot.hwnd = i
+        bot.vision.attach_source(sim)
+        orchestrator.add_client(bot, name=f"sim{i}")
+        sims.append(sim)
+
+    timer = threading.Timer(duration, orchestrator.stop)
+    timer.start()
+    cpu0 = time.process_time()
+    orchestrator.run() # 在当前线程内运行
+    timer.cancel()
+    cpu = time.process_time() - cpu0
+
+    report = orchestrator.report
+    report["cpu_percent"] = 100.0 * cpu / max(report["wall_s"], 1e-6)
+    for sim, name in zip(sims, report["clients"]):
+        report["clients"][name]["sim"] = sim.counts
+    report["aggregate"]["caught"] = sum(s.counts["caught"] for s in sims)
+    report["aggregate"]["escaped"] = sum(s.counts["escaped"] for s in sims)
+    report["aggregate"]["caught_per_min"] = report["aggregate"]["caught"] * 60.0 / max(report["wall_s"], 1e-6)
+    return report
+
+
+def main():
+    from utils.config_manager import ConfigManager
+
+    parser = argparse.ArgumentParser(description="多窗口调度模拟：客户端数量 vs 吞吐")
+    parser.add_argument("--clients", nargs="+", type=int, default=[1, 2, 3])
+    parser.add_argument("--duration", type=float, default=40.0, help="每组运行时长 (秒)")
+    parser.add_argument("--qte-duration", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="打印调度日志")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    cfg = ConfigManager()
+    # 合成画面为 2K，跳过多尺度扫描；切换焦点无需等待
+    cfg.set('vision', 'ui_scale', 1.0)
+    cfg.set('multi_client', 'focus_settle', 0.0)
+    # 模拟画面不记录匹配位置 (不改写 settings.json 旁的统计文件)
+    cfg.set('vision', 'roi_learning', 'off')
+    results = {n: run_trial(cfg, n, args.duration, args.seed, args.verbose, qte_duration=args.qte_duration)
+               for n in args.clients}
+    # 恢复内存中的配置 (不写入文件)
+    cfg.load_config()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'clients':>7s} {'caught':>7s} {'escaped':>7s} {'fish/min':>9s} {'per client':>11s} "
+          f"{'tick/s':>7s} {'cpu%':>5s}")
+    for n, r in results.items():
+        total = r["aggregate"]
+        print(f"{n:7d} {total['caught']:7d} {total['escaped']:7d} {total['caught_per_min']:9.1f} "
+              f"{total['caught_per_min'] / n:11.1f} {total['ticks_per_s']:7.1f} {r['cpu_percent']:5.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+虚拟时钟回放：比真实时间更快地跑完整段挂机流程
+FishingBot 注入 SimClock，FishingCycleSimulator 按同一时钟渲染 (经 ClockedFrameSource 按帧时间戳推进)，
+直接调用 FishingBot.run()：抛竿、咬钩、小游戏、结算、背包满后的贩卖流程与真实运行走同一套代码，
+只是所有等待都不再真正睡眠。输出虚拟时长 / 实际耗时 (倍速)、钓鱼与贩卖次数，
+以及决策轨迹 (虚拟时间戳 + 日志) 的摘要：同一 seed 重复回放摘要应完全相同。
+
+--clock real 用真实时钟跑同样的流程 (耗时与虚拟时长相同)，用于对照。
+回放使用 settings.json 的临时副本，匹配位置统计 (core.roi_learner) 也写在临时目录中，
+且每次回放前删除，每次都从空白统计开始 (否则日志中的样本数逐次累加，摘要不同)；
+--roi-learning apply --repeat 2 时第二次回放使用第一次学到的 ROI，可直接比较每次 tick 的耗时。
+
+用法:
+  python -m benchmarks.replay_session --minutes 30
+  python -m benchmarks.replay_session --minutes 10 --repeat 2     # 检查两次回放的决策是否一致
+  python -m benchmarks.replay_session --minutes 1 --clock real
+  python -m benchmarks.replay_session --minutes 6 --repeat 2 --roi-learning apply
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from benchmarks.multi_client_sim import CycleInputBackend, FishingCycleSimulator
+from core.backends import NullWindowBackend
+from core.clock import RealClock, SimClock
+from core.frame_source import ClockedFrameSource
+
+
+class _SessionLimit:
+    """帧源包装：时钟超过 end 后让 Bot 停止 (与界面点击停止相同，只清除 is_running)"""
+
+    def __init__(self, source, clock, end):
+        self.source = source
+        self.clock = clock
+        self.end = end
+        self.bot = None
+
+    @property
+    def monitors(self):
+        return self.source.monitors
+
+    def grab(self, monitor):
+        if self.clock.time() >= self.end and self.bot is not None:
+            self.bot.is_running = False
+        return self.source.grab(monitor)
+
+    def close(self):
+        self.source.close()
+
+
+def run_replay(cfg, minutes, clock="sim", fps=60.0, seed=0, inventory=8, verbose=False, **sim_kwargs):
+    """
+    回放 minutes 分钟 (虚拟时间) 的完整挂机流程
+    :param clock: sim = 虚拟时钟；real = 真实时钟 (对照)
+    :param inventory: 背包容量，钓满后触发贩卖流程
+    """
+    from core.bot_logic import FishingBot
+
+    random.seed(seed) # 拟人化随机延迟 / 按键时长
+    if clock == "sim":
+        bot_clock = SimClock()
+        now = bot_clock.time
+    else:
+        bot_clock = RealClock()
+        now = time.time
+    start = now()
+    wall0 = time.perf_counter()
+    sim = FishingCycleSimulator(cfg.settings.images, seed=seed, inventory=inventory, clock=now, **sim_kwargs)
+    source = ClockedFrameSource(sim, bot_clock, 1.0 / fps) if clock == "sim" else sim
+    source = _SessionLimit(source, bot_clock, start + minutes * 60.0)
+    bot = FishingBot(cfg, input_backend=CycleInputBackend(sim), window_backend=NullWindowBackend(),
+                     clock=bot_clock)
+    source.bot = bot
+    bot.vision.attach_source(source)
+
+    trace = []
+    def record(message):
+        trace.append((round(now() - start, 4), message))
+        if verbose:
+            print(f"[{now() - start:9.3f}] {message}")
+    bot.log_signal.connect(record)
+
+    # 单独统计 tick (状态检测 + 动作) 的实际耗时
+    tick_time = [0.0]
+    tick = bot.tick
+    def timed_tick(settings):
+        t = time.perf_counter()
+        try:
+            return tick(settings)
+        finally:
+            tick_time[0] += time.perf_counter() - t
+    bot.tick = timed_tick
+
+    bot.run() # 在当前线程内运行
+    wall = time.perf_counter() - wall0
+    virtual = now() - start
+
+    # 决策轨迹摘要：虚拟时钟下与本机速度无关 (小游戏日志中的 fps 也按虚拟时间计算)
+    digest = hashlib.sha1(json.dumps(trace, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+    return {"clock": clock, "virtual_s": virtual, "wall_s": wall, "speedup": virtual / max(wall, 1e-6),
+            "tick_ms": 1000.0 * tick_time[0] / max(bot.stats["ticks"], 1),
+            "sim": sim.counts, "bot": dict(bot.stats), "decisions": len(trace), "trace_digest": digest,
+            "slept_s": getattr(bot_clock, "slept", None), "trace": trace}
+
+
+def main():
+    from core.roi_learner import stats_path
+    from utils.config_manager import ConfigManager
+
+    parser = argparse.ArgumentParser(description="虚拟时钟回放完整挂机流程")
+    parser.add_argument("--minutes", type=float, default=30.0, help="回放的虚拟时长 (分钟)")
+    parser.add_argument("--clock", default="sim", choices=["sim", "real"])
+    parser.add_argument("--fps", type=float, default=60.0, help="虚拟画面帧率")
+    parser.add_argument("--inventory", type=int, default=8, help="背包容量 (条)，钓满后贩卖")
+    parser.add_argument("--repeat", type=int, default=1, help="重复回放次数 (比较决策摘要)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--config", default="config/settings.json", help="作为模板的配置文件 (不会被修改)")
+    parser.add_argument("--roi-learning", default="suggest", choices=["off", "suggest", "apply"])
+    parser.add_argument("--verbose", action="store_true", help="打印带虚拟时间戳的日志")
+    parser.add_argument("--json", metavar="PATH", help="保存完整报告 (含决策轨迹)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="replay_")
+    try:
+        config_path = os.path.join(workdir, "settings.json")
+        shutil.copy(args.config, config_path)
+        cfg = ConfigManager(config_path)
+        # 合成画面为 2K，跳过多尺度扫描
+        cfg.set('vision', 'ui_scale', 1.0)
+        cfg.set('vision', 'roi_learning', args.roi_learning)
+        reports = []
+        for _ in range(args.repeat):
+            if os.path.exists(stats_path(cfg)):
+                os.remove(stats_path(cfg))
+            reports.append(run_replay(cfg, args.minutes, args.clock, args.fps, args.seed, args.inventory,
+                                      args.verbose))
+            reports[-1]["rois"] = dict(cfg.get('rois'))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2, ensure_ascii=False)
+
+    print(f"{'clock':5s} {'virtual s':>9s} {'wall s':>7s} {'speedup':>7s} {'ms/tick':>7s} {'caught':>6s} "
+          f"{'escaped':>7s} {'sells':>5s} {'decisions':>9s} {'digest':>16s}")
+    for r in reports:
+        print(f"{r['clock']:5s} {r['virtual_s']:9.1f} {r['wall_s']:7.1f} {r['speedup']:6.1f}x "
+              f"{r['tick_ms']:7.1f} {r['sim']['caught']:6d} {r['sim']['escaped']:7d} {r['sim']['sells']:5d} "
+              f"{r['decisions']:9d} {r['trace_digest']:>16s}")
+    if len({r["trace_digest"] for r in reports}) > 1:
+        print("replays diverged" + (" (ROI changed between runs)" if args.roi_learning == "apply" else ""))
+
+
+if __name__ == "__main__":
+    main()
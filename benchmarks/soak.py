@@ -0,0 +1,371 @@
+"""
+长时间运行 (soak) 测试：内存 / 线程 / 句柄泄漏
+用 FishingCycleSimulator 合成完整钓鱼循环，让同一个 FishingBot 反复 "启动 -> 钓若干条鱼 -> 停止"：
+每次启动都在新线程中调用真实的 FishingBot.run() (与界面上点击启动/停止相同，截图句柄、状态检测线程池、
+ROI 自学习的保存和 finally 中的清理都走同一套代码)，钓够条数后清除 is_running 让它自行退出。
+日志送入一个与主窗口相同设置 (限制行数) 的 QTextEdit。运行期间定期采样：
+  - RSS、tracemalloc 跟踪的 Python 内存 (以及增长最多的分配位置)
+  - 线程数 (Python 线程与系统线程)、打开的文件句柄数
+每段停止后 (工作线程已退出，并先回收空闲内存) 记录一次空闲采样。前 WARMUP_RUNS 次为预热，之后内存的增长趋势、
+线程 / 句柄数相对预热结束时的增长超过阈值，或停止后仍有状态检测线程存活，即报告并返回非零退出码。
+
+Bot 注入 SimClock (画面经 ClockedFrameSource 按帧时间戳推进)：抛竿动画、拟人化延迟等等待不再真正睡眠，
+几分钟即可跑完上千个循环。状态检测固定使用 2 个匹配线程，保证每次启动都会创建、关闭线程池，
+线程数检查才有意义 (单核机器上自动选择为 1 时不建线程池)。
+使用 settings.json 的临时副本，匹配位置统计也写在临时目录中。
+
+用法:
+  python -m benchmarks.soak --cycles 1000 --cycles-per-run 20
+  python -m benchmarks.soak --cycles 200 --json soak_report.json
+"""
+import argparse
+import ctypes
+import gc
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from benchmarks.multi_client_sim import CycleInputBackend, FishingCycleSimulator
+from core.backends import NullWindowBackend
+from core.clock import SimClock
+from core.frame_source import ClockedFrameSource
+
+# 预热的启动次数：每次启动的新线程会让 glibc 新建 malloc arena，RSS 前几次阶梯上升后趋于平稳
+WARMUP_RUNS = 3
+# 预热结束时的基准：预热后前 BASELINE_SAMPLES 次空闲采样的最小值
+BASELINE_SAMPLES = 2
+# 相对基准的增长超过这些值即判定为泄漏
+RSS_GROWTH_LIMIT_MB = 8.0
+TRACED_GROWTH_LIMIT_MB = 2.0
+THREAD_GROWTH_LIMIT = 0
+FD_GROWTH_LIMIT = 0
+# 状态检测线程池的线程名前缀与 soak 使用的匹配线程数
+PROBE_THREAD_PREFIX = "probe"
+SOAK_PROBE_WORKERS = 2
+
+
+def rss_bytes():
+    """当前进程常驻内存；无法获取时返回 None"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def trim_heap():
+    """
+    空闲采样前回收垃圾并把 glibc malloc arena 中的空闲内存还给系统 (其他平台只做 gc)
+    否则 RSS 会随各线程 arena 中残留的空闲块在几个水平之间跳动 (本机相差约 30 MB)，掩盖真正的增长
+    """
+    gc.collect()
+    if sys.platform.startswith("linux"):
+        try:
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+        except (OSError, AttributeError):
+            pass
+
+
+def native_threads():
+    """系统线程数 (含 OpenCV / Qt 内部线程)，仅 Linux"""
+    try:
+        return len(os.listdir("/proc/self/task"))
+    except OSError:
+        return None
+
+
+def open_handles():
+    """打开的文件描述符数 (Linux) / 句柄数 (Windows，需要 psutil)"""
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().num_handles()
+    except (ImportError, AttributeError):
+        return None
+
+
+class LogSink:
+    """
+    接收 Bot 日志：有 PyQt6 时写入限制了行数的 QTextEdit (与主窗口一致)，否则只计数
+    Bot 在工作线程中发信号，QTextEdit 在主线程中，需要定期调用 pump() 处理排队的事件
+    """
+
+    def __init__(self, use_widget=True):
+        self.lines = 0
+        self.app = None
+        self.widget = None
+        if use_widget:
+            os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+            from PyQt6.QtWidgets import QApplication, QTextEdit
+            from gui.main_window import LOG_MAX_BLOCKS
+            self.app = QApplication.instance() or QApplication(sys.argv[:1])
+            self.widget = QTextEdit()
+            self.widget.setReadOnly(True)
+            self.widget.document().setMaximumBlockCount(LOG_MAX_BLOCKS)
+
+    def connect(self, bot):
+        bot.log_signal.connect(self._count)
+        if self.widget is not None:
+            bot.log_signal.connect(self.widget.append)
+
+    def _count(self, message):
+        self.lines += 1
+
+    def pump(self):
+        if self.app is not None:
+            self.app.processEvents()
+
+    def blocks(self):
+        return self.widget.document().blockCount() if self.widget is not None else None
+
+
+class _RunLimit:
+    """帧源包装：钓够 target 条或超过 deadline (真实时间) 后让 Bot 停止 (与界面点击停止相同，只清除 is_running)"""
+
+    def __init__(self, source, sim, bot, deadline):
+        self.source = source
+        self.sim = sim
+        self.bot = bot
+        self.deadline = deadline
+        self.target = 0
+
+    @property
+    def monitors(self):
+        return self.source.monitors
+
+    def grab(self, monitor):
+        if self.sim.counts["caught"] >= self.target or time.perf_counter() >= self.deadline:
+            self.bot.is_running = False
+        return self.source.grab(monitor)
+
+    def close(self):
+        self.source.close()
+
+
+def probe_threads():
+    """当前存活的状态检测线程数"""
+    return sum(1 for t in threading.enumerate() if t.name.startswith(PROBE_THREAD_PREFIX))
+
+
+def sample(t0, sim, sink, phase):
+    traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+    return {"t": time.perf_counter() - t0, "phase": phase, "caught": sim.counts["caught"],
+            "rss": rss_bytes(), "traced": traced, "threads": threading.active_count(),
+            "native_threads": native_threads(), "handles": open_handles(),
+            "probe_threads": probe_threads(), "log_lines": sink.lines, "log_blocks": sink.blocks()}
+
+
+def growth(samples, key):
+    """
+    预热后空闲采样的增长：最后三分之一 (至少 BASELINE_SAMPLES 次) 的最小值 - 预热结束时的基准
+    (前 BASELINE_SAMPLES 次的最小值)；两端取同样多的采样，次数少时不会只拿一次跳高的采样比较
+    用最小值而不是平均值：glibc 会在 malloc arena 之间来回归还内存，RSS 在两个水平之间跳动，
+    真正的泄漏会让 "底部" 也持续抬高
+    """
+    values = [s[key] for s in samples if s[key] is not None]
+    if len(values) < BASELINE_SAMPLES + 1:
+        return None
+    third = max(BASELINE_SAMPLES, len(values) // 3)
+    return min(values[-third:]) - min(values[:BASELINE_SAMPLES])
+
+
+def trend(samples, key):
+    """
+    预热后空闲采样的增长趋势：两两采样斜率的中位数 (Theil-Sen) x 采样间隔数，即按趋势推算的整段增长
+    OpenCV / Qt 偶尔一次性分配的内存会让 RSS 抬高一个台阶后保持不变，台阶两侧的采样对只占少数，
+    不影响中位数；每次运行都在增长的泄漏则让几乎所有斜率都为正
+    """
+    values = [s[key] for s in samples if s[key] is not None]
+    if len(values) < BASELINE_SAMPLES + 1:
+        return None
+    slopes = [(values[j] - values[i]) / (j - i) for i in range(len(values)) for j in range(i + 1, len(values))]
+    return statistics.median(slopes) * (len(values) - 1)
+
+
+def check(idle, warmup=WARMUP_RUNS):
+    """
+    按阈值判断泄漏，返回 (增长, 告警列表)
+    :param warmup: 跳过的前几次空闲采样 (固定次数，与总运行次数无关)
+    """
+    steady = idle[warmup:]
+    grow = {key: growth(steady, key) for key in ("rss", "traced", "native_threads", "threads", "handles")}
+    grow["rss_trend"] = trend(steady, "rss")
+    grow["traced_trend"] = trend(steady, "traced")
+    flags = []
+    mb = 1024 * 1024
+    if grow["rss_trend"] is not None and grow["rss_trend"] > RSS_GROWTH_LIMIT_MB * mb:
+        flags.append(f"RSS trend {grow['rss_trend'] / mb:+.1f} MB over {len(steady)} runs after warm-up "
+                     f"(floor {grow['rss'] / mb:+.1f} MB)")
+    if grow["traced_trend"] is not None and grow["traced_trend"] > TRACED_GROWTH_LIMIT_MB * mb:
+        flags.append(f"Python heap trend {grow['traced_trend'] / mb:+.1f} MB over {len(steady)} runs after warm-up")
+    for key, limit in (("threads", THREAD_GROWTH_LIMIT), ("native_threads", THREAD_GROWTH_LIMIT),
+                       ("handles", FD_GROWTH_LIMIT)):
+        if grow[key] is not None and grow[key] > limit:
+            flags.append(f"{key} grew by {grow[key]} between stopped runs")
+    if any(s["probe_threads"] for s in idle):
+        flags.append("probe threads still alive after the bot stopped")
+    return grow, flags
+
+
+def run_soak(cfg, cycles, cycles_per_run, fps=60.0, sample_interval=2.0, max_duration=None,
+             use_widget=True, trace=True, top=10, seed=0, verbose=False, **sim_kwargs):
+    from core.bot_logic import FishingBot
+
+    if trace:
+        tracemalloc.start()
+    sink = LogSink(use_widget)
+    clock = SimClock()
+    sim = FishingCycleSimulator(cfg.settings.images, seed=seed, clock=clock.time, **sim_kwargs)
+    bot = FishingBot(cfg, input_backend=CycleInputBackend(sim), window_backend=NullWindowBackend(), clock=clock)
+    sink.connect(bot)
+    if verbose:
+        bot.log_signal.connect(print)
+    # 工作线程中的异常由 run() 记入日志 (并继续执行清理)，这里收集下来作为失败原因
+    failures = []
+    bot.log_signal.connect(lambda message: failures.append(message) if message.startswith("❌") else None)
+
+    t0 = time.perf_counter()
+    deadline = t0 + max_duration if max_duration else float("inf")
+    source = _RunLimit(ClockedFrameSource(sim, clock, 1.0 / fps), sim, bot, deadline)
+    bot.vision.attach_source(source)
+    samples = []
+    idle = []
+    baseline_snapshot = None
+    runs = 0
+    run_probe_threads = [] # 每次运行期间观察到的最多状态检测线程数
+    while sim.counts["caught"] < cycles and time.perf_counter() < deadline:
+        source.target = min(cycles, sim.counts["caught"] + cycles_per_run)
+
+        # 每次启动一个新线程 (与 QThread.start 相同，截图句柄是线程相关的)
+        thread = threading.Thread(target=bot.run, name=f"soak-run-{runs}")
+        thread.start()
+        seen_probe_threads = 0
+        next_sample = time.perf_counter() + sample_interval
+        while thread.is_alive():
+            thread.join(0.05)
+            sink.pump()
+            seen_probe_threads = max(seen_probe_threads, probe_threads())
+            if time.perf_counter() >= next_sample:
+                next_sample += sample_interval
+                samples.append(sample(t0, sim, sink, "running"))
+        runs += 1
+        run_probe_threads.append(seen_probe_threads)
+        sink.pump()
+        trim_heap()
+        idle.append(sample(t0, sim, sink, "stopped"))
+        samples.append(idle[-1])
+        if trace and runs == 1:
+            baseline_snapshot = tracemalloc.take_snapshot()
+        if failures:
+            break
+        if verbose:
+            s = idle[-1]
+            print(f"run {runs}: caught {s['caught']}, rss {s['rss']}, threads {s['native_threads']}, "
+                  f"handles {s['handles']}, probe threads while running {seen_probe_threads}")
+
+    grow, flags = check(idle)
+    if failures:
+        flags.append(f"run failed: {failures[0]}")
+    if runs and not max(run_probe_threads):
+        # 没有线程池时，停止后线程数不变只能说明什么都没创建过
+        flags.append("no probe threads were started (probe_workers resolved to 1), thread check is meaningless")
+    if sink.blocks() is not None and sink.lines > 0 and sink.blocks() > sink.lines:
+        flags.append("log widget holds more blocks than lines logged")
+
+    allocators = []
+    if trace and baseline_snapshot is not None:
+        snapshot = tracemalloc.take_snapshot()
+        for stat in snapshot.compare_to(baseline_snapshot, "lineno")[:top]:
+            frame = stat.traceback[0]
+            allocators.append({"where": f"{frame.filename}:{frame.lineno}", "size_diff": stat.size_diff,
+                               "count_diff": stat.count_diff, "size": stat.size})
+        tracemalloc.stop()
+
+    wall = time.perf_counter() - t0
+    return {"wall_s": wall, "virtual_s": clock.time(), "runs": runs, "sim": sim.counts, "bot": dict(bot.stats),
+            "cycles_per_min": sim.counts["caught"] * 60.0 / max(wall, 1e-6),
+            "probe_threads": run_probe_threads,
+            "log_lines": sink.lines, "log_blocks": sink.blocks(),
+            "growth": grow, "flags": flags, "top_allocators": allocators,
+            "idle_samples": idle, "samples": samples}
+
+
+def main():
+    from utils.config_manager import ConfigManager
+
+    parser = argparse.ArgumentParser(description="长时间运行测试：内存 / 线程 / 句柄泄漏")
+    parser.add_argument("--cycles", type=int, default=300, help="总共钓多少条鱼")
+    parser.add_argument("--cycles-per-run", type=int, default=10, help="每次启动钓多少条后停止")
+    parser.add_argument("--fps", type=float, default=60.0, help="虚拟画面帧率")
+    parser.add_argument("--qte-duration", type=float, default=0.5, help="模拟小游戏时长 (秒)")
+    parser.add_argument("--sample-interval", type=float, default=2.0)
+    parser.add_argument("--max-duration", type=float, default=None, help="最长运行时间 (秒)")
+    parser.add_argument("--no-widget", action="store_true", help="日志不写入 QTextEdit")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="关闭 tracemalloc (降低开销)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--config", default="config/settings.json", help="作为模板的配置文件 (不会被修改)")
+    parser.add_argument("--json", metavar="PATH", help="保存完整报告 (含全部采样)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="soak_")
+    try:
+        config_path = os.path.join(workdir, "settings.json")
+        shutil.copy(args.config, config_path)
+        cfg = ConfigManager(config_path)
+        # 合成画面为 2K；游标消失后很快结束小游戏，缩短每个循环
+        # (虚拟时间下等待不耗时，耗时的是等待咬钩期间的状态检测：咬钩时间紧跟在 2 秒抛竿动画之后)
+        cfg.set('vision', 'ui_scale', 1.0)
+        cfg.set('game_params', 'cursor_timeout', 0.1)
+        cfg.set('vision', 'probe_workers', SOAK_PROBE_WORKERS)
+        report = run_soak(cfg, args.cycles, args.cycles_per_run, args.fps, args.sample_interval,
+                          args.max_duration, not args.no_widget, not args.no_tracemalloc, seed=args.seed,
+                          verbose=args.verbose, bite_delay=(2.5, 3.0), qte_duration=args.qte_duration,
+                          qte_speed=1200.0)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    mb = 1024 * 1024
+    print(f"{report['runs']} runs, {report['sim']['caught']} fish in {report['wall_s']:.0f}s "
+          f"({report['virtual_s']:.0f}s virtual, {report['cycles_per_min']:.0f}/min), "
+          f"{report['bot']['errors']} errors, "
+          f"log {report['log_lines']} lines / {report['log_blocks']} blocks kept")
+    print(f"{'t':>6s} {'caught':>6s} {'rss MB':>7s} {'heap MB':>7s} {'threads':>7s} {'native':>6s} {'handles':>7s}")
+    for s in report["idle_samples"]:
+        rss = f"{s['rss'] / mb:7.1f}" if s["rss"] is not None else f"{'-':>7s}"
+        traced = f"{s['traced'] / mb:7.2f}" if s["traced"] is not None else f"{'-':>7s}"
+        print(f"{s['t']:6.0f} {s['caught']:6d} {rss} {traced} {s['threads']:7d} "
+              f"{s['native_threads'] if s['native_threads'] is not None else '-':>6} "
+              f"{s['handles'] if s['handles'] is not None else '-':>7}")
+    if report["top_allocators"]:
+        print("top allocators since first run:")
+        for a in report["top_allocators"]:
+            print(f"  {a['size_diff'] / 1024:+9.1f} KB {a['count_diff']:+7d}  {a['where']}")
+    if report["flags"]:
+        print("LEAK SUSPECTED:")
+        for flag in report["flags"]:
+            print(f"  - {flag}")
+        sys.exit(1)
+    print("no growth trend detected")
+
+
+if __name__ == "__main__":
+    main()
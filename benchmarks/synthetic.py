@@ -0,0 +1,113 @@
+"""
+确定性合成画面
+  - make_screen(): 2K 背景 + 贴入 resources/images/templates 中的真实模板
+  - make_minigame_bar(): 小游戏进度条 (黄色命中区 + 白色游标)
+同一 seed 每次生成的像素完全相同，便于基准结果互相比较
+"""
+import os
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_DIR = os.path.join(ROOT, "resources", "images", "templates")
+
+SCREEN_SIZE = (2560, 1440)  # (w, h)
+
+# 模板在合成画面中的左上角位置：与默认 settings.json 的 ROI 对齐
+PLACEMENTS = {
+    "bite": (1260, 400),          # bite ROI (1169, 357, 220, 172) 内
+    "full_warning": (1100, 280),  # msg_tips ROI (865, 228, 810, 129) 内
+    "pos_error": (1050, 300),     # 同上 (与 full_warning 不会同时出现)
+    "cast": (2200, 1150),
+    "result": (1180, 640),
+    # 背包贩卖界面的按钮 (只在贩卖流程的画面中出现)
+    "btn_sell_mode": (2150, 1250),
+    "btn_select_all": (300, 1250),
+    "btn_check": (700, 1240),
+    "btn_confirm": (1560, 900),
+}
+DEFAULT_KEYS = ("bite", "full_warning", "cast", "result")
+
+# 小游戏默认位置 (与 rois.minigame 一致) 与配色 (BGR)
+MINIGAME_ROI = (985, 1227, 700, 69)
+BAR_BG = (92, 58, 34)         # 深蓝背景：不满足 yellow / cursor 阈值
+BAR_TRACK = (120, 84, 52)
+YELLOW = (40, 205, 245)
+CURSOR = (250, 250, 250)
+
+
+def load_template(key, images):
+    path = os.path.join(TEMPLATE_DIR, images[key])
+    img = cv2.imread(path, cv2.IMREAD_COLOR)
+    if img is None:
+        raise FileNotFoundError(path)
+    return img
+
+
+def make_background(size=SCREEN_SIZE, seed=0):
+    """带渐变和噪声的背景 (模拟游戏场景，避免纯色让匹配过于理想)"""
+    w, h = size
+    rng = np.random.default_rng(seed)
+    gy = np.linspace(40, 110, h, dtype=np.float32)[:, None]
+    gx = np.linspace(0, 50, w, dtype=np.float32)[None, :]
+    base = np.stack(np.broadcast_arrays(gy + gx, gy * 0.9 + gx * 0.5, gy * 0.6), axis=2)
+    noise = rng.normal(0, 6, (h, w, 3)).astype(np.float32)
+    return np.clip(base + noise, 0, 255).astype(np.uint8)
+
+
+def make_screen(images, keys=None, seed=0, with_minigame=True, cursor_x=320, zones=((280, 380),)):
+    """
+    生成一张 2K 合成截图
+    :param images: settings.json 中的 images 映射
+    :param keys: 需要贴入的模板 key，默认为 DEFAULT_KEYS
+    :return: (screen_bgr, {key: (center_x, center_y)})
+    """
+    screen = make_background(seed=seed)
+    expected = {}
+    if keys is None:
+        keys = DEFAULT_KEYS
+    for key in keys:
+        tpl = load_template(key, images)
+        x, y = PLACEMENTS[key]
+        h, w = tpl.shape[:2]
+        screen[y:y + h, x:x + w] = tpl
+        expected[key] = (x + w // 2, y + h // 2)
+
+    if with_minigame:
+        rx, ry, rw, rh = MINIGAME_ROI
+        screen[ry:ry + rh, rx:rx + rw] = make_minigame_bar(rw, rh, cursor_x, zones, seed=seed)
+    return screen, expected
+
+
+def make_minigame_bar(width=700, height=69, cursor_x=320, zones=((280, 380),), cursor_w=8,
+                      noise=4.0, seed=0):
+    """
+    生成小游戏进度条
+    :param cursor_x: 游标左边缘，None 表示游标不存在
+    :param zones: 黄色命中区 [(x0, x1), ...]
+    :param noise: 高斯噪声标准差
+    """
+    bar = np.empty((height, width, 3), dtype=np.uint8)
+    bar[:] = BAR_BG
+    top, bottom = height // 3, height - height // 3
+    bar[top:bottom] = BAR_TRACK
+    for x0, x1 in zones:
+        bar[top:bottom, int(x0):int(x1)] = YELLOW
+    if cursor_x is not None:
+        cx0, cx1 = max(int(cursor_x), 0), max(int(cursor_x) + cursor_w, 0)
+        bar[4:height - 4, cx0:cx1] = CURSOR
+        # 轨道上的游标为半透明叠加，黄色区域在游标下方仍保持连续
+        track = bar[top:bottom, cx0:cx1].astype(np.uint16)
+        under = np.empty_like(track)
+        under[:] = BAR_TRACK
+        for x0, x1 in zones:
+            lo, hi = max(int(x0) - cx0, 0), min(int(x1) - cx0, cx1 - cx0)
+            if lo < hi:
+                under[:, lo:hi] = YELLOW
+        bar[top:bottom, cx0:cx1] = ((track + under * 3) // 4).astype(np.uint8)
+    if noise:
+        rng = np.random.default_rng(seed)
+        jitter = rng.normal(0, noise, bar.shape)
+        bar = np.clip(bar.astype(np.float32) + jitter, 0, 255).astype(np.uint8)
+    return bar
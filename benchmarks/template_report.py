@@ -0,0 +1,119 @@
+"""
+模板预处理前后对比报告
+把所有模板贴在同一张合成背景上 (互为干扰项)，分别用完整模板 (vision.template_crop = false)
+和裁剪到核心区域的模板 (true) 在整张画面上匹配每个 key，输出：
+  - 模板尺寸与面积
+  - 匹配耗时 (多次重复取最小值，减少调度抖动)
+  - 真实位置的得分、其余位置的最高得分、两者之差 (得分余量，越大越不容易误识别)
+  - 返回的点击中心与真实中心的误差 (裁剪后应保持不变)
+
+用法:
+  python -m benchmarks.template_report
+  python -m benchmarks.template_report --json
+"""
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks import synthetic
+from core.vision import STATE_PROBES, Vision
+
+GRID_SIZE = (1600, 800)
+GRID_MARGIN = 40
+
+
+def make_board(images, seed=0):
+    """把全部模板按行排布在合成背景上，返回 (画面, {key: 真实中心})"""
+    board = synthetic.make_background(GRID_SIZE, seed=seed)
+    expected = {}
+    x, y, row_h = GRID_MARGIN, GRID_MARGIN, 0
+    for key in images:
+        tpl = synthetic.load_template(key, images)
+        h, w = tpl.shape[:2]
+        if x + w + GRID_MARGIN > GRID_SIZE[0]:
+            x, y, row_h = GRID_MARGIN, y + row_h + GRID_MARGIN, 0
+        board[y:y + h, x:x + w] = tpl
+        expected[key] = (x + w // 2, y + h // 2)
+        x += w + GRID_MARGIN
+        row_h = max(row_h, h)
+    return board, expected
+
+
+def measure_key(vision, key, board, gray_board, expected, repeat):
+    grayscale = STATE_PROBES.get(key, (None, None, False))[2]
+    screen = gray_board if grayscale else board
+    template = vision.template(key, grayscale)
+    mask = vision._masks.get(key)
+    th, tw = template.shape[:2]
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        found = vision.match_template(key, screen, confidence=0.0, grayscale=grayscale)
+        times.append((time.perf_counter() - start) * 1000.0)
+
+    res = cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED, mask=mask)
+    np.nan_to_num(res, copy=False, nan=-1.0, posinf=-1.0, neginf=-1.0)
+    ax, ay = vision._anchors[key]
+    tx, ty = expected[0] - ax, expected[1] - ay
+    score = float(res[ty, tx])
+    # 真实位置附近 (半个模板) 之外的最高得分
+    others = res.copy()
+    others[max(ty - th // 2, 0):ty + th // 2 + 1, max(tx - tw // 2, 0):tx + tw // 2 + 1] = -1.0
+    rival = float(others.max())
+    error = None if found is None else max(abs(found[0] - expected[0]), abs(found[1] - expected[1]))
+    return {"size": [tw, th], "area": tw * th, "masked": mask is not None, "grayscale": grayscale,
+            "match_ms": min(times), "score": score, "rival": rival,
+            "margin": score - rival, "center_error_px": error}
+
+
+def run_report(cfg, repeat=20, seed=0):
+    images = cfg.settings.images
+    board, expected = make_board(images, seed)
+    gray_board = cv2.cvtColor(board, cv2.COLOR_BGR2GRAY)
+
+    original = cfg.get('vision', 'template_crop', True)
+    report = {}
+    for variant, crop in (("full", False), ("core", True)):
+        cfg.set('vision', 'template_crop', crop)
+        vision = Vision(cfg)
+        vision.templates # 按当前设置生成模板
+        report[variant] = {key: measure_key(vision, key, board, gray_board, expected[key], repeat)
+                           for key in images if key in vision.templates}
+    cfg.set('vision', 'template_crop', original)
+    return report
+
+
+def main():
+    from utils.config_manager import ConfigManager
+
+    parser = argparse.ArgumentParser(description="模板裁剪 / 掩码前后对比")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    cfg = ConfigManager()
+    report = run_report(cfg, args.repeat, args.seed)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'key':14s} {'size':>9s} {'->':>2s} {'size':>9s} {'area%':>6s} {'ms':>7s} {'->':>2s} {'ms':>7s} "
+          f"{'margin':>7s} {'->':>2s} {'margin':>7s} {'err':>4s}")
+    full, core = report["full"], report["core"]
+    for key in full:
+        a, b = full[key], core[key]
+        print(f"{key:14s} {'%dx%d' % tuple(a['size']):>9s} {'':2s} {'%dx%d' % tuple(b['size']):>9s} "
+              f"{100.0 * b['area'] / a['area']:6.0f} {a['match_ms']:7.2f} {'':2s} {b['match_ms']:7.2f} "
+              f"{a['margin']:7.3f} {'':2s} {b['margin']:7.3f} {b['center_error_px'] if b['center_error_px'] is not None else '-':>4}")
+    total = lambda variant, field: sum(r[field] for r in report[variant].values())
+    print(f"total area {total('full', 'area')} -> {total('core', 'area')} px, "
+          f"match time {total('full', 'match_ms'):.2f} -> {total('core', 'match_ms'):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+输入 / 窗口后端
+Windows 专用的 pydirectinput、win32gui 只在真正创建 Win32 后端时才导入，
+这样整个包在 Linux 上也能导入 (使用 X11 或空实现)。
+"""
+import re
+import shutil
+import subprocess
+import sys
+import os
+
+
+class InputBackend:
+    """键鼠输入接口"""
+    name = "base"
+
+    def key_down(self, key):
+        raise NotImplementedError
+
+    def key_up(self, key):
+        raise NotImplementedError
+
+    def press(self, key):
+        self.key_down(key)
+        self.key_up(key)
+
+    def click(self, x, y):
+        raise NotImplementedError
+
+
+class WindowBackend:
+    """窗口查找 / 激活接口，handle 为后端自定义的不透明句柄"""
+    name = "base"
+
+    def find_window(self, title):
+        raise NotImplementedError
+
+    def find_windows(self, title):
+        """查找所有同名窗口 (多开)，默认只返回 find_window 的结果"""
+        handle = self.find_window(title)
+        return [] if handle is None else [handle]
+
+    def activate(self, handle):
+        raise NotImplementedError
+
+    def client_rect(self, handle):
+        """窗口客户区在屏幕上的位置 (x, y, w, h)，无法获取时返回 None"""
+        return None
+
+
+# ================= Windows =================
+
+class Win32InputBackend(InputBackend):
+    name = "win32"
+
+    def __init__(self):
+        import pydirectinput
+        # 极速模式：降低底层输入库的默认延迟
+        pydirectinput.PAUSE = 0.001
+        self._pdi = pydirectinput
+
+    def key_down(self, key):
+        self._pdi.keyDown(key)
+
+    def key_up(self, key):
+        self._pdi.keyUp(key)
+
+    def press(self, key):
+        self._pdi.press(key)
+
+    def click(self, x, y):
+        self._pdi.click(x, y)
+
+
+class Win32WindowBackend(WindowBackend):
+    name = "win32"
+
+    def __init__(self, input_backend=None):
+        import win32gui
+        import win32con
+        self._gui = win32gui
+        self._con = win32con
+        self._input = input_backend
+
+    def find_window(self, title):
+        return self._gui.FindWindow(None, title) or None
+
+    def find_windows(self, title):
+        handles = []
+
+        def collect(hwnd, _):
+            if self._gui.IsWindowVisible(hwnd) and self._gui.GetWindowText(hwnd) == title:
+                handles.append(hwnd)
+            return True
+
+        self._gui.EnumWindows(collect, None)
+        return handles
+
+    def activate(self, handle):
+        # 如果最小化了，先还原
+        if self._gui.IsIconic(handle):
+            self._gui.ShowWindow(handle, self._con.SW_RESTORE)
+
+        # 尝试置顶
+        # 注意：Windows 限制应用抢占焦点，有时需要 Alt 键辅助或多次尝试
+        try:
+            self._gui.SetForegroundWindow(handle)
+        except Exception:
+            if self._input is None:
+                raise
+            # 如果常规置顶失败，尝试用 shell 方式
+            self._input.press('alt')
+            self._gui.SetForegroundWindow(handle)
+        return True
+
+    def client_rect(self, handle):
+        left, top, right, bottom = self._gui.GetClientRect(handle)
+        x, y = self._gui.ClientToScreen(handle, (left, top))
+        return (x, y, right - left, bottom - top)
+
+
+# ================= Linux / X11 (xdotool) =================
+
+# 按键名到 X keysym 的映射 (其余按原样传入)
+_X11_KEYS = {'esc': 'Escape', 'space': 'space', 'alt': 'alt', 'enter': 'Return'}
+
+
+def _xdotool(*args):
+    return subprocess.run(["xdotool", *args], capture_output=True, text=True)
+
+
+class X11InputBackend(InputBackend):
+    name = "x11"
+
+    def key_down(self, key):
+        _xdotool("keydown", _X11_KEYS.get(key, key))
+
+    def key_up(self, key):
+        _xdotool("keyup", _X11_KEYS.get(key, key))
+
+    def press(self, key):
+        _xdotool("key", _X11_KEYS.get(key, key))
+
+    def click(self, x, y):
+        _xdotool("mousemove", str(int(x)), str(int(y)), "click", "1")
+
+
+class X11WindowBackend(WindowBackend):
+    name = "x11"
+
+    def find_window(self, title):
+        handles = self.find_windows(title)
+        return handles[0] if handles else None
+
+    def find_windows(self, title):
+        # xdotool --name 按正则匹配，标题中的 ( ) . 等字符需要转义
+        pattern = f"^{re.escape(title)}$"
+        return [int(h) for h in _xdotool("search", "--name", pattern).stdout.split()]
+
+    def activate(self, handle):
+        return _xdotool("windowactivate", "--sync", str(handle)).returncode == 0
+
+    def client_rect(self, handle):
+        out = _xdotool("getwindowgeometry", "--shell", str(handle)).stdout
+        geo = dict(line.split("=", 1) for line in out.splitlines() if "=" in line)
+        if not all(k in geo for k in ("X", "Y", "WIDTH", "HEIGHT")):
+            return None
+        return (int(geo["X"]), int(geo["Y"]), int(geo["WIDTH"]), int(geo["HEIGHT"]))
+
+
+# ================= 空实现 (无界面环境 / 测试) =================
+
+class NullInputBackend(InputBackend):
+    """丢弃所有输入"""
+    name = "null"
+
+    def key_down(self, key):
+        pass
+
+    def key_up(self, key):
+        pass
+
+    def click(self, x, y):
+        pass
+
+
+class NullWindowBackend(WindowBackend):
+    """
+    虚拟窗口 (离线调试 / 模拟器)
+    :param present: True = 总是"找到"并激活一个虚拟窗口；
+                    False = 找不到任何窗口 (auto 回退到空实现时使用，避免在没有游戏的情况下假装找到窗口)
+    """
+    name = "null"
+
+    def __init__(self, present=True):
+        self.present = present
+
+    def find_window(self, title):
+        return 0 if self.present else None
+
+    def activate(self, handle):
+        return True
+
+
+_fallback_warned = False
+
+
+def _resolve(name):
+    """
+    auto -> 按平台选择后端
+    :return: (后端名称, 是否为 auto 回退到的空实现)
+    """
+    global _fallback_warned
+    if name and name != "auto":
+        return name, False
+    if sys.platform == "win32":
+        return "win32", False
+    if os.environ.get("DISPLAY") and shutil.which("xdotool"):
+        return "x11", False
+    if not _fallback_warned:
+        _fallback_warned = True
+        print("[Backends] 警告: 未检测到 Win32 或 X11 (DISPLAY + xdotool)，输入/窗口后端回退为空实现："
+              "不会发送任何按键，也找不到游戏窗口。离线调试请在 settings.json 中显式设置 backend: null")
+    return "null", True
+
+
+def create_input_backend(name="auto"):
+    """按名称创建输入后端：auto / win32 / x11 / null"""
+    name, _ = _resolve(name)
+    if name == "win32":
+        return Win32InputBackend()
+    if name == "x11":
+        return X11InputBackend()
+    return NullInputBackend()
+
+
+def create_window_backend(name="auto", input_backend=None):
+    """按名称创建窗口后端：auto / win32 / x11 / null"""
+    name, fallback = _resolve(name)
+    if name == "win32":
+        return Win32WindowBackend(input_backend)
+    if name == "x11":
+        return X11WindowBackend()
+    # 只有显式选择 null 时才假装找到窗口
+    return NullWindowBackend(present=not fallback)
@@ -1,349 +1,545 @@
-import time
-import random
-import cv2
-import numpy as np
-import pydirectinput
-import win32gui
-import win32con
-from PyQt6.QtCore import QThread, pyqtSignal
-
-from core.vision import Vision
-from utils.config_manager import ConfigManager
-
-class FishingBot(QThread):
-    # 信号定义：用于通知 GUI 更新
-    log_signal = pyqtSignal(str)      # 日志消息
-    status_signal = pyqtSignal(str)   # 状态变更 (e.g. "运行中", "暂停")
-    
-    def __init__(self, config_manager: ConfigManager):
-        super().__init__()
-        self.cfg = config_manager
-        self.vision = Vision(config_manager)
-        
-        # 运行控制标志
-        self.is_running = False
-        
-        # 优化输入延迟
-        # 极速模式：降低底层输入库的默认延迟
-        pydirectinput.PAUSE = 0.001
-        
-    def log(self, message):
-        """发送日志信号"""
-        self.log_signal.emit(message)
-
-    def stop(self):
-        """外部停止指令"""
-        self.is_running = False
-        self.log("🛑 正在停止脚本...")
-
-    def activate_window(self):
-        """尝试激活游戏窗口"""
-        title = self.cfg.get("window_title", default="BrownDust II")
-        hwnd = win32gui.FindWindow(None, title)
-        if hwnd:
-            try:
-                # 如果最小化了，先还原
-                if win32gui.IsIconic(hwnd):
-                    win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
-                
-                # 尝试置顶
-                # 注意：Windows 限制应用抢占焦点，有时需要 Alt 键辅助或多次尝试
-                try:
-                    win32gui.SetForegroundWindow(hwnd)
-                except Exception:
-                    # 如果常规置顶失败，尝试用 shell 方式
-                    pydirectinput.press('alt')
-                    win32gui.SetForegroundWindow(hwnd)
-                
-                time.sleep(0.5) # 给窗口动画一点时间
-                return True
-            except Exception as e:
-                self.log(f"❌ 窗口激活失败: {e}")
-        return False
-
-    # ================= 🎭 拟人化动作 =================
-
-    def _random_sleep(self, base_time, variance_key='reaction_delay'):
-        """
-        拟人化延迟
-        :param base_time: 基础时间 (秒)
-        :param variance_key: 配置文件中的拟人化参数键名
-        """
-        human_cfg = self.cfg.get('humanization')
-        
-        # 如果关闭了随机延迟，直接 sleep
-        if not human_cfg.get('enable_random_delay', True):
-            time.sleep(base_time)
-            return
-
-        # 获取波动范围
-        jitter = 0.0
-        if variance_key == 'reaction_delay':
-            # 反应时间波动
-            mn = human_cfg.get('reaction_delay_min', 0.05)
-            mx = human_cfg.get('reaction_delay_max', 0.15)
-            jitter = random.uniform(mn, mx)
-        elif variance_key == 'cast':
-            # 抛竿时间波动 (百分比)
-            var = human_cfg.get('cast_variance', 0.1)
-            jitter = random.uniform(-var, var) * base_time
-            
-        final_time = max(0, base_time + jitter)
-        time.sleep(final_time)
-
-    def _human_press(self, key, duration=None):
-        """拟人化按键"""
-        if duration is None:
-            # 快速点击，但也有一点点持续时间
-            duration = random.uniform(0.05, 0.1)
-        
-        pydirectinput.keyDown(key)
-        time.sleep(duration)
-        pydirectinput.keyUp(key)
-
-    def _human_click(self, point):
-        """拟人化鼠标点击"""
-        if not point: return
-        
-        offset = self.cfg.get('humanization', 'click_offset_pixels', 5)
-        
-        # 生成高斯分布的随机偏移，这样点击点会集中在中心，但也偶尔会偏一点
-        dx = int(random.gauss(0, offset/2))
-        dy = int(random.gauss(0, offset/2))
-        
-        # 限制最大偏移，防止点歪太远
-        dx = max(-offset, min(offset, dx))
-        dy = max(-offset, min(offset, dy))
-        
-        target_x = point[0] + dx
-        target_y = point[1] + dy
-        
-        pydirectinput.click(target_x, target_y)
-
-    # ================= 🎮 核心业务逻辑 =================
-
-    def play_minigame(self, region):
-        """小游戏循环 (高性能模式)"""
-        self.log("🎮 进入小游戏模式")
-        
-        # 缓存参数，避免循环内频繁读取字典
-        game_params = self.cfg.get('game_params')
-        hit_cooldown = game_params.get('hit_cooldown', 0.02)
-        timeout = game_params.get('cursor_timeout', 1.0)
-        
-        y_low, y_high = self.cfg.get_color_bounds('yellow')
-        c_low, c_high = self.cfg.get_color_bounds('cursor')
-        
-        last_hit_time = 0
-        cursor_missing_start = 0
-
-        # [性能优化] 预计算 mss 截图区域，避免在循环中重复创建字典，减少 GC 压力
-        monitor = {
-            "left": int(region[0]),
-            "top": int(region[1]),
-            "width": int(region[2]),
-            "height": int(region[3])
-        }
-        
-        # 极速检测循环 (High Performance Loop)
-        while self.is_running:
-            # 1. 屏幕捕获 (Direct MSS Call)
-            # 直接调用 mss.grab 绕过封装层，减少函数调用开销
-            sct_img = self.vision.sct.grab(monitor)
-            img_np = np.array(sct_img)
-            
-            # 2. 色彩空间转换 (BGRA -> BGR -> HSV)
-            # 移除透明通道并转换为 HSV 空间，为颜色阈值过滤做准备
-            img_bgr = cv2.cvtColor(img_np, cv2.COLOR_BGRA2BGR)
-            img_hsv = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2HSV)
-            
-            # 3. 识别游标
-            mask_cursor = cv2.inRange(img_hsv, c_low, c_high)
-            contours_c, _ = cv2.findContours(mask_cursor, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            cursor_x = -1
-            cursor_w = 0
-            
-            # 找最大轮廓作为游标
-            if contours_c:
-                # 使用 max key 快速找到最大轮廓
-                max_cnt = max(contours_c, key=cv2.contourArea)
-                if cv2.contourArea(max_cnt) > 20:
-                    x, y, w, h = cv2.boundingRect(max_cnt)
-                    if h > 5: # 简单过滤
-                        cursor_x = x
-                        cursor_w = w
-
-            # === 退出判定: 游标消失超时 ===
-            if cursor_x == -1:
-                if cursor_missing_start == 0:
-                    cursor_missing_start = time.time()
-                elif time.time() - cursor_missing_start > timeout:
-                    self.log("🏁 小游戏结束 (游标消失)")
-                    return
-            else:
-                cursor_missing_start = 0
-
-            # 4. 命中判定
-            now = time.time()
-            if cursor_x != -1 and (now - last_hit_time > hit_cooldown):
-                mask_yellow = cv2.inRange(img_hsv, y_low, y_high)
-                contours_y, _ = cv2.findContours(mask_yellow, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-                
-                cursor_center = cursor_x + cursor_w // 2
-                
-                is_hit = False
-                for cnt in contours_y:
-                    if cv2.contourArea(cnt) > 20:
-                        yx, yy, yw, yh = cv2.boundingRect(cnt)
-                        # 判定：游标中心点是否在黄条横坐标范围内
-                        if yx <= cursor_center <= yx + yw:
-                            is_hit = True
-                            break
-                
-                if is_hit:
-                    # 🎯 命中！执行拟人化按键
-                    # 计算按压时长：稍微随机一点，0.02s - 0.05s
-                    press_duration = random.uniform(0.02, 0.05)
-                    self._human_press('space', press_duration)
-                    
-                    self.log(f"⚡️ HIT! (dur: {press_duration:.3f}s)")
-                    last_hit_time = time.time()
-
-            # 极短休眠让出CPU，但不能太长否则掉帧
-            # time.sleep(0.001) 
-
-    def handle_selling(self):
-        """自动贩卖流程"""
-        self.log("🎒 背包已满，尝试清理...")
-        self._human_press('t', 0.1)
-        time.sleep(2.5) # 等待UI打开
-        
-        # 步骤列表: (图片key, 描述, 延迟)
-        steps = [
-            ('btn_sell_mode', "点击贩卖模式", 1.0),
-            ('btn_select_all', "点击全选", 0.5),
-            ('btn_check', "点击确认选择", 1.0),
-            ('btn_confirm', "确认贩卖", 2.0)
-        ]
-        
-        for key, desc, delay in steps:
-            if not self.is_running: return False
-            
-            loc = self.vision.find_template(key)
-            if loc:
-                self.log(f"   -> {desc}")
-                self._human_click(loc)
-                time.sleep(delay)
-            else:
-                if key == 'btn_sell_mode':
-                    self.log("❌ 未找到贩卖按钮，可能在错误的界面")
-                    self._human_press('esc')
-                    return False
-                # 后续步骤没找到可能是不需要点（比如全选已经是全选状态），继续尝试
-        
-        # 退出背包
-        self._human_press('esc')
-        time.sleep(1.5)
-        self.log("✅ 清理完成")
-        return True
-
-    def run(self):
-        """工作线程主入口"""
-        # 1. 在子线程内部初始化 mss
-        self.vision.init_manager()
-        
-        self.is_running = True
-        self.status_signal.emit("运行中")
-        
-        # 2. 强制激活游戏窗口 (解决焦点在脚本导致误触停止的问题)
-        if not self.activate_window():
-            self.log("❌ 未找到游戏窗口！请确保游戏已启动。")
-            self.status_signal.emit("启动失败")
-            self.vision.release()
-            return
-
-        self.log("🚀 自动化系统已启动")
-        
-        waiting_for_game = False
-        
-        try:
-            while self.is_running:
-                # 1. 异常检测 (结算界面、错误提示)
-                # 使用灰度匹配加快速度
-                if self.vision.find_template('result', confidence=0.7, grayscale=True):
-                    self.log("💰 检测到结算画面")
-                    self._human_press('esc')
-                    time.sleep(2.0)
-                    waiting_for_game = False
-                    continue
-
-                # 优先使用配置的提示信息区域
-                msg_roi = self.cfg.get('rois', 'msg_tips')
-
-                if self.vision.find_template('pos_error', region=msg_roi, confidence=0.7):
-                    self.log("⚠️ 位置错误，尝试修正...")
-                    self._human_press('s', 0.3) # 后退一步
-                    time.sleep(1.0)
-                    waiting_for_game = False
-                    continue
-                
-                # 2. 背包满检测
-                if self.vision.find_template('full_warning', region=msg_roi, confidence=0.75):
-                    if not self.handle_selling():
-                        # 贩卖失败，停止脚本保护现场
-                        self.log("❌ 无法清理背包，脚本停止")
-                        self.stop()
-                        self.status_signal.emit("异常停止")
-                        break
-                    waiting_for_game = False
-                    continue
-
-                # 3. 咬钩检测
-                # 咬钩图标通常颜色鲜艳，用彩色匹配
-                # 优先使用配置的局部区域，提高速度和抗干扰能力
-                bite_roi = self.cfg.get('rois', 'bite')
-                if self.vision.find_template('bite', region=bite_roi):
-                    self.log("🎣 咬钩！拉杆！")
-                    self._human_press('space')
-                    
-                    # 获取小游戏区域 (从配置读取)
-                    roi = self.cfg.get('rois', 'minigame')
-                    if roi:
-                        self.play_minigame(roi)
-                    else:
-                        self.log("❌ 未配置小游戏区域 ROI")
-                    
-                    waiting_for_game = True
-                    continue
-
-                # 4. 抛竿检测
-                # 只有在还没进入“等待上钩”状态时才抛竿
-                # 或者如果等太久了(waiting_for_game逻辑需要在外面加个超时重置，这里简化处理)
-                if self.vision.find_template('cast', confidence=0.7, grayscale=True):
-                    # 如果之前在等鱼，说明鱼脱钩了或者上一轮结束了，重置状态
-                    if waiting_for_game:
-                        waiting_for_game = False
-                    
-                    self.log("🌊 抛竿...")
-                    
-                    # 蓄力抛竿
-                    cast_duration = self.cfg.get('game_params', 'cast_duration', 0.5)
-                    self._human_press('space', duration=cast_duration)
-                    
-                    # 抛竿后会有动画，休息一下
-                    time.sleep(2.0)
-                    continue
-
-                # 没什么事发生，稍微休息，降低CPU占用
-                time.sleep(0.1)
-
-        except Exception as e:
-            self.log(f"❌ 发生未捕获异常: {e}")
-            time.sleep(1)
-        finally:
-            # 关键：无论如何退出（包括报错），都释放 mss 资源
-            # 防止下次启动时出现 '_thread._local' object has no attribute 'srcdc'
-            self.vision.release()
-            self.status_signal.emit("已停止")
-            self.log("🛑 脚本已结束 (资源已释放)")
+import random
+import cv2
+import numpy as np
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from core.vision import Vision
+from core.backends import create_input_backend, create_window_backend
+from core.clock import RealClock
+from core.probe_executor import ProbeExecutor
+from core.roi_learner import RoiLearner, report_lines, stats_path
+from core.window_tracker import WindowTracker
+from utils.config_manager import ConfigManager
+
+# 扫描带校准：在开局若干帧内统计游标 / 黄条所在的行
+BAND_CALIBRATION_FRAMES = 5 # 同时看到游标和黄条的帧数达到该值即确定扫描带
+BAND_CALIBRATION_MAX_FRAMES = 120 # 超过该帧数仍未确定则放弃，继续截取完整 ROI
+
+class MinigameSession:
+    """
+    一局小游戏的状态，每次 step() 处理一帧
+    单窗口时由 FishingBot.play_minigame 连续驱动；多窗口时由调度器在帧之间穿插其他客户端
+    """
+    def __init__(self, bot, region):
+        self.bot = bot
+        self.vision = bot.vision
+        self.clock = bot.clock
+
+        # 缓存参数快照，循环内不再访问配置
+        settings = bot.cfg.settings
+        self.hit_cooldown = settings.hit_cooldown
+        self.timeout = settings.cursor_timeout
+        self.poll_interval = settings.minigame_poll_interval
+        
+        self.y_low, self.y_high = settings.color_bounds('yellow')
+        self.c_low, self.c_high = settings.color_bounds('cursor')
+        
+        self.last_hit_time = 0
+        self.cursor_missing_start = 0
+        self.frames = 0
+        self.hits = 0
+        self.start_time = self.clock.time()
+
+        # [性能优化] 预计算 mss 截图区域，避免在循环中重复创建字典，减少 GC 压力
+        self.full_monitor = {
+            "left": int(region[0]),
+            "top": int(region[1]),
+            "width": int(region[2]),
+            "height": int(region[3])
+        }
+        self.monitor = self.full_monitor
+        self.captured_rows = 0
+
+        # [性能优化] 扫描带：校准后只截取游标和黄条所在的几行
+        self.band = None
+        self.calibrating = settings.minigame_band
+        self.calib_frames = 0
+        self.calib_hits = 0
+        self.cursor_rows = np.zeros(self.full_monitor["height"], dtype=bool)
+        self.zone_rows = np.zeros(self.full_monitor["height"], dtype=bool)
+
+    def step(self):
+        """处理一帧，小游戏结束 (游标消失超时) 时返回 False"""
+        vision = self.vision
+
+        # 1. 屏幕捕获 (Direct MSS Call)
+        # 直接调用 mss.grab 绕过封装层，减少函数调用开销
+        sct_img = vision.sct.grab(self.monitor)
+        img_np = np.array(sct_img)
+        self.frames += 1
+        self.captured_rows += self.monitor["height"]
+        
+        # 2. 色彩空间转换 (BGRA -> BGR -> HSV)
+        # 移除透明通道并转换为 HSV 空间，为颜色阈值过滤做准备
+        img_bgr = cv2.cvtColor(img_np, cv2.COLOR_BGRA2BGR)
+        img_hsv = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2HSV)
+        
+        # 3. 识别游标
+        cursor_x, cursor_w = vision.locate_cursor(img_hsv, self.c_low, self.c_high)
+
+        if self.calibrating:
+            self._calibrate(img_hsv, cursor_x)
+        elif cursor_x == -1 and self.band is not None and self.cursor_missing_start == 0:
+            # 扫描带内刚丢失游标：用完整 ROI 复查一次，区分小游戏结束和扫描带失效
+            img_np = np.array(vision.sct.grab(self.full_monitor))
+            self.captured_rows += self.full_monitor["height"]
+            img_hsv = cv2.cvtColor(cv2.cvtColor(img_np, cv2.COLOR_BGRA2BGR), cv2.COLOR_BGR2HSV)
+            cursor_x, cursor_w = vision.locate_cursor(img_hsv, self.c_low, self.c_high)
+            if cursor_x != -1:
+                self.bot.log("📏 游标不在扫描带内，恢复截取完整区域")
+                self.band = None
+                self.monitor = self.full_monitor
+
+        # === 退出判定: 游标消失超时 ===
+        if cursor_x == -1:
+            if self.cursor_missing_start == 0:
+                self.cursor_missing_start = self.clock.time()
+            elif self.clock.time() - self.cursor_missing_start > self.timeout:
+                self.finish()
+                return False
+        else:
+            self.cursor_missing_start = 0
+
+        # 4. 命中判定
+        now = self.clock.time()
+        if cursor_x != -1 and (now - self.last_hit_time > self.hit_cooldown):
+            cursor_center = cursor_x + cursor_w // 2
+            
+            if vision.in_color_zone(img_hsv, cursor_center, self.y_low, self.y_high):
+                # 🎯 命中！执行拟人化按键
+                # 计算按压时长：稍微随机一点，0.02s - 0.05s
+                press_duration = random.uniform(0.02, 0.05)
+                self.bot._human_press('space', press_duration)
+                
+                self.bot.log(f"⚡️ HIT! (dur: {press_duration:.3f}s)")
+                self.last_hit_time = self.clock.time()
+                self.hits += 1
+        return True
+
+    def _calibrate(self, img_hsv, cursor_x):
+        """累积游标 / 黄条所在的行，样本足够后切换为只截取扫描带"""
+        self.calib_frames += 1
+        if cursor_x != -1:
+            zone_rows = np.count_nonzero(cv2.inRange(img_hsv, self.y_low, self.y_high), axis=1) >= 2
+            if zone_rows.any():
+                cursor = cv2.inRange(img_hsv, self.c_low, self.c_high)
+                self.cursor_rows |= np.count_nonzero(cursor, axis=1) >= 2
+                self.zone_rows |= zone_rows
+                self.calib_hits += 1
+
+        if self.calib_hits >= BAND_CALIBRATION_FRAMES:
+            self.calibrating = False
+            band = self.vision.scanline_band(self.cursor_rows, self.zone_rows)
+            if band is not None:
+                y0, y1 = band
+                self.band = band
+                self.monitor = dict(self.full_monitor, top=self.full_monitor["top"] + y0, height=y1 - y0)
+                self.bot.log(f"📏 扫描带: 第 {y0}-{y1} 行 ({y1 - y0}/{self.full_monitor['height']} 行)")
+        elif self.calib_frames >= BAND_CALIBRATION_MAX_FRAMES:
+            self.calibrating = False
+
+    def finish(self):
+        """记录统计并输出结束日志"""
+        frames, hits = self.frames, self.hits
+        elapsed = self.clock.time() - self.start_time
+        rows = self.captured_rows / max(frames, 1)
+        bytes_per_frame = rows * self.full_monitor["width"] * 4 # BGRA
+        bot = self.bot
+        bot.last_minigame_stats = {"frames": frames, "hits": hits, "elapsed": elapsed,
+                                   "rows_per_frame": rows, "full_rows": self.full_monitor["height"],
+                                   "bytes_per_frame": bytes_per_frame, "band": self.band}
+        bot.stats["minigames"] += 1
+        bot.stats["frames"] += frames
+        bot.stats["hits"] += hits
+        bot.log(f"🏁 小游戏结束 (游标消失) | {frames} 帧, {frames / max(elapsed, 1e-6):.0f} fps, 命中 {hits} 次 | "
+                f"每帧 {rows:.1f}/{self.full_monitor['height']} 行, {bytes_per_frame / 1024:.1f} KB")
+
+
+class FishingBot(QThread):
+    # 信号定义：用于通知 GUI 更新
+    log_signal = pyqtSignal(str)      # 日志消息
+    status_signal = pyqtSignal(str)   # 状态变更 (e.g. "运行中", "暂停")
+    
+    def __init__(self, config_manager: ConfigManager, input_backend=None, window_backend=None, clock=None):
+        super().__init__()
+        self.cfg = config_manager
+        self.vision = Vision(config_manager)
+
+        # 时钟：所有等待和计时都经过它 (回放时注入 SimClock，见 core.clock)
+        self.clock = clock if clock is not None else RealClock()
+        
+        # 输入/窗口后端：未指定时按配置在首次使用时创建 (避免启动时导入 Windows 库)
+        self._input = input_backend
+        self._window = window_backend
+        
+        # 运行控制标志
+        self.is_running = False
+        
+        # 最近一次小游戏的统计 (帧数 / 命中次数 / 耗时)
+        self.last_minigame_stats = None
+
+        # 累计统计 (多窗口调度器 / 指标端点读取)
+        # 键在此处固定，之后只做整数累加，其他线程可以随时读取快照
+        self.stats = {"ticks": 0, "casts": 0, "bites": 0, "minigames": 0, "frames": 0, "hits": 0,
+                      "sells": 0, "errors": 0}
+
+        # 当前状态 (供指标端点展示)：stopped / idle / waiting / minigame / result / pos_error / selling
+        self.state = "stopped"
+
+        # 主循环状态：正在进行的小游戏 / 是否在等待上钩
+        self.minigame = None
+        self.waiting_for_game = False
+
+        # 并行状态检测线程池 (首次 tick 时创建)
+        self.probes = None
+        
+        # 最近一次找到的游戏窗口句柄，及其客户区位置缓存
+        self.hwnd = None
+        self.tracker = None
+        
+    @property
+    def input(self):
+        if self._input is None:
+            self._input = create_input_backend(self.cfg.settings.backend)
+        return self._input
+
+    @property
+    def window(self):
+        if self._window is None:
+            self._window = create_window_backend(self.cfg.settings.backend, self.input)
+        return self._window
+        
+    def log(self, message):
+        """发送日志信号"""
+        self.log_signal.emit(message)
+
+    def stop(self):
+        """外部停止指令"""
+        self.is_running = False
+        self.log("🛑 正在停止脚本...")
+
+    def activate_window(self):
+        """尝试激活游戏窗口"""
+        title = self.cfg.settings.window_title
+        hwnd = self.window.find_window(title)
+        if hwnd is not None:
+            self.hwnd = hwnd
+            try:
+                if not self.window.activate(hwnd):
+                    return False
+                
+                self.clock.sleep(0.5) # 给窗口动画一点时间
+
+                # 窗口可能被还原 / 移动过，重新记录客户区位置
+                if self.tracker is None:
+                    self.tracker = WindowTracker(self.window, clock=self.clock.time)
+                    self.vision.tracker = self.tracker
+                self.tracker.attach(hwnd)
+                return True
+            except Exception as e:
+                self.log(f"❌ 窗口激活失败: {e}")
+        return False
+
+    def calibrate_scale(self):
+        """
+        确定游戏 UI 缩放并切换到对应尺寸的模板 (每个进程只需一次)
+        能取到窗口客户区尺寸时直接换算，否则由 Vision 做一次多尺度扫描
+        """
+        if self.vision.scale_calibrated and self.cfg.settings.ui_scale is None:
+            return
+        client = self.tracker.size() if self.tracker is not None else None
+        scale = self.vision.calibrate_scale(client)
+        if scale is None:
+            self.log("⚠️ 未能识别 UI 缩放 (请停留在抛竿界面重试)，暂按 1.00 处理")
+        else:
+            self.log(f"📐 UI 缩放: {scale:.2f}")
+
+    def start_roi_learning(self):
+        """按 vision.roi_learning 载入匹配位置统计，之后每次匹配成功都会记录位置"""
+        settings = self.cfg.settings
+        if settings.roi_learning == "off":
+            self.vision.learner = None
+            return
+        self.vision.learner = RoiLearner.load(stats_path(self.cfg), self.vision.scale, settings.roi_space)
+
+    def finish_roi_learning(self):
+        """保存匹配位置统计，输出调整 ROI 的建议 (apply 模式下只把 rois 写入配置文件)"""
+        learner = self.vision.learner
+        if learner is None:
+            return
+        self.vision.learner = None
+        try:
+            if self.vision.sct is not None:
+                mon = self.vision.sct.monitors[1]
+                learner.screen = (int(mon["width"]), int(mon["height"]))
+            learner.save()
+            settings = self.cfg.settings
+            suggestions = learner.suggestions(settings)
+            for line in report_lines(learner, settings, suggestions):
+                self.log(line)
+            if suggestions and settings.roi_learning == "apply":
+                learner.apply(self.cfg, suggestions)
+                self.log("📐 已调整 ROI 并写入 settings.json (python -m core.roi_learner --reset 可恢复)")
+        except Exception as e:
+            self.log(f"⚠️ 匹配位置统计保存失败: {e}")
+
+    # ================= 🎭 拟人化动作 =================
+
+    def _random_sleep(self, base_time, variance_key='reaction_delay'):
+        """
+        拟人化延迟
+        :param base_time: 基础时间 (秒)
+        :param variance_key: 配置文件中的拟人化参数键名
+        """
+        settings = self.cfg.settings
+        
+        # 如果关闭了随机延迟，直接 sleep
+        if not settings.enable_random_delay:
+            self.clock.sleep(base_time)
+            return
+
+        # 获取波动范围
+        jitter = 0.0
+        if variance_key == 'reaction_delay':
+            # 反应时间波动
+            jitter = random.uniform(settings.reaction_delay_min, settings.reaction_delay_max)
+        elif variance_key == 'cast':
+            # 抛竿时间波动 (百分比)
+            var = settings.cast_variance
+            jitter = random.uniform(-var, var) * base_time
+            
+        final_time = max(0, base_time + jitter)
+        self.clock.sleep(final_time)
+
+    def _human_press(self, key, duration=None):
+        """拟人化按键"""
+        if duration is None:
+            # 快速点击，但也有一点点持续时间
+            duration = random.uniform(0.05, 0.1)
+        
+        self.input.key_down(key)
+        self.clock.sleep(duration)
+        self.input.key_up(key)
+
+    def _human_click(self, point):
+        """拟人化鼠标点击"""
+        if not point: return
+        
+        offset = self.cfg.settings.click_offset_pixels
+        
+        # 生成高斯分布的随机偏移，这样点击点会集中在中心，但也偶尔会偏一点
+        dx = int(random.gauss(0, offset/2))
+        dy = int(random.gauss(0, offset/2))
+        
+        # 限制最大偏移，防止点歪太远
+        dx = max(-offset, min(offset, dx))
+        dy = max(-offset, min(offset, dy))
+        
+        target_x = point[0] + dx
+        target_y = point[1] + dy
+        
+        self.input.click(target_x, target_y)
+
+    # ================= 🎮 核心业务逻辑 =================
+
+    def start_minigame(self, region):
+        """创建一局小游戏 (由 play_minigame 或多窗口调度器逐帧驱动)"""
+        self.log("🎮 进入小游戏模式")
+        self.minigame = MinigameSession(self, region)
+        return self.minigame
+
+    def play_minigame(self, region):
+        """小游戏循环 (高性能模式)"""
+        self.run_minigame(self.start_minigame(region))
+        
+    def run_minigame(self, session):
+        """连续驱动一局小游戏直到结束"""
+        poll_interval = session.poll_interval
+        
+        # 极速检测循环 (High Performance Loop)
+        while self.is_running and session.step():
+            # 极短休眠让出CPU，但不能太长否则掉帧 (默认 0 = 不休眠)
+            if poll_interval:
+                self.clock.sleep(poll_interval)
+        self.minigame = None
+
+    def handle_selling(self):
+        """自动贩卖流程"""
+        self.log("🎒 背包已满，尝试清理...")
+        self._human_press('t', 0.1)
+        self.clock.sleep(2.5) # 等待UI打开
+        
+        # 步骤列表: (图片key, 描述, 延迟)
+        steps = [
+            ('btn_sell_mode', "点击贩卖模式", 1.0),
+            ('btn_select_all', "点击全选", 0.5),
+            ('btn_check', "点击确认选择", 1.0),
+            ('btn_confirm', "确认贩卖", 2.0)
+        ]
+        
+        for key, desc, delay in steps:
+            if not self.is_running: return False
+            
+            loc = self.vision.find_template(key)
+            if loc:
+                self.log(f"   -> {desc}")
+                self._human_click(loc)
+                self.clock.sleep(delay)
+            else:
+                if key == 'btn_sell_mode':
+                    self.log("❌ 未找到贩卖按钮，可能在错误的界面")
+                    self._human_press('esc')
+                    return False
+                # 后续步骤没找到可能是不需要点（比如全选已经是全选状态），继续尝试
+        
+        # 退出背包
+        self._human_press('esc')
+        self.clock.sleep(1.5)
+        self.log("✅ 清理完成")
+        self.stats["sells"] += 1
+        return True
+
+    def tick(self, settings):
+        """
+        主循环的一次迭代：按优先级检测状态并执行对应动作
+        咬钩后只创建 self.minigame，由调用方逐帧驱动
+        :param settings: 配置快照
+        :return: 下一次 tick 前应等待的秒数；None 表示脚本应停止
+        """
+        self.stats["ticks"] += 1
+        if self.probes is None:
+            self.probes = ProbeExecutor(settings.probe_workers, settings.cv_threads)
+
+        # 一次截图，各项检测并行匹配，按优先级取第一个命中的状态
+        # (结算 > 位置错误 > 背包满 > 咬钩 > 抛竿，各项检测参数见 vision.STATE_PROBES)
+        state, _ = self.probes.detect(self.vision, settings)
+
+        # 1. 异常检测 (结算界面、错误提示)
+        if state == 'result':
+            self.state = "result"
+            self.log("💰 检测到结算画面")
+            self._human_press('esc')
+            self.waiting_for_game = False
+            return 2.0
+
+        # 优先使用配置的提示信息区域
+        if state == 'pos_error':
+            self.state = "pos_error"
+            self.log("⚠️ 位置错误，尝试修正...")
+            self._human_press('s', 0.3) # 后退一步
+            self.waiting_for_game = False
+            return 1.0
+        
+        # 2. 背包满检测
+        if state == 'full_warning':
+            self.state = "selling"
+            if not self.handle_selling():
+                self.stats["errors"] += 1
+                # 贩卖失败，停止脚本保护现场
+                self.log("❌ 无法清理背包，脚本停止")
+                self.stop()
+                self.status_signal.emit("异常停止")
+                return None
+            self.waiting_for_game = False
+            return 0
+
+        # 3. 咬钩检测
+        # 咬钩图标通常颜色鲜艳，用彩色匹配
+        # 优先使用配置的局部区域，提高速度和抗干扰能力
+        if state == 'bite':
+            self.state = "minigame"
+            self.log("🎣 咬钩！拉杆！")
+            self.stats["bites"] += 1
+            self._human_press('space')
+            
+            # 获取小游戏区域 (从配置读取)
+            roi = self.vision.screen_region(settings.roi('minigame'), settings)
+            if roi:
+                self.start_minigame(roi)
+            else:
+                self.log("❌ 未配置小游戏区域 ROI")
+            
+            self.waiting_for_game = True
+            return 0
+
+        # 4. 抛竿检测
+        # 只有在还没进入“等待上钩”状态时才抛竿
+        # 或者如果等太久了(waiting_for_game逻辑需要在外面加个超时重置，这里简化处理)
+        if state == 'cast':
+            # 如果之前在等鱼，说明鱼脱钩了或者上一轮结束了，重置状态
+            if self.waiting_for_game:
+                self.waiting_for_game = False
+            
+            self.log("🌊 抛竿...")
+            self.stats["casts"] += 1
+            self.state = "waiting"
+            
+            # 蓄力抛竿
+            cast_duration = settings.cast_duration
+            self._human_press('space', duration=cast_duration)
+            
+            # 抛竿后会有动画，休息一下
+            return 2.0
+
+        # 没什么事发生，稍微休息，降低CPU占用
+        # 抛竿后保持 waiting，直到咬钩或出现其他画面
+        if self.state != "waiting":
+            self.state = "idle"
+        return 0.1
+
+    def run(self):
+        """工作线程主入口"""
+        # 1. 在子线程内部初始化 mss
+        self.vision.init_manager()
+        
+        self.is_running = True
+        self.status_signal.emit("运行中")
+        
+        # 2. 强制激活游戏窗口 (解决焦点在脚本导致误触停止的问题)
+        if not self.activate_window():
+            self.log("❌ 未找到游戏窗口！请确保游戏已启动。")
+            self.status_signal.emit("启动失败")
+            self.vision.release()
+            return
+
+        # 3. 识别 UI 缩放 (非 2K 分辨率时自动缩放模板)
+        self.calibrate_scale()
+
+        # 4. 记录模板匹配位置 (ROI 自学习)
+        self.start_roi_learning()
+
+        self.log("🚀 自动化系统已启动")
+        self.state = "idle"
+        
+        self.waiting_for_game = False
+        
+        try:
+            while self.is_running:
+                # 每轮取一次配置快照 (settings.json 修改后自动生效)
+                delay = self.tick(self.cfg.settings)
+                if delay is None:
+                    break
+
+                # 咬钩后进入小游戏，连续处理直到结束
+                if self.minigame is not None:
+                    self.run_minigame(self.minigame)
+                    continue
+
+                if delay:
+                    self.clock.sleep(delay)
+
+        except Exception as e:
+            self.log(f"❌ 发生未捕获异常: {e}")
+            self.stats["errors"] += 1
+            self.clock.sleep(1)
+        finally:
+            self.state = "stopped"
+            self.finish_roi_learning()
+            # 关键：无论如何退出（包括报错），都释放 mss 资源
+            # 防止下次启动时出现 '_thread._local' object has no attribute 'srcdc'
+            self.vision.release()
+            if self.probes is not None:
+                self.probes.close()
+                self.probes = None
+            self.status_signal.emit("已停止")
+            self.log("🛑 脚本已结束 (资源已释放)")
@@ -0,0 +1,55 @@
+"""
+Bot 使用的时钟
+FishingBot 的所有等待 (拟人化延迟、按键时长、界面动画、贩卖流程) 和计时 (命中冷却、游标超时)
+都通过 bot.clock 完成：
+  - RealClock: 真实时间 (正常运行)
+  - SimClock:  虚拟时间，sleep 只把时间往前拨，不真正等待；画面由帧时间戳推进
+               (见 core.frame_source.ClockedFrameSource)。离线回放 / 基准测试时，
+               一小时的挂机流程几秒即可跑完，决策与真实时间下一致
+"""
+import threading
+import time
+
+
+class RealClock:
+    """真实时间：time() = time.time()，sleep() = time.sleep()"""
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class SimClock:
+    """
+    虚拟时间，从 start 开始，只在 sleep / advance 时前进
+    :param start: 起始时间 (秒)
+    """
+
+    def __init__(self, start=0.0):
+        self._now = float(start)
+        self.slept = 0.0 # sleep 累计推进的时间 (区别于帧时间戳推进的部分)
+        self._lock = threading.Lock()
+
+    def time(self):
+        return self._now
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            with self._lock:
+                self._now += seconds
+                self.slept += seconds
+
+    def advance(self, seconds):
+        """时间前进 seconds 秒 (不计入 slept)"""
+        if seconds > 0:
+            with self._lock:
+                self._now += seconds
+
+    def advance_to(self, t):
+        """时间前进到 t (t 不晚于当前时间时不变)"""
+        with self._lock:
+            if t > self._now:
+                self._now = t
@@ -0,0 +1,63 @@
+import numpy as np
+
+
+class StaticFrameSource:
+    """
+    内存帧源：与 mss 接口兼容 (grab / monitors / close)
+    grab 返回 BGRA numpy 数组，Vision 和 play_minigame 可直接使用
+    """
+
+    def __init__(self, frame_bgr=None):
+        self.frame = None
+        self.monitors = []
+        if frame_bgr is not None:
+            self.set_frame(frame_bgr)
+
+    def set_frame(self, frame_bgr):
+        """替换当前画面 (BGR 或 BGRA)"""
+        if frame_bgr.shape[2] == 3:
+            alpha = np.full(frame_bgr.shape[:2] + (1,), 255, dtype=np.uint8)
+            frame_bgr = np.concatenate([frame_bgr, alpha], axis=2)
+        self.frame = np.ascontiguousarray(frame_bgr)
+        h, w = self.frame.shape[:2]
+        full = {"left": 0, "top": 0, "width": w, "height": h}
+        # monitors[0] 为虚拟全屏，monitors[1] 为主显示器 (与 mss 一致)
+        self.monitors = [full, full]
+
+    def grab(self, monitor):
+        left, top = int(monitor["left"]), int(monitor["top"])
+        return self.frame[top:top + int(monitor["height"]), left:left + int(monitor["width"])]
+
+    def close(self):
+        pass
+
+
+class ClockedFrameSource:
+    """
+    按帧时间戳推进 SimClock 的帧源包装 (接口与 mss 兼容)
+    画面每 frame_interval 秒刷新一次；每次 grab 先把时钟拨到下一帧的时间戳再取画面，
+    相当于 Bot 总要等到新的一帧才能看到变化。连续截图的循环 (小游戏) 因此也会推进时间
+    :param source: 画面随时钟变化的帧源 (例如 benchmarks 中按同一时钟渲染的模拟器)
+    :param clock: SimClock
+    :param frame_interval: 帧间隔 (秒)，默认 60 fps
+    """
+
+    def __init__(self, source, clock, frame_interval=1 / 60):
+        self.source = source
+        self.clock = clock
+        self.frame_interval = frame_interval
+        self.grabs = 0
+
+    @property
+    def monitors(self):
+        return self.source.monitors
+
+    def grab(self, monitor):
+        # 容差避免浮点误差让时钟停在当前帧上
+        frame_index = int(self.clock.time() / self.frame_interval + 1e-6) + 1
+        self.clock.advance_to(frame_index * self.frame_interval)
+        self.grabs += 1
+        return self.source.grab(monitor)
+
+    def close(self):
+        self.source.close()
@@ -0,0 +1,263 @@
+import os
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+# 标注值：0 = 未标注, 1 = 目标像素, 2 = 背景像素
+LABEL_NONE = 0
+LABEL_TARGET = 1
+LABEL_BACKGROUND = 2
+
+# 量化步长 (H 0-179, S/V 0-255)：H 每 2 个单位一档，S/V 每 8 个单位一档
+# 90 x 32 x 32 ≈ 9.2 万个直方图格子，累加表可以在内存里轻松放下
+QUANT = (2, 8, 8)
+BINS = (90, 32, 32)
+CHANNEL_MAX = (180, 256, 256)
+
+# 候选边界：取目标像素分布的这些百分位作为下限 (上限取对称百分位)
+CANDIDATE_PERCENTILES = (0.0, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0)
+# 同分时的体积惩罚系数 (远小于任何有意义的分数差)
+VOLUME_PENALTY = 1e-3
+# 色相环绕检测：目标像素在 H 两端 (< HUE_WRAP_MARGIN 与 >= 180 - HUE_WRAP_MARGIN) 各占至少
+# HUE_WRAP_FRACTION 时视为跨越 0/180 的颜色 (如红色)。cv2.inRange 只支持 lower <= upper 的单个区间，
+# 这类颜色拟合出的 H 区间会覆盖几乎整个色环
+HUE_WRAP_MARGIN = 10
+HUE_WRAP_FRACTION = 0.05
+
+
+def quantize(hsv_pixels):
+    """把 (N, 3) 的 HSV 像素量化为直方图格子下标 (N, 3)"""
+    q = hsv_pixels.astype(np.int32) // np.array(QUANT, dtype=np.int32)
+    return np.minimum(q, np.array(BINS, dtype=np.int32) - 1)
+
+
+def histogram3d(q_pixels):
+    """向量化 3D 直方图 (np.bincount 一次完成)"""
+    h_bins, s_bins, v_bins = BINS
+    flat = (q_pixels[:, 0] * s_bins + q_pixels[:, 1]) * v_bins + q_pixels[:, 2]
+    hist = np.bincount(flat, minlength=h_bins * s_bins * v_bins)
+    return hist.reshape(BINS).astype(np.int64)
+
+
+def summed_volume(hist):
+    """
+    3D 累加表 (前面补一层 0)
+    任意长方体 [lo, hi] 内的像素数可由 8 个角点 O(1) 求得
+    """
+    sat = hist.cumsum(0).cumsum(1).cumsum(2)
+    return np.pad(sat, ((1, 0), (1, 0), (1, 0)))
+
+
+def _box_sum(sat, h_lo, h_hi, s_lo, s_hi, v_lo, v_hi):
+    """对广播后的边界数组批量求长方体内计数 (上界为闭区间格子下标)"""
+    h1, h0 = h_hi + 1, h_lo
+    s1, s0 = s_hi + 1, s_lo
+    v1, v0 = v_hi + 1, v_lo
+    return (sat[h1, s1, v1] - sat[h0, s1, v1] - sat[h1, s0, v1] - sat[h1, s1, v0]
+            + sat[h0, s0, v1] + sat[h0, s1, v0] + sat[h1, s0, v0] - sat[h0, s0, v0])
+
+
+def _candidate_pairs(q_target, channel):
+    """根据目标像素分布生成某通道的 (下限格, 上限格) 候选对"""
+    values = q_target[:, channel]
+    lows = np.percentile(values, CANDIDATE_PERCENTILES).astype(np.int32)
+    highs = np.percentile(values, [100.0 - p for p in CANDIDATE_PERCENTILES]).astype(np.int32)
+    lows = np.unique(np.append(lows, 0))
+    highs = np.unique(np.append(highs, BINS[channel] - 1))
+    pairs = [(lo, hi) for lo in lows for hi in highs if lo <= hi]
+    return np.array(pairs, dtype=np.int32)
+
+
+def _score(tp, fp, total_target, objective):
+    """分离度评分：默认 F1，也可用 Youden J (召回 - 误报率)"""
+    tp = tp.astype(np.float64)
+    fp = fp.astype(np.float64)
+    if objective == 'youden':
+        return tp / total_target[0] - fp / max(total_target[1], 1)
+    precision = tp / np.maximum(tp + fp, 1)
+    recall = tp / max(total_target[0], 1)
+    return 2 * precision * recall / np.maximum(precision + recall, 1e-9)
+
+
+def _search_chunk(args):
+    """
+    进程池工作函数：在一段 H 候选上穷举 S/V 组合
+    必须是模块级函数，才能被 ProcessPoolExecutor pickle
+    """
+    sat_pos, sat_neg, h_pairs, s_pairs, v_pairs, totals, objective = args
+    h_lo = h_pairs[:, 0][:, None, None]
+    h_hi = h_pairs[:, 1][:, None, None]
+    s_lo = s_pairs[:, 0][None, :, None]
+    s_hi = s_pairs[:, 1][None, :, None]
+    v_lo = v_pairs[:, 0][None, None, :]
+    v_hi = v_pairs[:, 1][None, None, :]
+
+    tp = _box_sum(sat_pos, h_lo, h_hi, s_lo, s_hi, v_lo, v_hi)
+    fp = _box_sum(sat_neg, h_lo, h_hi, s_lo, s_hi, v_lo, v_hi)
+    score = _score(tp, fp, totals, objective)
+
+    # 同分时偏向更紧的区间：减去与盒子体积成正比的极小惩罚，
+    # 避免把未标注的无关颜色一并纳入
+    volume = ((h_hi - h_lo + 1) * (s_hi - s_lo + 1) * (v_hi - v_lo + 1)) / float(np.prod(BINS))
+    ranked = score - VOLUME_PENALTY * volume
+
+    best = int(np.argmax(ranked))
+    hi_idx, si_idx, vi_idx = np.unravel_index(best, score.shape)
+    return (float(ranked.flat[best]), float(score.flat[best]), int(tp.flat[best]), int(fp.flat[best]),
+            h_pairs[hi_idx].tolist(), s_pairs[si_idx].tolist(), v_pairs[vi_idx].tolist())
+
+
+def collect_pixels(hsv_frames, label_maps):
+    """按标注把所有帧的 HSV 像素分为 目标 / 背景 两组"""
+    target, background = [], []
+    for hsv, labels in zip(hsv_frames, label_maps):
+        if labels is None:
+            continue
+        target.append(hsv[labels == LABEL_TARGET])
+        background.append(hsv[labels == LABEL_BACKGROUND])
+    empty = np.empty((0, 3), dtype=np.uint8)
+    return (np.concatenate(target) if target else empty,
+            np.concatenate(background) if background else empty)
+
+
+def hue_wraps(target_pixels):
+    """目标像素的色相是否跨越 0/180 (两端都有相当比例的像素)"""
+    hue = target_pixels[:, 0]
+    low = np.count_nonzero(hue < HUE_WRAP_MARGIN)
+    high = np.count_nonzero(hue >= CHANNEL_MAX[0] - HUE_WRAP_MARGIN)
+    return min(low, high) >= HUE_WRAP_FRACTION * len(hue)
+
+
+def fit_bounds(target_pixels, background_pixels, workers=1, objective='f1'):
+    """
+    根据已标注像素自动拟合 HSV 上下限
+    网格搜索在累加表上只需几十毫秒，默认在当前进程内计算；
+    workers > 1 时才启动进程池 (命令行批量拟合用，不要在 GUI 线程中使用)
+    :param target_pixels: (N, 3) uint8 HSV 目标像素
+    :param background_pixels: (M, 3) uint8 HSV 背景像素
+    :param workers: 进程数，None 为 CPU 核数，<=1 则在当前进程内计算
+    :param objective: 'f1' 或 'youden'
+    :return: dict(lower, upper, score, recall, false_positive_rate, hue_wraps, elapsed)
+             hue_wraps 为 True 时目标颜色跨越色相 0/180，单个 H 区间无法准确表示
+    """
+    if len(target_pixels) == 0:
+        raise ValueError("没有目标像素标注")
+
+    start = time.perf_counter()
+    q_pos = quantize(target_pixels)
+    q_neg = quantize(background_pixels) if len(background_pixels) else np.empty((0, 3), np.int32)
+
+    sat_pos = summed_volume(histogram3d(q_pos))
+    sat_neg = summed_volume(histogram3d(q_neg))
+    totals = (len(q_pos), len(q_neg))
+
+    h_pairs = _candidate_pairs(q_pos, 0)
+    s_pairs = _candidate_pairs(q_pos, 1)
+    v_pairs = _candidate_pairs(q_pos, 2)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(h_pairs)))
+    chunks = [(sat_pos, sat_neg, part, s_pairs, v_pairs, totals, objective)
+              for part in np.array_split(h_pairs, workers) if len(part)]
+
+    if workers <= 1:
+        results = [_search_chunk(c) for c in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_search_chunk, chunks))
+
+    _, score, tp, fp, h, s, v = max(results, key=lambda r: r[0])
+
+    # 格子下标 -> 实际 HSV 值 (上限取格子内最大值)
+    lower = [h[0] * QUANT[0], s[0] * QUANT[1], v[0] * QUANT[2]]
+    upper = [min((h[1] + 1) * QUANT[0], CHANNEL_MAX[0]) - 1,
+             min((s[1] + 1) * QUANT[1], CHANNEL_MAX[1]) - 1,
+             min((v[1] + 1) * QUANT[2], CHANNEL_MAX[2]) - 1]
+
+    return {
+        "lower": [int(x) for x in lower],
+        "upper": [int(x) for x in upper],
+        "score": score,
+        "recall": tp / max(totals[0], 1),
+        "false_positive_rate": fp / max(totals[1], 1),
+        "hue_wraps": bool(hue_wraps(target_pixels)),
+        "elapsed": time.perf_counter() - start,
+    }
+
+
+def fit_frames(bgr_frames, label_maps, workers=1, objective='f1'):
+    """从 BGR 帧 + 标注图直接拟合"""
+    hsv_frames = [cv2.cvtColor(f, cv2.COLOR_BGR2HSV) for f in bgr_frames]
+    target, background = collect_pixels(hsv_frames, label_maps)
+    return fit_bounds(target, background, workers=workers, objective=objective)
+
+
+def load_labeled_set(directory):
+    """
+    读取标注样本目录
+    目录结构：xxx.png 为样本帧，xxx_mask.png 为同尺寸灰度标注图
+    标注图中 白色(>=200) = 目标，黑色(<=50) = 背景，其余灰度 = 忽略
+    :return: (frames, label_maps)
+    """
+    frames, labels = [], []
+    for name in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() != '.png' or stem.endswith('_mask'):
+            continue
+        mask_path = os.path.join(directory, f"{stem}_mask.png")
+        if not os.path.exists(mask_path):
+            continue
+        frame = cv2.imread(os.path.join(directory, name), cv2.IMREAD_COLOR)
+        mask = cv2.imread(mask_path, cv2.IMREAD_GRAYSCALE)
+        if frame is None or mask is None or mask.shape != frame.shape[:2]:
+            print(f"[HSVFit] 跳过无效样本 {name}")
+            continue
+        label = np.zeros(mask.shape, dtype=np.uint8)
+        label[mask >= 200] = LABEL_TARGET
+        label[mask <= 50] = LABEL_BACKGROUND
+        frames.append(frame)
+        labels.append(label)
+    return frames, labels
+
+
+def save_labeled_set(directory, frames, label_maps):
+    """把 GUI 中手工标注的样本保存为标注集 (与 load_labeled_set 对应)"""
+    os.makedirs(directory, exist_ok=True)
+    for i, (frame, labels) in enumerate(zip(frames, label_maps)):
+        if labels is None:
+            continue
+        mask = np.full(labels.shape, 127, dtype=np.uint8)
+        mask[labels == LABEL_TARGET] = 255
+        mask[labels == LABEL_BACKGROUND] = 0
+        cv2.imwrite(os.path.join(directory, f"sample_{i:03d}.png"), frame)
+        cv2.imwrite(os.path.join(directory, f"sample_{i:03d}_mask.png"), mask)
+
+
+if __name__ == "__main__":
+    # 命令行：python -m core.hsv_fit <标注目录> [yellow|cursor] [--save]
+    import sys
+    from utils.config_manager import ConfigManager
+
+    if len(sys.argv) < 2:
+        print("用法: python -m core.hsv_fit <标注目录> [颜色名] [--save]")
+        sys.exit(1)
+
+    color = sys.argv[2] if len(sys.argv) > 2 and not sys.argv[2].startswith('--') else 'yellow'
+    frames, labels = load_labeled_set(sys.argv[1])
+    if not frames:
+        print("未找到任何标注样本")
+        sys.exit(1)
+
+    result = fit_frames(frames, labels, workers=None)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if result["hue_wraps"]:
+        print("警告: 目标颜色跨越色相 0/180 (如红色)，单个 H 区间无法准确表示，误报率可能偏高")
+
+    if '--save' in sys.argv:
+        cfg = ConfigManager()
+        cfg.set_color(color, result["lower"], result["upper"])
+        cfg.save_config()
@@ -0,0 +1,264 @@
+"""
+本地指标端点
+挂机农场 (多台机器 / 多开) 用 Prometheus 或任意 HTTP 客户端抓取各 Bot 的运行状态：
+  GET  /metrics  Prometheus 文本格式 (状态、钓到的鱼、命中、小游戏帧率、截图耗时分位数、卖鱼次数、错误数)
+  POST /start    启动挂机
+  POST /stop     停止挂机
+服务在独立的守护线程中运行，只在被抓取时读取 Bot 已有的计数器 (stats 字典、state 字符串、
+截图耗时)，热循环里不加锁、不做额外计算。默认只监听 127.0.0.1。
+远程启停始终需要 metrics.token (请求头 Authorization: Bearer <token>)，未设置时一律拒绝：
+只监听回环地址也不够，用户浏览器中打开的任意网页都能向 127.0.0.1 跨站发送 POST。
+带 Origin 请求头的请求 (来自浏览器网页) 也一律拒绝。
+
+命令行抓取 (调试用):
+  python -m core.metrics --url http://127.0.0.1:9101
+  python -m core.metrics --url http://10.0.0.5:9101 --token xxx stop
+"""
+import argparse
+import hmac
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 截图耗时的分位数
+CAPTURE_QUANTILES = (0.5, 0.9, 0.99)
+
+# 状态取值 (每个状态输出一条 0/1 样本，便于按状态统计时长)
+BOT_STATES = ("stopped", "idle", "waiting", "minigame", "result", "pos_error", "selling")
+
+# 计数器: 指标名 -> (stats 键, 说明)
+COUNTERS = {
+    "fishbot_ticks_total": ("ticks", "Main loop ticks"),
+    "fishbot_casts_total": ("casts", "Rod casts"),
+    "fishbot_bites_total": ("bites", "Bites detected"),
+    "fishbot_fish_caught_total": ("minigames", "Minigames finished (fish caught)"),
+    "fishbot_minigame_frames_total": ("frames", "Minigame frames processed"),
+    "fishbot_hits_total": ("hits", "Minigame hits"),
+    "fishbot_sells_total": ("sells", "Inventory sell cycles"),
+    "fishbot_errors_total": ("errors", "Errors (uncaught exceptions, failed sells)"),
+}
+
+
+def _clients(bot):
+    """(名称, FishingBot) 列表；多窗口调度器展开为各个客户端"""
+    if bot is None:
+        return []
+    if hasattr(bot, "clients"):
+        return [(slot.name, slot.bot) for slot in list(bot.clients)]
+    return [("main", bot)]
+
+
+def _quantile(values, q):
+    index = min(int(q * len(values)), len(values) - 1)
+    return values[index]
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render(bot):
+    """
+    把 Bot 的当前计数渲染为 Prometheus 文本格式
+    :param bot: FishingBot / MultiFishingBot，未创建时为 None
+    """
+    clients = _clients(bot)
+    running = bool(bot is not None and bot.is_running)
+    lines = [
+        "# HELP fishbot_up Whether the bot thread is running",
+        "# TYPE fishbot_up gauge",
+        f"fishbot_up {int(running)}",
+        "# HELP fishbot_clients Number of game clients driven by this process",
+        "# TYPE fishbot_clients gauge",
+        f"fishbot_clients {len(clients)}",
+    ]
+
+    lines += ["# HELP fishbot_state Current bot state (1 for the active state)", "# TYPE fishbot_state gauge"]
+    for name, client in clients:
+        state = getattr(client, "state", "stopped")
+        for s in BOT_STATES:
+            lines.append(f'fishbot_state{{client="{_escape(name)}",state="{s}"}} {int(state == s)}')
+
+    # 只读一次快照，避免渲染期间计数被 Bot 线程更新导致各行不一致
+    snapshots = [(name, dict(client.stats)) for name, client in clients]
+    for metric, (key, help_text) in COUNTERS.items():
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+        for name, stats in snapshots:
+            lines.append(f'{metric}{{client="{_escape(name)}"}} {stats.get(key, 0)}')
+
+    lines += ["# HELP fishbot_minigame_fps Frame rate of the last finished minigame",
+              "# TYPE fishbot_minigame_fps gauge"]
+    for name, client in clients:
+        last = client.last_minigame_stats
+        fps = last["frames"] / max(last["elapsed"], 1e-6) if last else 0.0
+        lines.append(f'fishbot_minigame_fps{{client="{_escape(name)}"}} {fps:.3f}')
+
+    # 截图耗时取自状态检测线程池 (多开时各客户端共用一个，按客户端去重)
+    lines += ["# HELP fishbot_capture_seconds State-probe screen capture latency (recent window)",
+              "# TYPE fishbot_capture_seconds summary"]
+    seen = set()
+    for name, client in clients:
+        probes = client.probes
+        if probes is None or id(probes) in seen:
+            continue
+        seen.add(id(probes))
+        # 先读累计值再读窗口：分位数来自最近的样本，_sum / _count 是只增不减的累计值 (rate() 依赖这一点)
+        total_sum, total_count = probes.capture_sum, probes.capture_count
+        values = sorted(list(probes.capture_times))
+        label = f'client="{_escape(name)}"'
+        for q in CAPTURE_QUANTILES:
+            # 还没有样本时按 Prometheus 约定输出 NaN (Python 格式化会得到小写的 nan)
+            value = f"{_quantile(values, q):.6f}" if values else "NaN"
+            lines.append(f'fishbot_capture_seconds{{{label},quantile="{q}"}} {value}')
+        lines.append(f"fishbot_capture_seconds_sum{{{label}}} {total_sum:.6f}")
+        lines.append(f"fishbot_capture_seconds_count{{{label}}} {total_count}")
+    return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "FishBotMetrics/1.0"
+
+    def _reply(self, code, body, content_type="text/plain; charset=utf-8"):
+        data = body.encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self._reply(404, "not found\n")
+            return
+        try:
+            body = render(self.server.owner.get_bot())
+        except Exception as e:
+            self._reply(500, f"render failed: {e}\n")
+            return
+        self._reply(200, body, "text/plain; version=0.0.4; charset=utf-8")
+
+    def do_POST(self):
+        command = self.path.strip("/")
+        if command not in ("start", "stop"):
+            self._reply(404, "not found\n")
+            return
+        owner = self.server.owner
+        callback = owner.on_command
+        if callback is None:
+            self._reply(403, "remote commands disabled\n")
+            return
+        if not owner.token:
+            self._reply(403, "remote commands require metrics.token\n")
+            return
+        if self.headers.get("Origin") is not None:
+            self._reply(403, "cross-origin requests are not accepted\n")
+            return
+        if not owner.authorized(self.headers.get("Authorization")):
+            self._reply(401, "invalid or missing token\n")
+            return
+        callback(command)
+        self._reply(202, f"{command} requested\n")
+
+    def log_message(self, format, *args):
+        # 抓取很频繁，不刷屏
+        pass
+
+
+class MetricsServer:
+    """
+    :param get_bot: 返回当前 Bot (或 None) 的函数，每次抓取时调用 (界面可能随时重建 Bot)
+    :param on_command: 收到 start / stop 时的回调 (在服务线程中调用，界面需自行转到主线程)；
+                       None 则拒绝远程命令
+    :param port: 0 = 由系统分配 (启动后见 self.port)
+    :param token: 远程命令的口令 (Authorization: Bearer <token>)；为空时拒绝远程命令
+    """
+
+    def __init__(self, get_bot, on_command=None, host="127.0.0.1", port=9101, token=None):
+        self.get_bot = get_bot
+        self.on_command = on_command
+        self.host = host
+        self.port = port
+        self.token = token or None
+        self.httpd = None
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def accepts_commands(self):
+        """是否会接受远程启停命令"""
+        return self.on_command is not None and self.token is not None
+
+    def authorized(self, header):
+        """校验 Authorization 请求头；未设置 token 时一律不通过"""
+        if self.token is None:
+            return False
+        return hmac.compare_digest((header or "").encode("utf-8"), f"Bearer {self.token}".encode("utf-8"))
+
+    def start(self):
+        self.httpd = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.owner = self
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="metrics", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+            self.thread = None
+
+
+def parse(text):
+    """
+    解析 Prometheus 文本 (只支持本模块输出的子集)
+    :return: {(指标名, ((标签, 值), ...)): float}
+    """
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        head, value = line.rsplit(" ", 1)
+        labels = ()
+        if "{" in head:
+            name, rest = head.split("{", 1)
+            pairs = [item.split("=", 1) for item in rest.rstrip("}").split('",') if item]
+            labels = tuple(sorted((k, v.strip('"')) for k, v in pairs))
+        else:
+            name = head
+        samples[(name, labels)] = float(value)
+    return samples
+
+
+def scrape(url, timeout=2.0):
+    """抓取一次 /metrics 并解析"""
+    with urllib.request.urlopen(url.rstrip("/") + "/metrics", timeout=timeout) as resp:
+        return parse(resp.read().decode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="抓取 / 控制本地挂机指标端点")
+    parser.add_argument("--url", default="http://127.0.0.1:9101")
+    parser.add_argument("--token", help="远程命令的口令 (与 settings.json 中 metrics.token 相同)")
+    parser.add_argument("command", nargs="?", choices=["start", "stop"], help="发送启动 / 停止命令")
+    args = parser.parse_args()
+
+    if args.command:
+        headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+        request = urllib.request.Request(f"{args.url.rstrip('/')}/{args.command}", data=b"", method="POST",
+                                         headers=headers)
+        with urllib.request.urlopen(request, timeout=2.0) as resp:
+            print(resp.read().decode("utf-8").strip())
+        return
+    for (name, labels), value in sorted(scrape(args.url).items()):
+        label_text = ",".join(f"{k}={v}" for k, v in labels)
+        print(f"{name:36s} {label_text:36s} {value:g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+多窗口 (多开) 调度
+一个进程驱动多个游戏客户端，每个客户端是一个 FishingBot (只使用 tick / MinigameSession，不单独起线程)：
+  - 所有客户端共用一份已解码的模板 (及各缩放比例的缓存) 和同一个截图句柄
+  - 某个客户端进入小游戏 (QTE) 时，热循环交给它；帧与帧之间按 qte_idle_poll_interval
+    穿插一次其他客户端的咬钩检测 (只识别、不发送输入)，QTE 结束后优先处理已咬钩的客户端
+  - 没有 QTE 时，按到期时间轮流执行各客户端的 tick (抛竿 / 等待 / 状态检测)
+键鼠只有一套：向某个客户端发送输入前，FocusedInput 会先把焦点切到它的窗口。
+调度的计时与等待都经过 clock (与 FishingBot 相同，回放时可注入 core.clock.SimClock)。
+"""
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from core.backends import InputBackend, create_input_backend, create_window_backend
+from core.bot_logic import FishingBot
+from core.clock import RealClock
+from core.probe_executor import ProbeExecutor
+from core.vision import Vision
+from core.window_tracker import WindowTracker
+
+# 有客户端等待咬钩时，QTE 游标消失超过该时间 (秒) 即结束小游戏并让出焦点，
+# 而不是等满 cursor_timeout
+HANDOFF_GRACE = 0.2
+
+
+class FocusedInput(InputBackend):
+    """
+    多个客户端共用的键鼠输入：发送前确保焦点在目标窗口
+    :param focus: 所有客户端共享的 {"handle": 当前焦点窗口}
+    :param settle: 切换焦点后的等待时间 (秒)
+    :param clock: 等待使用的时钟 (默认 RealClock)
+    """
+    name = "focused"
+
+    def __init__(self, inner, window, handle, focus, settle=0.05, clock=None):
+        self.inner = inner
+        self.window = window
+        self.handle = handle
+        self.focus = focus
+        self.settle = settle
+        self.clock = clock if clock is not None else RealClock()
+        self.switches = 0
+
+    def _ensure_focus(self):
+        if self.focus.get("handle") != self.handle:
+            self.window.activate(self.handle)
+            self.focus["handle"] = self.handle
+            self.switches += 1
+            if self.settle:
+                self.clock.sleep(self.settle)
+
+    def key_down(self, key):
+        self._ensure_focus()
+        self.inner.key_down(key)
+
+    def key_up(self, key):
+        self._ensure_focus()
+        self.inner.key_up(key)
+
+    def press(self, key):
+        self._ensure_focus()
+        self.inner.press(key)
+
+    def click(self, x, y):
+        self._ensure_focus()
+        self.inner.click(x, y)
+
+
+class ClientSlot:
+    """调度器中的一个客户端：FishingBot 及其调度状态"""
+
+    def __init__(self, name, bot):
+        self.name = name
+        self.bot = bot
+        self.resume_at = 0.0 # 下一次 tick 的时间 (调度器时钟)
+        self.bite_pending = False # QTE 期间检测到咬钩，等待焦点空出
+        self.stopped = False
+        self.busy = 0.0 # 调度器花在该客户端上的时间 (秒)
+
+
+class MultiFishingBot(QThread):
+    # 与 FishingBot 相同的信号，界面可以直接替换使用
+    log_signal = pyqtSignal(str)
+    status_signal = pyqtSignal(str)
+
+    def __init__(self, config_manager, input_backend=None, window_backend=None, clock=None):
+        super().__init__()
+        self.cfg = config_manager
+        # 调度时钟，同时传给自动发现的客户端和它们的 FocusedInput
+        self.clock = clock if clock is not None else RealClock()
+        # 持有共享的模板与截图句柄，各客户端的 Vision 从这里取
+        self.vision = Vision(config_manager)
+
+        self._input = input_backend
+        self._window = window_backend
+
+        self.clients = []
+        self.focus = {"handle": None}
+        self.is_running = False
+        self.report = None # 最近一次运行的吞吐统计
+        self.probes = None # 所有客户端共用的状态检测线程池
+        self._last_idle_poll = 0.0
+        self._poll_index = 0
+
+    @property
+    def input(self):
+        if self._input is None:
+            self._input = create_input_backend(self.cfg.settings.backend)
+        return self._input
+
+    @property
+    def window(self):
+        if self._window is None:
+            self._window = create_window_backend(self.cfg.settings.backend, self.input)
+        return self._window
+
+    def log(self, message):
+        self.log_signal.emit(message)
+
+    def stop(self):
+        self.is_running = False
+        for slot in self.clients:
+            slot.bot.is_running = False
+        self.log("🛑 正在停止脚本...")
+
+    # ================= 客户端管理 =================
+
+    def add_client(self, bot, name=None):
+        """
+        加入一个客户端
+        :param bot: FishingBot，bot.hwnd 为其窗口句柄 (模拟时可以是任意可区分的值)
+        """
+        name = name or f"#{len(self.clients) + 1}"
+        bot.vision.share_templates(self.vision)
+        bot._input = FocusedInput(bot.input, bot.window, bot.hwnd, self.focus, self.cfg.settings.focus_settle,
+                                  clock=self.clock)
+        bot.log_signal.connect(lambda message, n=name: self.log(f"[{n}] {message}"))
+        slot = ClientSlot(name, bot)
+        self.clients.append(slot)
+        return slot
+
+    def discover_clients(self):
+        """按窗口标题查找所有游戏窗口，每个窗口创建一个客户端"""
+        settings = self.cfg.settings
+        handles = self.window.find_windows(settings.window_title)[:settings.max_clients]
+        for handle in handles:
+            bot = FishingBot(self.cfg, input_backend=self.input, window_backend=self.window, clock=self.clock)
+            bot.hwnd = handle
+            bot.tracker = WindowTracker(self.window, handle, clock=self.clock.time)
+            bot.vision.tracker = bot.tracker
+            self.add_client(bot)
+        return len(handles)
+
+    def activate_client(self, slot):
+        """把焦点切到客户端窗口并重新记录客户区位置"""
+        bot = slot.bot
+        try:
+            if not bot.window.activate(bot.hwnd):
+                return False
+        except Exception as e:
+            self.log(f"[{slot.name}] ❌ 窗口激活失败: {e}")
+            return False
+        self.focus["handle"] = bot.hwnd
+        if self.cfg.settings.focus_settle:
+            self.clock.sleep(self.cfg.settings.focus_settle)
+        if bot.tracker is not None:
+            bot.tracker.attach(bot.hwnd)
+        return True
+
+    # ================= 调度 =================
+
+    def step(self, settings):
+        """调度一次：有 QTE 时处理它的一帧，否则执行一个到期客户端的 tick"""
+        clock = self.clock
+        now = clock.time()
+        hot = next((c for c in self.clients if c.bot.minigame is not None), None)
+        if hot is not None:
+            session = hot.bot.minigame
+            finished = not session.step()
+            if not finished and session.cursor_missing_start and \
+                    session.clock.time() - session.cursor_missing_start > HANDOFF_GRACE and \
+                    any(c.bite_pending for c in self.clients):
+                session.finish()
+                finished = True
+            if finished:
+                hot.bot.minigame = None
+                hot.resume_at = 0.0
+            hot.busy += clock.time() - now
+
+            # QTE 帧之间穿插一次空闲客户端的咬钩检测
+            if now - self._last_idle_poll >= settings.qte_idle_poll_interval:
+                self._last_idle_poll = now
+                self._poll_idle(settings)
+            if session.poll_interval:
+                clock.sleep(session.poll_interval)
+            return
+
+        active = [c for c in self.clients if not c.stopped]
+        if not active:
+            self.is_running = False
+            return
+        ready = [c for c in active if c.resume_at <= now]
+        if not ready:
+            # 最多睡 0.1 秒，保证停止指令及时生效
+            clock.sleep(min(min(c.resume_at for c in active) - now, 0.1))
+            return
+
+        # 已咬钩的客户端优先，其余按到期先后轮流
+        slot = min(ready, key=lambda c: (not c.bite_pending, c.resume_at))
+        slot.bite_pending = False
+        delay = slot.bot.tick(settings)
+        end = clock.time()
+        slot.busy += end - now
+        if delay is None:
+            slot.stopped = True
+            self.log(f"[{slot.name}] ❌ 客户端已停止")
+        else:
+            slot.resume_at = end + delay
+
+    def _poll_idle(self, settings):
+        """轮流对一个空闲客户端做咬钩检测 (只截取咬钩 ROI，不发送输入)"""
+        idle = [c for c in self.clients if c.bot.minigame is None and not c.bite_pending and not c.stopped]
+        if not idle:
+            return
+        slot = idle[self._poll_index % len(idle)]
+        self._poll_index += 1
+        start = self.clock.time()
+        if slot.bot.vision.probe('bite', settings):
+            slot.bite_pending = True
+            slot.resume_at = 0.0
+            self.log(f"[{slot.name}] 🎣 咬钩 (等待当前小游戏结束)")
+        slot.busy += self.clock.time() - start
+
+    def throughput(self, wall):
+        """每个客户端及合计的吞吐 (小游戏局数 / 分钟等)"""
+        per_client = {}
+        total = {"minigames": 0, "casts": 0, "bites": 0, "hits": 0, "frames": 0, "ticks": 0}
+        for slot in self.clients:
+            stats = slot.bot.stats
+            for key in total:
+                total[key] += stats[key]
+            per_client[slot.name] = dict(stats, busy_s=slot.busy,
+                                         minigames_per_min=stats["minigames"] * 60.0 / max(wall, 1e-6),
+                                         focus_switches=getattr(slot.bot.input, "switches", 0))
+        total["minigames_per_min"] = total["minigames"] * 60.0 / max(wall, 1e-6)
+        total["ticks_per_s"] = total["ticks"] / max(wall, 1e-6)
+        return {"wall_s": wall, "clients": per_client, "aggregate": total}
+
+    def run(self):
+        """工作线程主入口"""
+        self.is_running = True
+        self.status_signal.emit("运行中")
+
+        if not self.clients and not self.discover_clients():
+            self.log("❌ 未找到游戏窗口！请确保游戏已启动。")
+            self.status_signal.emit("启动失败")
+            return
+
+        settings = self.cfg.settings
+        if len(self.clients) > 1 and settings.roi_space != 'client':
+            self.log("⚠️ ROI 为屏幕绝对坐标，多个窗口将共用同一组区域 (建议在游戏启动后重新设置区域)")
+
+        # 共用一个截图句柄 (自带帧源的模拟客户端除外) 和一个检测线程池
+        self.probes = ProbeExecutor(settings.probe_workers, settings.cv_threads)
+        for slot in self.clients:
+            bot = slot.bot
+            bot.probes = self.probes
+            if bot.vision._source is None:
+                self.vision.init_manager()
+                bot.vision.sct = self.vision.sct
+            bot.is_running = True
+            # 逐个激活窗口 (与单开相同，避免焦点留在脚本上)，并重新记录客户区位置
+            if not self.activate_client(slot):
+                slot.stopped = True
+                self.log(f"[{slot.name}] ❌ 窗口激活失败，跳过该客户端")
+                continue
+            bot.calibrate_scale()
+
+        # ROI 自学习：各客户端共用同一组 ROI，匹配位置记录到同一份统计中
+        lead = self.clients[0].bot
+        lead.start_roi_learning()
+        for slot in self.clients[1:]:
+            slot.bot.vision.learner = lead.vision.learner
+
+        self.log(f"🚀 多窗口调度已启动: {len(self.clients)} 个客户端")
+        start = self.clock.time()
+        try:
+            while self.is_running:
+                self.step(self.cfg.settings)
+        except Exception as e:
+            self.log(f"❌ 发生未捕获异常: {e}")
+        finally:
+            self.report = self.throughput(self.clock.time() - start)
+            for name, r in self.report["clients"].items():
+                self.log(f"📊 [{name}] 小游戏 {r['minigames']} 局 ({r['minigames_per_min']:.1f}/分钟), "
+                         f"命中 {r['hits']}, 调度耗时 {r['busy_s']:.1f}s")
+            total = self.report["aggregate"]
+            self.log(f"📊 合计 {total['minigames']} 局 ({total['minigames_per_min']:.1f}/分钟), "
+                     f"{total['ticks_per_s']:.1f} tick/s")
+
+            # 统计只保存一次 (截图句柄释放前，需要读取屏幕尺寸)
+            lead.finish_roi_learning()
+            # 共用的截图句柄只释放一次
+            for slot in self.clients:
+                slot.bot.vision.learner = None
+                slot.bot.state = "stopped"
+                if slot.bot.vision.sct is self.vision.sct:
+                    slot.bot.vision.sct = None
+                else:
+                    slot.bot.vision.release()
+            self.vision.release()
+            self.probes.close()
+            self.status_signal.emit("已停止")
+            self.log("🛑 脚本已结束 (资源已释放)")
@@ -0,0 +1,116 @@
+"""
+并行状态检测
+主循环每个 tick 的几项模板匹配 (结算 / 位置错误 / 背包满 / 咬钩 / 抛竿) 原本依次执行，
+空闲 tick 的延迟是它们的总和。ProbeExecutor 每个 tick 只截一次图 (所有检测区域的外接矩形)，
+灰度图也只转换一次，然后把各项匹配交给常驻线程池同时执行
+(cv2.matchTemplate 执行期间释放 GIL)，最后按 PROBE_PRIORITY 的顺序取第一个命中的结果。
+截图始终在调用线程中完成 (mss 句柄不能跨线程使用)。
+"""
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from core.vision import PROBE_PRIORITY, STATE_PROBES
+
+
+class ProbeExecutor:
+    def __init__(self, workers=0, cv_threads=0):
+        """
+        :param workers: 匹配线程数，0 = 自动 (检测项数与 CPU 核数取小)；1 = 在调用线程中依次执行
+        :param cv_threads: OpenCV 内部线程数，0 = 自动 (CPU 核数 / 匹配线程数，避免两者叠加超额订阅)
+        """
+        cpu = os.cpu_count() or 1
+        self.workers = workers or min(len(STATE_PROBES), cpu)
+        self.cv_threads = cv_threads or max(1, cpu // self.workers)
+        # setNumThreads 作用于整个进程，close() 时恢复原值 (不影响之后的调校窗口、基准等)
+        self._saved_cv_threads = cv2.getNumThreads()
+        cv2.setNumThreads(self.cv_threads)
+        # 最近若干次截图耗时 (秒)，供指标端点计算分位数；deque.append 在 GIL 下是原子的
+        self.capture_times = deque(maxlen=256)
+        # 截图次数与总耗时的累计值 (只增不减，供指标端点的 _count / _sum；只在检测线程中更新)
+        self.capture_count = 0
+        self.capture_sum = 0.0
+        self.pool = None
+        if self.workers > 1:
+            self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="probe")
+
+    def close(self):
+        """
+        停止线程池并等待线程退出 (只需等剩下的几次匹配完成)，停止后不留下仍在运行的检测线程；
+        同时恢复创建前的 OpenCV 线程数
+        """
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+        if self._saved_cv_threads is not None:
+            cv2.setNumThreads(self._saved_cv_threads)
+            self._saved_cv_threads = None
+
+    def detect(self, vision, settings, keys=PROBE_PRIORITY):
+        """
+        执行一轮状态检测
+        :param vision: 客户端的 Vision (提供截图、模板和 ROI 偏移)
+        :param keys: 参与检测的 key，按优先级排列
+        :return: (key, (center_x, center_y))；都未命中时返回 (None, None)
+        """
+        tasks = []
+        for key in keys:
+            tasks.append((key,) + vision.probe_params(key, settings))
+
+        # 1. 只截一次图：所有检测区域的外接矩形 (有全屏检测时即为整个显示器)
+        bounds = self._bounds(vision, [region for _, region, _, _ in tasks])
+        start = time.perf_counter()
+        frame = vision.capture_screen(bounds)
+        elapsed = time.perf_counter() - start
+        self.capture_times.append(elapsed)
+        self.capture_sum += elapsed
+        self.capture_count += 1
+        gray = None
+        if any(grayscale for *_, grayscale in tasks):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        vision.templates # 在调用线程中完成模板加载
+
+        # 2. 在共享帧上切出各自的区域 (切片不复制像素)
+        jobs = []
+        for key, region, confidence, grayscale in tasks:
+            image = gray if grayscale else frame
+            if region is not None:
+                x0 = max(region[0] - bounds[0], 0)
+                y0 = max(region[1] - bounds[1], 0)
+                image = image[y0:region[1] - bounds[1] + region[3], x0:region[0] - bounds[0] + region[2]]
+                offset = (bounds[0] + x0, bounds[1] + y0)
+            else:
+                offset = (bounds[0], bounds[1])
+            jobs.append((key, image, offset, confidence, grayscale))
+
+        # 3. 匹配：并行提交，按优先级等待结果，高优先级命中即返回
+        if self.pool is None:
+            for key, image, offset, confidence, grayscale in jobs:
+                found = vision.match_template(key, image, offset, confidence, grayscale)
+                if found:
+                    return key, found
+            return None, None
+
+        futures = [(job[0], self.pool.submit(vision.match_template, *job)) for job in jobs]
+        for key, future in futures:
+            found = future.result()
+            if found:
+                return key, found
+        return None, None
+
+    @staticmethod
+    def _bounds(vision, regions):
+        """所有区域的外接矩形 (x, y, w, h)；含全屏检测时返回显示器区域"""
+        if vision.sct is None:
+            vision.init_manager()
+        if any(region is None for region in regions):
+            mon = vision.sct.monitors[1]
+            return (int(mon["left"]), int(mon["top"]), int(mon["width"]), int(mon["height"]))
+        x0 = min(r[0] for r in regions)
+        y0 = min(r[1] for r in regions)
+        x1 = max(r[0] + r[2] for r in regions)
+        y1 = max(r[1] + r[3] for r in regions)
+        return (x0, y0, x1 - x0, y1 - y0)
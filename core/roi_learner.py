@@ -0,0 +1,307 @@
+"""
+ROI 自学习
+Vision 每次匹配成功时记录模板实际出现的位置 (按 key 汇总为外接矩形 + 得分)，停止挂机时保存到
+settings.json 旁边的 match_stats.json。样本足够后为每个状态检测给出收紧的 ROI
+(外接矩形四周留出余量，且不超出原 ROI)，并估算每次 tick 少扫描的像素：
+  - vision.roi_learning = "suggest"  只在日志中给出建议
+  - vision.roi_learning = "apply"    自动写入 settings.json 的 rois (只改写 rois，不保存界面中其他未保存的修改)
+  - vision.roi_learning = "off"      不记录
+共用一个 ROI 的检测 (pos_error / full_warning 共用 msg_tips) 只有在每个 key 都有足够样本时才收紧。
+第一次应用时记下原 ROI：之后匹配落在收紧区域的余量中时外接矩形随之扩大，建议会在原 ROI 范围内放宽；
+--reset 恢复原 ROI 并清空统计。UI 缩放或 ROI 坐标系变化后旧的统计作废。
+
+命令行查看 / 应用 / 还原:
+  python -m core.roi_learner
+  python -m core.roi_learner --apply
+  python -m core.roi_learner --reset
+"""
+import argparse
+import json
+import os
+import threading
+
+from core.vision import STATE_PROBES
+
+MATCH_STATS_FILE = "match_stats.json"
+
+# 给出建议所需的最少匹配次数
+ROI_MIN_SAMPLES = 20
+# 外接矩形四周的余量：模板尺寸的 ROI_PADDING_FRACTION，且不少于 ROI_PADDING_MIN 像素
+ROI_PADDING_FRACTION = 0.5
+ROI_PADDING_MIN = 16
+
+
+def stats_path(cfg):
+    """统计文件路径 (与 settings.json 同目录)"""
+    return os.path.join(os.path.dirname(os.path.abspath(cfg.config_path)), MATCH_STATS_FILE)
+
+
+def probe_rois():
+    """ROI 名称 -> 使用它的状态检测 key 列表 (全屏检测以 key 本身为名称)"""
+    groups = {}
+    for key, (roi_name, _, _) in STATE_PROBES.items():
+        groups.setdefault(roi_name or key, []).append(key)
+    return groups
+
+
+def _area(region):
+    return region[2] * region[3]
+
+
+def _intersect(a, b):
+    x0, y0 = max(a[0], b[0]), max(a[1], b[1])
+    x1, y1 = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return (x0, y0, x1 - x0, y1 - y0)
+
+
+def _union(regions):
+    x0 = min(r[0] for r in regions)
+    y0 = min(r[1] for r in regions)
+    x1 = max(r[0] + r[2] for r in regions)
+    y1 = max(r[1] + r[3] for r in regions)
+    return (x0, y0, x1 - x0, y1 - y0)
+
+
+class RoiLearner:
+    """
+    按 key 汇总匹配位置 (配置坐标系下模板的完整矩形)
+    :param scale: 记录时的 UI 缩放
+    :param roi_space: 记录时的 ROI 坐标系 (screen / client)
+    """
+
+    def __init__(self, path, scale=1.0, roi_space="screen"):
+        self.path = path
+        self.scale = scale
+        self.roi_space = roi_space
+        self.screen = None # 全屏检测实际扫描的区域大小 (w, h)
+        self.keys = {} # key -> {"count", "box": [x0, y0, x1, y1], "size": [w, h], "score_min", "score_sum"}
+        self.origins = {} # ROI 名称 -> 第一次应用建议前的 ROI (None = 全屏)，放宽 / 还原的上限
+        self._lock = threading.Lock()
+
+    # ================= 记录 =================
+
+    def record(self, key, rect, score):
+        """
+        记录一次匹配 (在匹配线程中调用，只做几次比较和加法)
+        :param rect: 模板在配置坐标系中的矩形 (x, y, w, h)
+        """
+        x, y, w, h = rect
+        with self._lock:
+            entry = self.keys.get(key)
+            if entry is None:
+                self.keys[key] = {"count": 1, "box": [x, y, x + w, y + h], "size": [w, h],
+                                  "score_min": score, "score_sum": score}
+                return
+            entry["count"] += 1
+            box = entry["box"]
+            box[0], box[1] = min(box[0], x), min(box[1], y)
+            box[2], box[3] = max(box[2], x + w), max(box[3], y + h)
+            entry["size"] = [max(entry["size"][0], w), max(entry["size"][1], h)]
+            entry["score_min"] = min(entry["score_min"], score)
+            entry["score_sum"] += score
+
+    # ================= 建议 =================
+
+    def suggest_key(self, key):
+        """单个 key 的收紧区域 (外接矩形 + 余量)；样本不足时返回 None"""
+        entry = self.keys.get(key)
+        if entry is None or entry["count"] < ROI_MIN_SAMPLES:
+            return None
+        x0, y0, x1, y1 = entry["box"]
+        w, h = entry["size"]
+        pad_x = max(ROI_PADDING_MIN, int(w * ROI_PADDING_FRACTION))
+        pad_y = max(ROI_PADDING_MIN, int(h * ROI_PADDING_FRACTION))
+        x0, y0 = max(x0 - pad_x, 0), max(y0 - pad_y, 0)
+        return (x0, y0, x1 + pad_x - x0, y1 + pad_y - y0)
+
+    def suggestions(self, settings):
+        """
+        每个状态检测 ROI 的建议值
+        已应用过的 ROI 以原 ROI 为界，与当前设置不同即给出 (可能是放宽)；其余只给出比当前设置更小的
+        :return: {ROI 名称: (x, y, w, h)}
+        """
+        if settings.roi_space != self.roi_space:
+            return {}
+        result = {}
+        for name, keys in probe_rois().items():
+            boxes = [self.suggest_key(key) for key in keys]
+            if any(box is None for box in boxes):
+                continue
+            box = _union(boxes)
+            current = settings.roi(name)
+            if name in self.origins:
+                bound = self.origins[name] or ((0, 0) + tuple(self.screen) if self.screen else None)
+                if bound is not None:
+                    box = _intersect(box, bound)
+                if box is None or tuple(box) == tuple(current or ()):
+                    continue
+            elif current is not None:
+                box = _intersect(box, current)
+                if box is None or _area(box) >= _area(current):
+                    continue
+            elif self.screen is not None and _area(box) >= self.screen[0] * self.screen[1]:
+                continue
+            result[name] = box
+        return result
+
+    def projection(self, settings, suggestions=None):
+        """
+        每次 tick 扫描的像素：{key: (当前, 建议)}，以及合计和单次截图区域
+        全屏检测按 self.screen 计算
+        """
+        if suggestions is None:
+            suggestions = self.suggestions(settings)
+        screen = tuple(self.screen) if self.screen else tuple(settings.base_resolution)
+        full = (0, 0) + screen
+        per_key = {}
+        before_regions, after_regions = [], []
+        for key, (roi_name, _, _) in STATE_PROBES.items():
+            name = roi_name or key
+            before = settings.roi(name) or full
+            after = suggestions.get(name, before)
+            per_key[key] = (_area(before), _area(after))
+            before_regions.append(before)
+            after_regions.append(after)
+        return {
+            "keys": per_key,
+            "scanned": (sum(b for b, _ in per_key.values()), sum(a for _, a in per_key.values())),
+            "captured": (_area(_union(before_regions)), _area(_union(after_regions))),
+        }
+
+    def apply(self, cfg, suggestions=None, save=True):
+        """
+        把建议写入配置的 rois，并记下每个 ROI 第一次应用前的值
+        :param save: True = 只把 rois 写入 settings.json (可在 Bot 线程中调用)；False = 只修改内存中的配置
+        """
+        settings = cfg.settings
+        if suggestions is None:
+            suggestions = self.suggestions(settings)
+        if not suggestions:
+            return suggestions
+        rois = {name: [int(v) for v in box] for name, box in suggestions.items()}
+        if save:
+            cfg.save_rois(rois)
+        else:
+            for name, roi in rois.items():
+                cfg.set('rois', name, roi)
+        with self._lock:
+            for name in rois:
+                if name not in self.origins:
+                    origin = settings.roi(name)
+                    self.origins[name] = list(origin) if origin is not None else None
+        self.save()
+        return suggestions
+
+    def reset(self, cfg, save=True):
+        """
+        恢复应用建议前的 ROI 并清空统计 (之后重新学习)
+        :return: {ROI 名称: 恢复的 ROI 或 None (全屏)}
+        """
+        with self._lock:
+            restored = dict(self.origins)
+            self.origins = {}
+            self.keys = {}
+        if restored:
+            if save:
+                cfg.save_rois(restored)
+            else:
+                for name, roi in restored.items():
+                    cfg.set('rois', name, roi)
+        self.save()
+        return restored
+
+    # ================= 持久化 =================
+
+    def save(self):
+        with self._lock:
+            data = {"version": 1, "scale": self.scale, "roi_space": self.roi_space,
+                    "screen": list(self.screen) if self.screen else None,
+                    "origins": {name: list(roi) if roi is not None else None for name, roi in self.origins.items()},
+                    "keys": {key: dict(entry, box=list(entry["box"]), size=list(entry["size"]))
+                             for key, entry in self.keys.items()}}
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=4)
+        except OSError as e:
+            print(f"[RoiLearner] 警告: 无法保存匹配统计 {self.path}: {e}")
+
+    @classmethod
+    def load(cls, path, scale=None, roi_space=None):
+        """
+        读取保存的统计；文件不存在、损坏或缩放 / 坐标系不一致时从空白开始
+        :param scale: 当前 UI 缩放，None = 沿用文件中的值
+        """
+        data = None
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[RoiLearner] 警告: 匹配统计无法读取，重新开始记录: {e}")
+        if data is not None and ((scale is not None and data.get("scale") != scale) or
+                                 (roi_space is not None and data.get("roi_space") != roi_space)):
+            data = None
+        if data is None:
+            return cls(path, scale if scale is not None else 1.0, roi_space or "screen")
+
+        learner = cls(path, data["scale"], data["roi_space"])
+        learner.screen = tuple(data["screen"]) if data.get("screen") else None
+        learner.keys = {key: dict(entry) for key, entry in (data.get("keys") or {}).items()}
+        learner.origins = dict(data.get("origins") or {})
+        return learner
+
+
+def report_lines(learner, settings, suggestions=None):
+    """建议与像素估算的文本 (日志 / 命令行共用)"""
+    if suggestions is None:
+        suggestions = learner.suggestions(settings)
+    counts = ", ".join(f"{key} {entry['count']}" for key, entry in learner.keys.items()) or "无"
+    lines = [f"📐 匹配位置样本: {counts}"]
+    if not suggestions:
+        lines.append(f"📐 没有需要调整的 ROI (共用同一 ROI 的每个 key 都需要至少 {ROI_MIN_SAMPLES} 次匹配)")
+        return lines
+    for name, box in suggestions.items():
+        current = settings.roi(name)
+        action = "放宽" if current is not None and _area(box) > _area(current) else "收紧"
+        lines.append(f"📐 ROI 建议{action} [{name}]: {current or '全屏'} -> {list(box)}")
+    projection = learner.projection(settings, suggestions)
+    before, after = projection["scanned"]
+    cap_before, cap_after = projection["captured"]
+    lines.append(f"📐 每次 tick 匹配扫描 {before / 1e6:.2f} -> {after / 1e6:.2f} MP ({100.0 * (after / before - 1):+.0f}%)，"
+                 f"截图 {cap_before / 1e6:.2f} -> {cap_after / 1e6:.2f} MP")
+    return lines
+
+
+def main():
+    from utils.config_manager import ConfigManager
+
+    parser = argparse.ArgumentParser(description="查看 / 应用自学习的 ROI")
+    parser.add_argument("--config", default="config/settings.json")
+    parser.add_argument("--apply", action="store_true", help="把建议写入 settings.json")
+    parser.add_argument("--reset", action="store_true", help="恢复应用建议前的 ROI 并清空统计")
+    args = parser.parse_args()
+
+    cfg = ConfigManager(args.config)
+    learner = RoiLearner.load(stats_path(cfg))
+    if args.reset:
+        restored = learner.reset(cfg)
+        for name, roi in restored.items():
+            print(f"已恢复 ROI [{name}]: {roi or '全屏'}")
+        print("已清空匹配统计" if restored else "没有应用过的 ROI，已清空匹配统计")
+        return
+    settings = cfg.settings
+    suggestions = learner.suggestions(settings)
+    for line in report_lines(learner, settings, suggestions):
+        print(line)
+    for key, entry in learner.keys.items():
+        print(f"  {key:14s} n={entry['count']:<5d} box={entry['box']} "
+              f"score min {entry['score_min']:.3f} mean {entry['score_sum'] / entry['count']:.3f}")
+    if args.apply and suggestions:
+        learner.apply(cfg, suggestions)
+        print("已写入 settings.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,149 +1,669 @@
-import cv2
-import numpy as np
-import mss
-import os
-from utils.config_manager import ConfigManager
-
-class Vision:
-    def __init__(self, config_manager: ConfigManager):
-        self.cfg = config_manager
-        self.sct = None # 延迟初始化，避免多线程冲突
-        self.templates = {} # 图片缓存
-        
-        # 预加载所有模板图片
-        self._load_all_templates()
-
-    def _get_image_path(self, filename):
-        """构建图片绝对路径"""
-        base_path = os.getcwd() # 假定在项目根目录运行
-        return os.path.join(base_path, "resources", "images", "templates", filename)
-
-    def _load_all_templates(self):
-        """加载配置中定义的所有图片到内存"""
-        img_dict = self.cfg.get("images")
-        if not img_dict:
-            return
-
-        for key, filename in img_dict.items():
-            path = self._get_image_path(filename)
-            if os.path.exists(path):
-                #以此模式读取：完整保留颜色，不自动转灰度（某些按钮可能区分颜色）
-                img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
-                if img is None:
-                    print(f"[Vision] 警告: 无法解码图片 {path}")
-                    continue
-                
-                # 如果是透明PNG，去掉Alpha通道，转为BGR，避免匹配出错
-                if img.shape[2] == 4:
-                    img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
-                
-                self.templates[key] = img
-            else:
-                print(f"[Vision] 错误: 图片文件不存在 {path}")
-
-    def init_manager(self):
-        """在工作线程内初始化 mss 实例"""
-        if self.sct is None:
-            self.sct = mss.mss()
-
-    def release(self):
-        """释放 mss 资源"""
-        if self.sct:
-            self.sct.close()
-            self.sct = None
-
-    def capture_screen(self, region=None):
-        """
-        截取屏幕
-        :param region: (x, y, w, h) 或 None (全屏)
-        :return: BGR格式的 numpy array
-        """
-        # 确保已初始化
-        if self.sct is None:
-            self.init_manager()
-
-        if region:
-            monitor = {
-                "left": int(region[0]),
-                "top": int(region[1]),
-                "width": int(region[2]),
-                "height": int(region[3])
-            }
-            img = self.sct.grab(monitor)
-        else:
-            # 全屏截取 (通常不建议，性能较差)
-            img = self.sct.grab(self.sct.monitors[1])
-            
-        img_np = np.array(img)
-        # MSS 返回的是 BGRA，转换为 OpenCV 标准 BGR
-        return cv2.cvtColor(img_np, cv2.COLOR_BGRA2BGR)
-
-    def find_template(self, key, region=None, confidence=None, grayscale=False):
-        """
-        在屏幕或指定区域寻找模板
-        :param key: 模板图片的key (如 'cast', 'bite')
-        :param region: 搜索区域 (x, y, w, h)
-        :param confidence: 置信度，如果不传则使用配置默认值
-        :param grayscale: 是否灰度匹配 (速度快，适合形状匹配)
-        :return: (center_x, center_y) or None
-        """
-        if key not in self.templates:
-            return None
-
-        # 1. 获取屏幕截图
-        screen = self.capture_screen(region)
-        template = self.templates[key]
-
-        # 2. 预处理 (灰度化)
-        if grayscale:
-            screen = cv2.cvtColor(screen, cv2.COLOR_BGR2GRAY)
-            if len(template.shape) == 3:
-                template = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
-
-        # 3. 匹配
-        # 如果置信度未指定，根据 key 类型智能选择默认值
-        if confidence is None:
-            if 'text' in key or 'btn' in key:
-                confidence = self.cfg.get('game_params', 'confidence_text', 0.7)
-            else:
-                confidence = self.cfg.get('game_params', 'confidence_common', 0.8)
-
-        res = cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)
-        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(res)
-
-        if max_val >= confidence:
-            # 计算中心坐标
-            h, w = template.shape[:2]
-            center_x = max_loc[0] + w // 2
-            center_y = max_loc[1] + h // 2
-            
-            # 如果指定了区域，需要把局部坐标转换回全局坐标
-            if region:
-                center_x += region[0]
-                center_y += region[1]
-                
-            return (int(center_x), int(center_y))
-        
-        return None
-
-    def detect_color_rect(self, region, color_name):
-        """
-        在指定区域检测特定颜色的矩形轮廓 (用于小游戏游标识别)
-        :return: list of bounding boxes [(x, y, w, h), ...] (相对于 region)
-        """
-        img = self.capture_screen(region)
-        img_hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-        
-        lower, upper = self.cfg.get_color_bounds(color_name)
-        if lower is None:
-            return []
-            
-        mask = cv2.inRange(img_hsv, lower, upper)
-        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        results = []
-        for cnt in contours:
-            if cv2.contourArea(cnt) > 20: # 过滤噪点
-                results.append(cv2.boundingRect(cnt))
-                
-        return results
\ No newline at end of file
+import cv2
+import json
+import numpy as np
+import os
+from utils.config_manager import ConfigManager
+
+# 主循环的状态检测参数，按优先级排列 (结算 > 位置错误 > 背包满 > 咬钩 > 抛竿)
+# key -> (ROI 名称 或 None=全屏, 置信度 或 None=配置默认值, 是否灰度匹配)
+# ROI 为 None 的检测也可以在 rois 中以 key 本身为名称配置区域 (见 core.roi_learner)
+STATE_PROBES = {
+    'result': (None, 0.7, True),
+    'pos_error': ('msg_tips', 0.7, False),
+    'full_warning': ('msg_tips', 0.75, False),
+    'bite': ('bite', None, False),
+    'cast': (None, 0.7, True),
+}
+PROBE_PRIORITY = tuple(STATE_PROBES)
+
+# 小游戏扫描带：命中判定只需要游标和黄条的横向范围，只截取它们所在的几行
+# 游标需要足够的行数才能通过 locate_cursor 的高度过滤 (h > 5)，黄条至少 2 行才有面积
+BAND_MIN_CURSOR_ROWS = 8
+BAND_MIN_ZONE_ROWS = 3
+BAND_PADDING = 1
+
+# 颜色色块过滤：像素数不超过 BLOB_MIN_AREA 的视为噪点；游标高度需大于 CURSOR_MIN_HEIGHT
+BLOB_MIN_AREA = 20
+CURSOR_MIN_HEIGHT = 5
+# 命中判定：游标中心所在列至少有 ZONE_MIN_COLUMN_PIXELS 个黄条像素 (扫描带保证至少 BAND_MIN_ZONE_ROWS 行黄条)
+ZONE_MIN_COLUMN_PIXELS = BAND_MIN_ZONE_ROWS
+
+# 模板核心区域裁剪：按梯度能量去掉平坦的背景边缘
+# 保留 TEMPLATE_CORE_ENERGY 的边缘能量，四周留 TEMPLATE_CORE_PADDING 像素；
+# 每边至少保留原尺寸的 TEMPLATE_CORE_MIN_FRACTION (且不少于 TEMPLATE_CORE_MIN_SIZE 像素)，
+# 面积节省不足 TEMPLATE_CORE_MIN_SAVING 时不裁剪；
+# 把全部模板贴在同一张带噪声的画布上比较完整模板与核心区域 (每个模板四周留 TEMPLATE_CORE_CANVAS_GAP 像素)：
+# 得分余量 (真实位置得分 - 其余位置最高得分) 下降，或与其它模板的最高相似度高出
+# TEMPLATE_CORE_MAX_CONFUSION 以上 (例如两个按钮只剩相同的文字) 时不裁剪。
+# 结果按模板文件的 mtime 缓存在 cache/cores.json 中
+TEMPLATE_CORE_ENERGY = 0.95
+TEMPLATE_CORE_PADDING = 4
+TEMPLATE_CORE_MIN_FRACTION = 0.5
+TEMPLATE_CORE_MIN_SIZE = 16
+TEMPLATE_CORE_MIN_SAVING = 0.1
+TEMPLATE_CORE_MAX_CONFUSION = 0.02
+TEMPLATE_CORE_CANVAS_GAP = 24
+TEMPLATE_CORE_CANVAS_WIDTH = 1024
+TEMPLATE_CORE_CACHE_VERSION = 2
+
+# 同一进程内的核心区域缓存：签名 -> {key: (x0, y0, x1, y1)}
+_core_cache = {}
+
+# UI 缩放搜索范围与步长 (一次性多尺度扫描时使用)
+SCALE_MIN = 0.5
+SCALE_MAX = 2.0
+SCALE_COARSE_STEP = 0.1
+SCALE_FINE_STEP = 0.02
+
+class Vision:
+    def __init__(self, config_manager: ConfigManager):
+        self.cfg = config_manager
+        self.sct = None # 延迟初始化，避免多线程冲突
+        self._templates = None # 当前缩放下的模板 (首次使用时加载，加快启动；已裁剪到核心区域)
+        self._gray_templates = {} # 当前缩放下的灰度模板
+        self._masks = {} # 当前缩放下的匹配掩码 (None = 完全不透明)
+        self._anchors = {} # 当前缩放下模板左上角到点击中心 (原模板中心) 的偏移
+        self._sizes = {} # 当前缩放下完整 (未裁剪) 模板的尺寸 (w, h)
+        self._base_templates = None # 原始 (2K) 模板
+        self._base_masks = {} # 原始模板的 alpha 掩码 (只保存含透明像素的模板)
+        self._cores = {} # 原始模板上的核心区域 (x0, y0, x1, y1)
+        self._template_files = {} # key -> 原始图片路径
+        self._scaled_cache = {} # 缩放比例 -> 模板字典 (内存缓存)
+        self._source = None # 外部帧源 (为 None 时使用 mss)
+        self.tracker = None # 游戏窗口几何跟踪 (roi_space = client 时提供偏移)
+        self.scale = 1.0 # 游戏 UI 相对模板的缩放比例
+        self.scale_calibrated = False
+        self.learner = None # 匹配位置统计 (core.roi_learner.RoiLearner)，None = 不记录
+        
+    @property
+    def templates(self):
+        """模板缓存：第一次访问时才解码图片，并按当前 UI 缩放取出对应尺寸"""
+        if self._templates is None:
+            self._prepare_templates(self._scaled_templates(self.scale))
+        return self._templates
+
+    @property
+    def base_templates(self):
+        if self._base_templates is None:
+            self._base_templates = {}
+            self._load_all_templates()
+        return self._base_templates
+
+    def share_templates(self, other):
+        """与另一个 Vision 共用已解码的模板和缩放缓存 (多窗口时每套模板只解码一次)"""
+        other.base_templates # 确保已加载
+        self._base_templates = other._base_templates
+        self._template_files = other._template_files
+        self._base_masks = other._base_masks
+        self._cores = other._cores
+        self._scaled_cache = other._scaled_cache
+        self._templates = None
+        self._gray_templates = {}
+
+    def _get_image_path(self, filename):
+        """构建图片绝对路径"""
+        base_path = os.getcwd() # 假定在项目根目录运行
+        return os.path.join(base_path, "resources", "images", "templates", filename)
+
+    def _get_cache_dir(self, scale):
+        """缩放模板的磁盘缓存目录 (按比例区分)"""
+        return os.path.join(os.getcwd(), "resources", "images", "cache", f"scale_{scale:.2f}")
+
+    def _get_core_cache_path(self):
+        """核心区域的磁盘缓存 (与缩放模板缓存同一目录)"""
+        return os.path.join(os.getcwd(), "resources", "images", "cache", "cores.json")
+
+    def _load_all_templates(self):
+        """加载配置中定义的所有图片到内存"""
+        img_dict = self.cfg.settings.images
+        if not img_dict:
+            return
+
+        for key, filename in img_dict.items():
+            path = self._get_image_path(filename)
+            if os.path.exists(path):
+                #以此模式读取：完整保留颜色，不自动转灰度（某些按钮可能区分颜色）
+                img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+                if img is None:
+                    print(f"[Vision] 警告: 无法解码图片 {path}")
+                    continue
+                
+                if img.ndim == 2:
+                    img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+
+                # 透明PNG：alpha 作为匹配掩码 (透明像素不参与匹配)，模板本身转为BGR
+                mask = None
+                if img.shape[2] == 4:
+                    alpha = img[:, :, 3]
+                    if (alpha < 255).any():
+                        mask = np.where(alpha >= 128, 255, 0).astype(np.uint8)
+                    img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+                
+                self._base_templates[key] = img
+                self._template_files[key] = path
+                if mask is not None:
+                    self._base_masks[key] = mask
+            else:
+                print(f"[Vision] 错误: 图片文件不存在 {path}")
+        self._cores.update(self._load_cores())
+
+    def _core_signature(self):
+        """核心区域缓存的签名：模板文件、mtime 与裁剪参数"""
+        files = sorted((key, path, os.path.getmtime(path)) for key, path in self._template_files.items())
+        params = (TEMPLATE_CORE_CACHE_VERSION, TEMPLATE_CORE_ENERGY, TEMPLATE_CORE_PADDING, TEMPLATE_CORE_MIN_FRACTION,
+                  TEMPLATE_CORE_MIN_SIZE, TEMPLATE_CORE_MIN_SAVING, TEMPLATE_CORE_MAX_CONFUSION,
+                  TEMPLATE_CORE_CANVAS_GAP, TEMPLATE_CORE_CANVAS_WIDTH)
+        return json.dumps([files, params])
+
+    def _load_cores(self):
+        """
+        核心区域：先查进程内缓存，再查磁盘缓存 (任一模板文件变化时整体重新计算)，最后才重新计算
+        重新计算需要对每个可裁剪的模板各做两次整张画布的匹配
+        """
+        signature = self._core_signature()
+        cores = _core_cache.get(signature)
+        if cores is not None:
+            return cores
+        path = self._get_core_cache_path()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("signature") == signature:
+                cores = {key: tuple(core) for key, core in data["cores"].items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        if cores is None:
+            cores = self.compute_cores(self._base_templates, self._base_masks)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump({"signature": signature, "cores": {k: list(v) for k, v in cores.items()}}, f)
+            except OSError as e:
+                print(f"[Vision] 警告: 无法写入核心区域缓存 {path}: {e}")
+        _core_cache[signature] = cores
+        return cores
+
+    @classmethod
+    def compute_cores(cls, templates, masks=None):
+        """
+        每个模板的核心区域 {key: (x0, y0, x1, y1)}
+        裁剪不能降低模板自身的得分余量，也不能让模板更像别的模板
+        (同一画面上的其它按钮 / 提示是最常见的误识别来源)，否则保留完整模板
+        """
+        masks = masks or {}
+        cores = {key: cls.template_core(img, masks.get(key)) for key, img in templates.items()}
+        if all((x1 - x0, y1 - y0) == (img.shape[1], img.shape[0])
+               for (x0, y0, x1, y1), img in zip(cores.values(), templates.values())):
+            return cores
+        canvas, boxes = cls.template_canvas(templates)
+        for key, (x0, y0, x1, y1) in list(cores.items()):
+            img = templates[key]
+            if (x1 - x0, y1 - y0) == (img.shape[1], img.shape[0]):
+                continue
+            full_margin, full_confusion = cls.canvas_margin(canvas, boxes, key, img, (0, 0))
+            core_margin, core_confusion = cls.canvas_margin(canvas, boxes, key, img[y0:y1, x0:x1], (x0, y0))
+            if core_margin < full_margin or core_confusion > full_confusion + TEMPLATE_CORE_MAX_CONFUSION:
+                cores[key] = (0, 0, img.shape[1], img.shape[0])
+        return cores
+
+    @staticmethod
+    def template_canvas(templates):
+        """
+        把全部模板按行贴在带渐变和噪声的画布上 (互为干扰项，背景不是纯色，避免平坦的边缘占便宜)
+        :return: (画布, {key: (x, y, w, h)})
+        """
+        gap = TEMPLATE_CORE_CANVAS_GAP
+        width = max([TEMPLATE_CORE_CANVAS_WIDTH] + [img.shape[1] + 2 * gap for img in templates.values()])
+        boxes, x, y, row_h = {}, gap, gap, 0
+        for key, img in templates.items():
+            h, w = img.shape[:2]
+            if x + w + gap > width:
+                x, y, row_h = gap, y + row_h + gap, 0
+            boxes[key] = (x, y, w, h)
+            x += w + gap
+            row_h = max(row_h, h)
+        height = y + row_h + gap
+        rng = np.random.default_rng(0)
+        gy = np.linspace(40, 110, height, dtype=np.float32)[:, None]
+        gx = np.linspace(0, 50, width, dtype=np.float32)[None, :]
+        base = np.stack(np.broadcast_arrays(gy + gx, gy * 0.9 + gx * 0.5, gy * 0.6), axis=2)
+        canvas = np.clip(base + rng.normal(0, 6, (height, width, 3)), 0, 255).astype(np.uint8)
+        for key, (x, y, w, h) in boxes.items():
+            canvas[y:y + h, x:x + w] = templates[key]
+        return canvas, boxes
+
+    @staticmethod
+    def canvas_margin(canvas, boxes, key, tpl, offset):
+        """
+        模板 (或其核心区域) 在画布上的得分余量，以及在其它模板上的最高得分
+        :param offset: tpl 左上角在完整模板中的位置
+        :return: (真实位置得分 - 其余位置最高得分, 其它模板上的最高得分)
+        """
+        res = cv2.matchTemplate(canvas, tpl, cv2.TM_CCOEFF_NORMED)
+        np.nan_to_num(res, copy=False, nan=-1.0, posinf=-1.0, neginf=-1.0)
+        th, tw = tpl.shape[:2]
+        bx, by = boxes[key][0] + offset[0], boxes[key][1] + offset[1]
+        score = float(res[by, bx])
+        confusion = -1.0
+        for other, (x, y, w, h) in boxes.items():
+            if other != key:
+                # 左上角落在该模板范围内的匹配位置
+                region = res[max(y - th + 1, 0):y + h, max(x - tw + 1, 0):x + w]
+                if region.size:
+                    confusion = max(confusion, float(region.max()))
+        res[max(by - th // 2, 0):by + th // 2 + 1, max(bx - tw // 2, 0):bx + tw // 2 + 1] = -1.0
+        return score - float(res.max()), confusion
+
+    @staticmethod
+    def template_core(img, mask=None):
+        """
+        模板中最有区分度的核心区域：按行 / 列的梯度能量裁掉平坦的背景边缘 (透明像素不计)
+        :return: (x0, y0, x1, y1)，不值得裁剪时为整张模板
+        """
+        h, w = img.shape[:2]
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY).astype(np.float32)
+        energy = np.abs(cv2.Sobel(gray, cv2.CV_32F, 1, 0)) + np.abs(cv2.Sobel(gray, cv2.CV_32F, 0, 1))
+        if mask is not None:
+            energy[mask == 0] = 0
+        total = energy.sum()
+        if total <= 0:
+            return (0, 0, w, h)
+
+        tail = (1.0 - TEMPLATE_CORE_ENERGY) / 2
+        spans = []
+        for profile in (energy.sum(axis=0), energy.sum(axis=1)): # 列、行
+            n = len(profile)
+            cum = np.cumsum(profile) / total
+            lo = max(int(np.searchsorted(cum, tail)) - TEMPLATE_CORE_PADDING, 0)
+            hi = min(int(np.searchsorted(cum, 1.0 - tail)) + 1 + TEMPLATE_CORE_PADDING, n)
+            need = min(n, max(TEMPLATE_CORE_MIN_SIZE, int(np.ceil(n * TEMPLATE_CORE_MIN_FRACTION))))
+            if hi - lo < need:
+                lo = min(max((lo + hi - need) // 2, 0), n - need)
+                hi = lo + need
+            spans.append((lo, hi))
+        (x0, x1), (y0, y1) = spans
+        if (x1 - x0) * (y1 - y0) > (1.0 - TEMPLATE_CORE_MIN_SAVING) * w * h:
+            return (0, 0, w, h)
+        return (x0, y0, x1, y1)
+
+    def _prepare_templates(self, full):
+        """
+        由当前缩放下的完整模板生成实际匹配用的模板：裁剪到核心区域 (vision.template_crop)，
+        缩放并裁剪掩码，记录点击中心相对裁剪后左上角的偏移，find_template 返回的坐标与裁剪前一致
+        """
+        crop = self.cfg.settings.template_crop
+        templates, masks, anchors, sizes = {}, {}, {}, {}
+        for key, img in full.items():
+            h, w = img.shape[:2]
+            base_h, base_w = self.base_templates[key].shape[:2]
+            mask = self._base_masks.get(key)
+            if mask is not None and mask.shape != (h, w):
+                mask = cv2.resize(mask, (w, h), interpolation=cv2.INTER_NEAREST)
+
+            x0, y0, x1, y1 = self._cores.get(key, (0, 0, base_w, base_h)) if crop else (0, 0, base_w, base_h)
+            x0, x1 = x0 * w // base_w, -(-x1 * w // base_w)
+            y0, y1 = y0 * h // base_h, -(-y1 * h // base_h)
+            templates[key] = img[y0:y1, x0:x1]
+            masks[key] = mask[y0:y1, x0:x1] if mask is not None else None
+            anchors[key] = (w // 2 - x0, h // 2 - y0)
+            sizes[key] = (w, h)
+
+        self._masks = masks
+        self._anchors = anchors
+        self._sizes = sizes
+        self._gray_templates = {}
+        self._templates = templates
+
+    # ================= UI 缩放 =================
+
+    def set_scale(self, scale):
+        """切换 UI 缩放比例 (保留两位小数，便于缓存复用)"""
+        scale = round(float(scale), 2)
+        if scale != self.scale:
+            self.scale = scale
+            self._templates = None
+            self._gray_templates = {}
+        self.scale_calibrated = True
+        return scale
+
+    def _scaled_templates(self, scale):
+        """
+        获取指定缩放下的全部模板
+        先查内存缓存，再查磁盘缓存 (原图比缓存新时重新生成)，最后才重新缩放
+        """
+        if scale == 1.0:
+            return self.base_templates
+        if scale in self._scaled_cache:
+            return self._scaled_cache[scale]
+
+        cache_dir = self._get_cache_dir(scale)
+        interp = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_CUBIC
+        scaled = {}
+        for key, img in self.base_templates.items():
+            src = self._template_files[key]
+            cached = os.path.join(cache_dir, os.path.basename(src))
+            tpl = None
+            if os.path.exists(cached) and os.path.getmtime(cached) >= os.path.getmtime(src):
+                tpl = cv2.imread(cached, cv2.IMREAD_COLOR)
+            if tpl is None:
+                h, w = img.shape[:2]
+                size = (max(1, round(w * scale)), max(1, round(h * scale)))
+                tpl = cv2.resize(img, size, interpolation=interp)
+                try:
+                    os.makedirs(cache_dir, exist_ok=True)
+                    cv2.imwrite(cached, tpl)
+                except OSError as e:
+                    print(f"[Vision] 警告: 无法写入模板缓存 {cached}: {e}")
+            scaled[key] = tpl
+
+        self._scaled_cache[scale] = scaled
+        return scaled
+
+    def calibrate_scale(self, client_size=None):
+        """
+        一次性确定游戏 UI 缩放
+        优先级：配置 vision.ui_scale > 窗口客户区尺寸 > 以抛竿图标做多尺度扫描
+        :param client_size: 游戏窗口客户区 (w, h)，未知时为 None
+        :return: 缩放比例；扫描失败返回 None (保持当前比例)
+        """
+        settings = self.cfg.settings
+        if settings.ui_scale is not None:
+            return self.set_scale(settings.ui_scale)
+
+        if client_size:
+            base_w, base_h = settings.base_resolution
+            # 游戏 UI 按较短的一边等比缩放 (宽屏两侧留黑边时也成立)
+            return self.set_scale(min(client_size[0] / base_w, client_size[1] / base_h))
+
+        scale = self.discover_scale('cast')
+        if scale is not None:
+            self.set_scale(scale)
+        return scale
+
+    def discover_scale(self, key='cast', confidence=0.7):
+        """
+        多尺度扫描：先在半分辨率下粗搜，再在全分辨率下于最佳值附近细搜
+        只在校准时执行一次，之后每次 find_template 仍是单尺度匹配
+        """
+        base = self.base_templates.get(key)
+        if base is None:
+            return None
+
+        screen = cv2.cvtColor(self.capture_screen(), cv2.COLOR_BGR2GRAY)
+        tpl = cv2.cvtColor(base, cv2.COLOR_BGR2GRAY)
+
+        def score_at(img, factor, scale):
+            t = cv2.resize(tpl, None, fx=scale * factor, fy=scale * factor, interpolation=cv2.INTER_AREA)
+            if min(t.shape) < 8 or t.shape[0] > img.shape[0] or t.shape[1] > img.shape[1]:
+                return -1.0
+            return cv2.minMaxLoc(cv2.matchTemplate(img, t, cv2.TM_CCOEFF_NORMED))[1]
+
+        small = cv2.resize(screen, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA)
+        coarse = np.arange(SCALE_MIN, SCALE_MAX + 1e-9, SCALE_COARSE_STEP)
+        best_scale = max(coarse, key=lambda s: score_at(small, 0.5, s))
+
+        fine = np.arange(best_scale - SCALE_COARSE_STEP, best_scale + SCALE_COARSE_STEP + 1e-9, SCALE_FINE_STEP)
+        scored = [(score_at(screen, 1.0, s), s) for s in fine if s > 0]
+        best_val, best_scale = max(scored)
+        if best_val < confidence:
+            return None
+        return float(best_scale)
+
+    def init_manager(self):
+        """在工作线程内初始化 mss 实例"""
+        if self.sct is None:
+            if self._source is not None:
+                self.sct = self._source
+                return
+            import mss
+            self.sct = mss.mss()
+
+    def attach_source(self, source):
+        """
+        使用自定义帧源代替 mss (离线回放 / 基准测试)
+        :param source: 提供 grab(monitor) / monitors / close() 的对象，见 core.frame_source
+        """
+        self.release()
+        self._source = source
+        self.sct = source
+
+    def release(self):
+        """释放 mss 资源"""
+        if self.sct:
+            self.sct.close()
+            self.sct = None
+
+    def capture_screen(self, region=None):
+        """
+        截取屏幕
+        :param region: (x, y, w, h) 或 None (全屏)
+        :return: BGR格式的 numpy array
+        """
+        # 确保已初始化
+        if self.sct is None:
+            self.init_manager()
+
+        if region:
+            monitor = {
+                "left": int(region[0]),
+                "top": int(region[1]),
+                "width": int(region[2]),
+                "height": int(region[3])
+            }
+            img = self.sct.grab(monitor)
+        else:
+            # 全屏截取 (通常不建议，性能较差)
+            img = self.sct.grab(self.sct.monitors[1])
+            
+        img_np = np.array(img)
+        # MSS 返回的是 BGRA，转换为 OpenCV 标准 BGR
+        return cv2.cvtColor(img_np, cv2.COLOR_BGRA2BGR)
+
+    def find_template(self, key, region=None, confidence=None, grayscale=False):
+        """
+        在屏幕或指定区域寻找模板
+        :param key: 模板图片的key (如 'cast', 'bite')
+        :param region: 搜索区域 (x, y, w, h)
+        :param confidence: 置信度，如果不传则使用配置默认值
+        :param grayscale: 是否灰度匹配 (速度快，适合形状匹配)
+        :return: (center_x, center_y) or None
+        """
+        if key not in self.templates:
+            return None
+
+        # 1. 获取屏幕截图
+        screen = self.capture_screen(region)
+
+        # 2. 预处理 (灰度化)
+        if grayscale:
+            screen = cv2.cvtColor(screen, cv2.COLOR_BGR2GRAY)
+
+        offset = (region[0], region[1]) if region else (0, 0)
+        return self.match_template(key, screen, offset, confidence, grayscale)
+
+    def template(self, key, grayscale=False):
+        """当前缩放下的模板，灰度版本转换一次后缓存"""
+        template = self.templates.get(key)
+        if template is None or not grayscale or len(template.shape) != 3:
+            return template
+        gray = self._gray_templates.get(key)
+        if gray is None:
+            gray = self._gray_templates[key] = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+        return gray
+
+    def match_template(self, key, screen, offset=(0, 0), confidence=None, grayscale=False):
+        """
+        在已截取的图像上匹配模板 (不截图，可在线程池中调用)
+        :param screen: BGR 图像，grayscale=True 时为灰度图
+        :param offset: screen 左上角的屏幕坐标
+        :return: (center_x, center_y) or None
+        """
+        template = self.template(key, grayscale)
+        if template is None:
+            return None
+        th, tw = template.shape[:2]
+        if screen.shape[0] < th or screen.shape[1] < tw:
+            return None
+        mask = self._masks.get(key)
+
+        # 3. 匹配
+        # 如果置信度未指定，根据 key 类型智能选择默认值
+        if confidence is None:
+            settings = self.cfg.settings
+            if 'text' in key or 'btn' in key:
+                confidence = settings.confidence_text
+            else:
+                confidence = settings.confidence_common
+
+        if mask is None:
+            res = cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)
+        else:
+            # 带掩码匹配时，遮住的区域方差为 0 会得到 inf / nan
+            res = cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED, mask=mask)
+            np.nan_to_num(res, copy=False, nan=-1.0, posinf=-1.0, neginf=-1.0)
+        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(res)
+
+        if max_val >= confidence:
+            # 计算点击中心 (裁剪前模板的中心)，并把局部坐标转换回全局坐标
+            anchor_x, anchor_y = self._anchors[key]
+            center_x = max_loc[0] + anchor_x + offset[0]
+            center_y = max_loc[1] + anchor_y + offset[1]
+            learner = self.learner
+            if learner is not None:
+                self._record_match(learner, key, center_x, center_y, max_val)
+            return (int(center_x), int(center_y))
+        
+        return None
+
+    def _record_match(self, learner, key, center_x, center_y, score):
+        """把完整模板在配置坐标系 (与 rois 相同) 中的矩形交给 learner"""
+        w, h = self._sizes[key]
+        x, y = int(center_x) - w // 2, int(center_y) - h // 2
+        if learner.roi_space == 'client' and self.tracker is not None:
+            ox, oy = self.tracker.origin()
+            x, y = x - ox, y - oy
+        learner.record(key, (x, y, w, h), float(score))
+
+    def screen_region(self, region, settings=None):
+        """
+        把配置中的 ROI 换算为屏幕坐标
+        roi_space = client 时加上窗口跟踪器缓存的客户区偏移 (不会每帧查询窗口)
+        """
+        if region is None:
+            return None
+        if settings is None:
+            settings = self.cfg.settings
+        if settings.roi_space != 'client' or self.tracker is None:
+            return region
+        ox, oy = self.tracker.origin()
+        return (region[0] + ox, region[1] + oy, region[2], region[3])
+
+    def probe_params(self, key, settings):
+        """
+        状态检测的实际参数
+        :return: (屏幕坐标的检测区域 或 None=全屏, 置信度, 是否灰度)
+        """
+        roi_name, confidence, grayscale = STATE_PROBES[key]
+        region = settings.roi(roi_name or key)
+        return self.screen_region(region, settings), confidence, grayscale
+
+    def probe(self, key, settings=None):
+        """
+        按 STATE_PROBES 中的参数执行一次状态检测
+        :param settings: 配置快照 (用于读取 ROI)，默认取当前快照
+        :return: (center_x, center_y) or None
+        """
+        if settings is None:
+            settings = self.cfg.settings
+        region, confidence, grayscale = self.probe_params(key, settings)
+        return self.find_template(key, region=region, confidence=confidence, grayscale=grayscale)
+
+    def detect_color_rect(self, region, color_name):
+        """
+        在指定区域检测特定颜色的矩形轮廓 (用于小游戏游标识别)
+        :return: list of bounding boxes [(x, y, w, h), ...] (相对于 region)
+        """
+        img = self.capture_screen(region)
+        img_hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+        
+        lower, upper = self.cfg.get_color_bounds(color_name)
+        if lower is None:
+            return []
+            
+        return [tuple(int(v) for v in blob[:4]) for blob in self.color_blobs(img_hsv, lower, upper)]
+
+    # ================= 小游戏单帧识别 =================
+
+    @staticmethod
+    def color_blobs(img_hsv, lower, upper, min_area=BLOB_MIN_AREA):
+        """
+        提取颜色掩码中的所有色块 (8 连通域)，一次调用得到全部外接矩形与面积 (通用区域检测使用)
+        connectedComponentsWithStats 直接给出 N×5 的统计表，噪点过滤是一次向量化的布尔索引
+        :return: N×5 int32 数组，每行 (x, y, w, h, 像素数)；已去掉像素数不超过 min_area 的噪点
+        """
+        mask = cv2.inRange(img_hsv, lower, upper)
+        # 任意大小的区域都可能出现上万个噪点连通域，标签用 32 位
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8, ltype=cv2.CV_32S)
+        stats = stats[1:count] # 第 0 行是背景
+        return stats[stats[:, cv2.CC_STAT_AREA] > min_area]
+
+    @staticmethod
+    def column_runs(mask):
+        """
+        按列投影的游程：小游戏只关心横向范围，把掩码按列求和后找出连续的非空列
+        只需一次 cv2.reduce 和几次向量运算，比逐个追踪连通域 / 轮廓便宜
+        :return: (每列像素数, 各段起始列, 各段结束列 (不含))
+        """
+        cols = cv2.reduce(mask, 0, cv2.REDUCE_SUM, dtype=cv2.CV_32S).ravel() // 255
+        xs = np.flatnonzero(cols)
+        if not xs.size:
+            return cols, xs, xs
+        cut = np.flatnonzero(xs[1:] - xs[:-1] > 1) + 1
+        starts = xs[np.concatenate(([0], cut))]
+        ends = xs[np.concatenate((cut - 1, [-1]))] + 1
+        return cols, starts, ends
+
+    @staticmethod
+    def scanline_band(cursor_rows, zone_rows, min_cursor=BAND_MIN_CURSOR_ROWS,
+                      min_zone=BAND_MIN_ZONE_ROWS, padding=BAND_PADDING):
+        """
+        找出同时包含足够游标行和黄条行的最窄连续行区间
+        :param cursor_rows: 每行是否出现游标颜色 (bool 数组)
+        :param zone_rows: 每行是否出现黄条颜色 (bool 数组)
+        :return: (y0, y1) 半开区间 (已加上 padding)；找不到时返回 None
+        """
+        n = len(cursor_rows)
+        c = np.concatenate(([0], np.cumsum(cursor_rows)))
+        z = np.concatenate(([0], np.cumsum(zone_rows)))
+        best = None
+        for y0 in range(n):
+            for y1 in range(y0 + 1, n + 1):
+                if c[y1] - c[y0] >= min_cursor and z[y1] - z[y0] >= min_zone:
+                    if best is None or y1 - y0 < best[1] - best[0]:
+                        best = (y0, y1)
+                    break
+        if best is None:
+            return None
+        return max(best[0] - padding, 0), min(best[1] + padding, n)
+
+    def locate_cursor(self, img_hsv, lower, upper):
+        """
+        在小游戏 HSV 图像中识别游标
+        :return: (cursor_x, cursor_w)，未找到返回 (-1, 0)
+        """
+        cols, starts, ends = self.column_runs(cv2.inRange(img_hsv, lower, upper))
+        if not starts.size:
+            return -1, 0
+
+        # 像素最多的一段连续列作为游标 (游标是竖条，高度取该段中像素最多的一列)
+        area = np.add.reduceat(cols, starts)
+        i = int(area.argmax())
+        x0, x1 = int(starts[i]), int(ends[i])
+        if area[i] > BLOB_MIN_AREA and cols[x0:x1].max() > CURSOR_MIN_HEIGHT: # 简单过滤
+            return x0, x1 - x0
+        return -1, 0
+
+    def in_color_zone(self, img_hsv, center_x, lower, upper):
+        """判定：横坐标 center_x 是否落在某个颜色区域 (黄条) 的横向范围内 (只检查这一列)"""
+        column = img_hsv[:, center_x:center_x + 1]
+        return cv2.countNonZero(cv2.inRange(column, lower, upper)) >= ZONE_MIN_COLUMN_PIXELS
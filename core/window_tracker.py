@@ -0,0 +1,98 @@
+"""
+游戏窗口几何跟踪
+settings.json 中 roi_space = "client" 时，ROI 以游戏客户区左上角为原点保存。
+WindowTracker 缓存客户区在屏幕上的位置，只按固定间隔 (或 invalidate 后) 重新查询，
+每次截图只需加上缓存的偏移，仍然只截取 ROI 小区域。
+"""
+import threading
+import time
+
+# 窗口位置的最长缓存时间 (秒)：窗口被拖动后最多延迟这么久生效
+GEOMETRY_REFRESH_INTERVAL = 1.0
+
+
+class WindowTracker:
+    def __init__(self, window_backend, handle=None, refresh_interval=GEOMETRY_REFRESH_INTERVAL,
+                 clock=time.monotonic):
+        self.window = window_backend
+        self.handle = handle
+        self.refresh_interval = refresh_interval
+        self.clock = clock
+        self.lookups = 0 # 实际查询窗口几何的次数 (便于确认没有每帧查询)
+        self._rect = None
+        self._checked = None
+        self._lock = threading.Lock()
+
+    def attach(self, handle):
+        """绑定窗口句柄并立即刷新"""
+        self.handle = handle
+        self.invalidate()
+        return self.rect()
+
+    def invalidate(self):
+        """丢弃缓存 (窗口移动 / 重新激活后调用)，下次访问时重新查询"""
+        self._checked = None
+
+    def rect(self):
+        """
+        客户区在屏幕上的位置 (x, y, w, h)
+        查询失败时沿用上一次的结果；从未成功时返回 None
+        """
+        now = self.clock()
+        if self._checked is not None and now - self._checked < self.refresh_interval:
+            return self._rect
+        with self._lock:
+            if self._checked is None or now - self._checked >= self.refresh_interval:
+                self._checked = now
+                if self.handle is not None:
+                    self.lookups += 1
+                    try:
+                        rect = self.window.client_rect(self.handle)
+                    except Exception as e:
+                        print(f"[WindowTracker] 获取窗口位置失败: {e}")
+                        rect = None
+                    if rect is not None:
+                        self._rect = tuple(int(v) for v in rect)
+        return self._rect
+
+    def origin(self):
+        """客户区左上角的屏幕坐标，未知时为 (0, 0)"""
+        rect = self.rect()
+        return (rect[0], rect[1]) if rect else (0, 0)
+
+    def size(self):
+        rect = self.rect()
+        return (rect[2], rect[3]) if rect else None
+
+
+def to_screen(region, origin):
+    """客户区坐标 -> 屏幕坐标"""
+    if region is None:
+        return None
+    return (region[0] + origin[0], region[1] + origin[1], region[2], region[3])
+
+
+def to_client(region, origin):
+    """屏幕坐标 -> 客户区坐标"""
+    if region is None:
+        return None
+    return (region[0] - origin[0], region[1] - origin[1], region[2], region[3])
+
+
+def find_game_client(cfg):
+    """
+    一次性查找游戏窗口客户区 (供界面换算 ROI 使用)
+    :return: (x, y, w, h) 或 None (未找到窗口 / 后端不支持)
+    """
+    from core.backends import create_window_backend
+
+    settings = cfg.settings
+    try:
+        window = create_window_backend(settings.backend)
+        handle = window.find_window(settings.window_title)
+        if handle is None:
+            return None
+        return window.client_rect(handle)
+    except Exception as e:
+        print(f"[WindowTracker] 查找游戏窗口失败: {e}")
+        return None
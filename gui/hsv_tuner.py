@@ -1,185 +1,633 @@
-import cv2
-import numpy as np
-import mss
-from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                             QSlider, QPushButton, QGroupBox, QMessageBox)
-from PyQt6.QtCore import Qt, pyqtSlot
-from PyQt6.QtGui import QImage, QPixmap
-
-class HSVTuner(QWidget):
-    def __init__(self, config_manager, color_key='yellow'):
-        super().__init__()
-        self.cfg = config_manager
-        self.color_key = color_key
-        self.setWindowTitle(f"HSV 颜色调校器 - {color_key}")
-        self.resize(800, 600)
-        
-        # 1. 获取初始截图 (截取 ROI 区域)
-        self.roi = self.cfg.get('rois', 'minigame')
-        self.original_img = self._capture_roi()
-        self.processed_img = None
-        
-        # 如果截图失败（比如 ROI 没设置），就创建一个黑图防止报错
-        if self.original_img is None:
-            self.original_img = np.zeros((100, 400, 3), dtype=np.uint8)
-
-        # 2. 读取当前配置的初始值
-        lower, upper = self.cfg.get_color_bounds(color_key)
-        if lower is None:
-            lower = np.array([0, 0, 0])
-            upper = np.array([180, 255, 255])
-            
-        self.init_hsv = (lower, upper)
-
-        # 3. 构建 UI
-        self.init_ui()
-        
-        # 4. 首次渲染
-        self.update_preview()
-
-    def _capture_roi(self):
-        """截取当前配置的 ROI 区域"""
-        if not self.roi:
-            return None
-            
-        with mss.mss() as sct:
-            monitor = {
-                "left": int(self.roi[0]),
-                "top": int(self.roi[1]),
-                "width": int(self.roi[2]),
-                "height": int(self.roi[3])
-            }
-            img = sct.grab(monitor)
-            img_np = np.array(img)
-            # BGRA -> BGR
-            return cv2.cvtColor(img_np, cv2.COLOR_BGRA2BGR)
-
-    def init_ui(self):
-        main_layout = QVBoxLayout(self)
-
-        # === 顶部：图像预览区 ===
-        preview_layout = QHBoxLayout()
-        
-        # 左侧：原图
-        self.lbl_original = QLabel()
-        self.lbl_original.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.lbl_original.setStyleSheet("border: 1px solid #555; background: #000;")
-        self._set_image(self.lbl_original, self.original_img)
-        
-        # 右侧：二值图 (Mask)
-        self.lbl_result = QLabel()
-        self.lbl_result.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.lbl_result.setStyleSheet("border: 1px solid #0f0; background: #000;")
-        
-        preview_layout.addWidget(QLabel("原图:"))
-        preview_layout.addWidget(self.lbl_original)
-        preview_layout.addWidget(QLabel("识别结果 (白=选中):"))
-        preview_layout.addWidget(self.lbl_result)
-        
-        main_layout.addLayout(preview_layout)
-
-        # === 中部：滑块控制区 ===
-        sliders_group = QGroupBox("HSV 阈值调节")
-        sliders_layout = QVBoxLayout()
-        
-        self.sliders = {}
-        # H: 0-180, S: 0-255, V: 0-255
-        ranges = [('H', 180), ('S', 255), ('V', 255)]
-        
-        # 下限滑块 (Lower)
-        sliders_layout.addWidget(QLabel("--- 下限 (Lower) ---"))
-        for i, (name, max_val) in enumerate(ranges):
-            row = self._create_slider_row(f"{name} Min", 0, max_val, int(self.init_hsv[0][i]))
-            sliders_layout.addLayout(row)
-            self.sliders[f"{name}_min"] = row.itemAt(1).widget()
-
-        # 上限滑块 (Upper)
-        sliders_layout.addWidget(QLabel("--- 上限 (Upper) ---"))
-        for i, (name, max_val) in enumerate(ranges):
-            row = self._create_slider_row(f"{name} Max", 0, max_val, int(self.init_hsv[1][i]))
-            sliders_layout.addLayout(row)
-            self.sliders[f"{name}_max"] = row.itemAt(1).widget()
-
-        sliders_group.setLayout(sliders_layout)
-        main_layout.addWidget(sliders_group)
-
-        # === 底部：按钮区 ===
-        btn_layout = QHBoxLayout()
-        
-        self.btn_save = QPushButton("💾 保存应用")
-        self.btn_save.setMinimumHeight(40)
-        self.btn_save.setStyleSheet("background-color: #28a745; color: white; font-weight: bold;")
-        self.btn_save.clicked.connect(self.save_settings)
-        
-        btn_layout.addStretch()
-        btn_layout.addWidget(self.btn_save)
-        
-        main_layout.addLayout(btn_layout)
-
-    def _create_slider_row(self, label, min_val, max_val, init_val):
-        layout = QHBoxLayout()
-        lbl_name = QLabel(f"{label}:")
-        lbl_name.setFixedWidth(60)
-        
-        slider = QSlider(Qt.Orientation.Horizontal)
-        slider.setRange(min_val, max_val)
-        slider.setValue(init_val)
-        slider.valueChanged.connect(self.update_preview)
-        
-        lbl_val = QLabel(str(init_val))
-        lbl_val.setFixedWidth(40)
-        slider.valueChanged.connect(lambda v, l=lbl_val: l.setText(str(v)))
-        
-        layout.addWidget(lbl_name)
-        layout.addWidget(slider)
-        layout.addWidget(lbl_val)
-        return layout
-
-    def update_preview(self):
-        # 1. 获取滑块当前值
-        h_min = self.sliders['H_min'].value()
-        s_min = self.sliders['S_min'].value()
-        v_min = self.sliders['V_min'].value()
-        
-        h_max = self.sliders['H_max'].value()
-        s_max = self.sliders['S_max'].value()
-        v_max = self.sliders['V_max'].value()
-        
-        lower = np.array([h_min, s_min, v_min])
-        upper = np.array([h_max, s_max, v_max])
-        
-        # 2. 图像处理
-        hsv = cv2.cvtColor(self.original_img, cv2.COLOR_BGR2HSV)
-        mask = cv2.inRange(hsv, lower, upper)
-        
-        # 3. 显示结果 (Mask 是灰度图)
-        h, w = mask.shape
-        bytes_per_line = w
-        q_img = QImage(mask.data, w, h, bytes_per_line, QImage.Format.Format_Grayscale8)
-        self.lbl_result.setPixmap(QPixmap.fromImage(q_img))
-
-    def _set_image(self, label, cv_img):
-        """将 OpenCV 图像显示到 Label"""
-        # BGR -> RGB
-        rgb_img = cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb_img.shape
-        bytes_per_line = ch * w
-        q_img = QImage(rgb_img.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
-        label.setPixmap(QPixmap.fromImage(q_img))
-
-    def save_settings(self):
-        lower = [
-            self.sliders['H_min'].value(),
-            self.sliders['S_min'].value(),
-            self.sliders['V_min'].value()
-        ]
-        upper = [
-            self.sliders['H_max'].value(),
-            self.sliders['S_max'].value(),
-            self.sliders['V_max'].value()
-        ]
-        
-        self.cfg.set_color(self.color_key, lower, upper)
-        self.cfg.save_config()
-        QMessageBox.information(self, "成功", f"颜色 [{self.color_key}] 配置已保存！")
-        self.close()
\ No newline at end of file
+import os
+import time
+import cv2
+import numpy as np
+import mss
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
+                             QSlider, QPushButton, QGroupBox, QMessageBox,
+                             QListWidget, QFileDialog, QApplication)
+from PyQt6.QtCore import Qt, pyqtSlot, pyqtSignal, QTimer, QThread
+from PyQt6.QtGui import QImage, QPixmap
+
+from core import hsv_fit
+from core.window_tracker import find_game_client, to_screen
+
+# 连拍采样参数：30 帧 x 0.1s ≈ 3 秒，足以覆盖一次 QTE 读条
+BURST_FRAMES = 30
+BURST_INTERVAL = 0.1
+# 从视频中最多抽取的帧数 (均匀抽帧)
+VIDEO_MAX_FRAMES = 120
+# 滑块防抖间隔 (毫秒)
+PREVIEW_DEBOUNCE_MS = 60
+
+IMAGE_EXTS = ('.png', '.jpg', '.jpeg', '.bmp')
+# 标注画笔半径 (像素)
+MARK_RADIUS = 3
+
+
+class FrameStack:
+    """
+    样本帧栈：一次性完成 BGR -> HSV 转换并缓存
+    所有帧统一为相同尺寸，纵向拼接成一张长图，
+    这样调节阈值时只需对整个栈调用一次 cv2.inRange
+    """
+
+    def __init__(self, frames):
+        if not frames:
+            raise ValueError("样本帧为空")
+
+        h, w = frames[0].shape[:2]
+        normalized = []
+        for f in frames:
+            if f.shape[:2] != (h, w):
+                f = cv2.resize(f, (w, h), interpolation=cv2.INTER_NEAREST)
+            normalized.append(f)
+
+        self.frames = normalized
+        self.count = len(normalized)
+        self.height = h
+        self.width = w
+
+        # [性能优化] HSV 只转换一次：(N*H, W, 3) 的连续内存
+        bgr_tall = np.ascontiguousarray(np.concatenate(normalized, axis=0))
+        self.hsv = cv2.cvtColor(bgr_tall, cv2.COLOR_BGR2HSV)
+        self.mask = None
+
+    def apply(self, lower, upper):
+        """
+        对整个栈执行阈值过滤
+        :return: 每帧的像素覆盖率 (0~1) numpy array, shape (N,)
+        """
+        self.mask = cv2.inRange(self.hsv, lower, upper)
+        per_frame = self.mask.reshape(self.count, self.height * self.width)
+        return np.count_nonzero(per_frame, axis=1) / float(self.height * self.width)
+
+    def frame_mask(self, index):
+        """取出第 index 帧的掩码 (视图，不复制)"""
+        if self.mask is None:
+            return None
+        top = index * self.height
+        return self.mask[top:top + self.height]
+
+
+def capture_burst(roi, count=BURST_FRAMES, interval=BURST_INTERVAL):
+    """按固定间隔连续截取 ROI 区域，返回 BGR 帧列表"""
+    if not roi:
+        return []
+
+    monitor = {
+        "left": int(roi[0]),
+        "top": int(roi[1]),
+        "width": int(roi[2]),
+        "height": int(roi[3])
+    }
+    frames = []
+    with mss.mss() as sct:
+        for i in range(count):
+            img_np = np.array(sct.grab(monitor))
+            # BGRA -> BGR
+            frames.append(cv2.cvtColor(img_np, cv2.COLOR_BGRA2BGR))
+            if i != count - 1:
+                time.sleep(interval)
+    return frames
+
+
+class BurstCaptureThread(QThread):
+    """在后台线程中连拍 (约 BURST_FRAMES * BURST_INTERVAL 秒)，避免界面卡住"""
+    frames_ready = pyqtSignal(list)
+    failed = pyqtSignal(str)
+
+    def __init__(self, roi, parent=None):
+        super().__init__(parent)
+        self.roi = roi
+
+    def run(self):
+        # mss 句柄与线程相关，在工作线程内创建 (capture_burst 内部创建并释放)
+        try:
+            self.frames_ready.emit(capture_burst(self.roi))
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+def load_frames_from_files(paths, max_video_frames=VIDEO_MAX_FRAMES):
+    """
+    从图片或视频文件加载样本帧
+    图片：每个文件一帧；视频：均匀抽取至多 max_video_frames 帧
+    """
+    frames = []
+    for path in paths:
+        if path.lower().endswith(IMAGE_EXTS):
+            img = cv2.imread(path, cv2.IMREAD_COLOR)
+            if img is not None:
+                frames.append(img)
+            continue
+
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            continue
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or max_video_frames
+        step = max(1, total // max_video_frames)
+        idx = 0
+        while len(frames) < max_video_frames:
+            ok = cap.grab()
+            if not ok:
+                break
+            if idx % step == 0:
+                ok, img = cap.retrieve()
+                if ok:
+                    frames.append(img)
+            idx += 1
+        cap.release()
+    return frames
+
+
+class MarkableLabel(QLabel):
+    """
+    可标注的图像 Label
+    左键拖动 = 标记目标像素，右键拖动 = 标记背景像素
+    发送的是图像坐标 (已扣除居中显示的偏移)
+    """
+    mark_signal = pyqtSignal(int, int, int)  # x, y, label
+
+    def __init__(self):
+        super().__init__()
+        self._label = None
+
+    def _image_pos(self, event):
+        pix = self.pixmap()
+        if pix is None or pix.isNull():
+            return None
+        off_x = (self.width() - pix.width()) // 2
+        off_y = (self.height() - pix.height()) // 2
+        pos = event.position().toPoint()
+        return pos.x() - off_x, pos.y() - off_y
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            self._label = hsv_fit.LABEL_TARGET
+        elif event.button() == Qt.MouseButton.RightButton:
+            self._label = hsv_fit.LABEL_BACKGROUND
+        self.mouseMoveEvent(event)
+
+    def mouseMoveEvent(self, event):
+        if self._label is None:
+            return
+        pos = self._image_pos(event)
+        if pos:
+            self.mark_signal.emit(pos[0], pos[1], self._label)
+
+    def mouseReleaseEvent(self, event):
+        self._label = None
+
+
+class HSVTuner(QWidget):
+    def __init__(self, config_manager, color_key='yellow'):
+        super().__init__()
+        self.cfg = config_manager
+        self.color_key = color_key
+        self.setWindowTitle(f"HSV 颜色调校器 - {color_key}")
+        self.resize(900, 700)
+        
+        # 1. 获取初始样本 (截取 ROI 区域)
+        self.roi = self.cfg.get('rois', 'minigame')
+        self.window_missing = False # ROI 已配置 (窗口相对坐标)，但找不到游戏窗口无法换算
+        if self.roi and self.cfg.settings.roi_space == 'client':
+            # 窗口相对坐标：换算为当前窗口位置下的屏幕坐标
+            client = find_game_client(self.cfg)
+            self.roi = to_screen(self.roi, client[:2]) if client else None
+            self.window_missing = client is None
+        self.burst_thread = None
+        self.stack = None
+        self.coverage = None
+        self.current_index = 0
+        self.labels = {}  # 帧序号 -> 标注图 (uint8, 见 hsv_fit.LABEL_*)
+        
+        frame = self._capture_roi()
+        # 如果截图失败（比如 ROI 没设置），就创建一个黑图防止报错
+        if frame is None:
+            frame = np.zeros((100, 400, 3), dtype=np.uint8)
+
+        # 2. 读取当前配置的初始值
+        lower, upper = self.cfg.get_color_bounds(color_key)
+        if lower is None:
+            lower = np.array([0, 0, 0])
+            upper = np.array([180, 255, 255])
+            
+        self.init_hsv = (lower, upper)
+
+        # 滑块防抖：连续拖动时只在停顿后重新计算一次
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_DEBOUNCE_MS)
+        self.preview_timer.timeout.connect(self.update_preview)
+
+        # 3. 构建 UI
+        self.init_ui()
+        
+        # 4. 首次渲染
+        self.set_frames([frame])
+
+    def _capture_roi(self):
+        """截取当前配置的 ROI 区域"""
+        frames = capture_burst(self.roi, count=1)
+        return frames[0] if frames else None
+
+    def init_ui(self):
+        main_layout = QVBoxLayout(self)
+
+        # === 顶部：图像预览区 ===
+        preview_layout = QHBoxLayout()
+        
+        # 左侧：原图 (可标注)
+        self.lbl_original = MarkableLabel()
+        self.lbl_original.setToolTip("左键拖动标记目标，右键拖动标记背景，用于自动拟合")
+        self.lbl_original.mark_signal.connect(self.add_mark)
+        self.lbl_original.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.lbl_original.setStyleSheet("border: 1px solid #555; background: #000;")
+        
+        # 右侧：二值图 (Mask)
+        self.lbl_result = QLabel()
+        self.lbl_result.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.lbl_result.setStyleSheet("border: 1px solid #0f0; background: #000;")
+        
+        preview_layout.addWidget(QLabel("原图:"))
+        preview_layout.addWidget(self.lbl_original)
+        preview_layout.addWidget(QLabel("识别结果 (白=选中):"))
+        preview_layout.addWidget(self.lbl_result)
+        
+        main_layout.addLayout(preview_layout)
+
+        # === 样本帧区：加载 + 逐帧覆盖率 ===
+        frames_group = QGroupBox("样本帧")
+        frames_layout = QVBoxLayout()
+
+        src_layout = QHBoxLayout()
+        self.btn_burst = QPushButton(f"📸 连拍采样 ({BURST_FRAMES} 帧)")
+        self.btn_burst.setToolTip("在小游戏进行中点击，连续截取小游戏区域")
+        self.btn_burst.clicked.connect(self.capture_burst_frames)
+        self.btn_load = QPushButton("📂 加载图片/录像")
+        self.btn_load.clicked.connect(self.load_frame_files)
+        src_layout.addWidget(self.btn_burst)
+        src_layout.addWidget(self.btn_load)
+        frames_layout.addLayout(src_layout)
+
+        # 帧切换
+        nav_layout = QHBoxLayout()
+        self.frame_slider = QSlider(Qt.Orientation.Horizontal)
+        self.frame_slider.setRange(0, 0)
+        self.frame_slider.valueChanged.connect(self.show_frame)
+        self.lbl_frame = QLabel("1/1")
+        self.lbl_frame.setFixedWidth(60)
+        nav_layout.addWidget(QLabel("帧:"))
+        nav_layout.addWidget(self.frame_slider)
+        nav_layout.addWidget(self.lbl_frame)
+        frames_layout.addLayout(nav_layout)
+
+        # 覆盖率列表 + 汇总
+        self.lbl_summary = QLabel("")
+        frames_layout.addWidget(self.lbl_summary)
+        self.list_coverage = QListWidget()
+        self.list_coverage.setMaximumHeight(110)
+        self.list_coverage.currentRowChanged.connect(self._on_coverage_row)
+        frames_layout.addWidget(self.list_coverage)
+
+        frames_group.setLayout(frames_layout)
+        main_layout.addWidget(frames_group)
+
+        # === 中部：滑块控制区 ===
+        sliders_group = QGroupBox("HSV 阈值调节")
+        sliders_layout = QVBoxLayout()
+        
+        self.sliders = {}
+        # H: 0-180, S: 0-255, V: 0-255
+        ranges = [('H', 180), ('S', 255), ('V', 255)]
+        
+        # 下限滑块 (Lower)
+        sliders_layout.addWidget(QLabel("--- 下限 (Lower) ---"))
+        for i, (name, max_val) in enumerate(ranges):
+            row = self._create_slider_row(f"{name} Min", 0, max_val, int(self.init_hsv[0][i]))
+            sliders_layout.addLayout(row)
+            self.sliders[f"{name}_min"] = row.itemAt(1).widget()
+
+        # 上限滑块 (Upper)
+        sliders_layout.addWidget(QLabel("--- 上限 (Upper) ---"))
+        for i, (name, max_val) in enumerate(ranges):
+            row = self._create_slider_row(f"{name} Max", 0, max_val, int(self.init_hsv[1][i]))
+            sliders_layout.addLayout(row)
+            self.sliders[f"{name}_max"] = row.itemAt(1).widget()
+
+        sliders_group.setLayout(sliders_layout)
+        main_layout.addWidget(sliders_group)
+
+        # === 底部：按钮区 ===
+        btn_layout = QHBoxLayout()
+        
+        self.btn_save = QPushButton("💾 保存应用")
+        self.btn_save.setMinimumHeight(40)
+        self.btn_save.setStyleSheet("background-color: #28a745; color: white; font-weight: bold;")
+        self.btn_save.clicked.connect(self.save_settings)
+        
+        self.btn_load_labels = QPushButton("📂 加载标注集")
+        self.btn_load_labels.setToolTip("目录内 xxx.png + xxx_mask.png (白=目标, 黑=背景)")
+        self.btn_load_labels.clicked.connect(self.load_labeled_set)
+        self.btn_save_labels = QPushButton("💾 导出标注集")
+        self.btn_save_labels.clicked.connect(self.save_labeled_set)
+        self.btn_clear_marks = QPushButton("🧹 清除标注")
+        self.btn_clear_marks.clicked.connect(self.clear_marks)
+        self.btn_autofit = QPushButton("🤖 自动拟合")
+        self.btn_autofit.setMinimumHeight(40)
+        self.btn_autofit.setToolTip("根据标注的目标/背景像素自动搜索最佳 HSV 阈值\n"
+                                    "注意: H 只支持单个区间 (下限 <= 上限)，跨越 0/180 的红色无法准确拟合")
+        self.btn_autofit.clicked.connect(self.auto_fit)
+
+        btn_layout.addWidget(self.btn_load_labels)
+        btn_layout.addWidget(self.btn_save_labels)
+        btn_layout.addWidget(self.btn_clear_marks)
+        btn_layout.addStretch()
+        btn_layout.addWidget(self.btn_autofit)
+        btn_layout.addWidget(self.btn_save)
+        
+        main_layout.addLayout(btn_layout)
+
+    def _create_slider_row(self, label, min_val, max_val, init_val):
+        layout = QHBoxLayout()
+        lbl_name = QLabel(f"{label}:")
+        lbl_name.setFixedWidth(60)
+        
+        slider = QSlider(Qt.Orientation.Horizontal)
+        slider.setRange(min_val, max_val)
+        slider.setValue(init_val)
+        # 不直接重算，交给防抖定时器
+        slider.valueChanged.connect(self.schedule_preview)
+        
+        lbl_val = QLabel(str(init_val))
+        lbl_val.setFixedWidth(40)
+        slider.valueChanged.connect(lambda v, l=lbl_val: l.setText(str(v)))
+        
+        layout.addWidget(lbl_name)
+        layout.addWidget(slider)
+        layout.addWidget(lbl_val)
+        return layout
+
+    # ================= 样本帧管理 =================
+
+    def set_frames(self, frames):
+        """替换样本帧栈 (HSV 在此一次性转换)"""
+        if not frames:
+            return
+        self.stack = FrameStack(frames)
+        self.current_index = 0
+        self.labels = {}
+
+        self.frame_slider.blockSignals(True)
+        self.frame_slider.setRange(0, self.stack.count - 1)
+        self.frame_slider.setValue(0)
+        self.frame_slider.blockSignals(False)
+
+        self.update_preview()
+
+    @pyqtSlot()
+    def capture_burst_frames(self):
+        """连拍采样当前 ROI (后台线程，完成后回到界面线程更新)"""
+        if not self.roi:
+            if self.window_missing:
+                QMessageBox.warning(self, "警告", "未找到游戏窗口，无法定位【小游戏区域】，请先启动游戏！")
+            else:
+                QMessageBox.warning(self, "警告", "请先配置【小游戏区域】！")
+            return
+        if self.burst_thread is not None and self.burst_thread.isRunning():
+            return
+        self.btn_burst.setEnabled(False)
+        self.burst_thread = BurstCaptureThread(self.roi, self)
+        self.burst_thread.frames_ready.connect(self.on_burst_frames)
+        self.burst_thread.failed.connect(self.on_burst_failed)
+        self.burst_thread.finished.connect(lambda: self.btn_burst.setEnabled(True))
+        self.burst_thread.start()
+
+    @pyqtSlot(list)
+    def on_burst_frames(self, frames):
+        if frames:
+            self.set_frames(frames)
+
+    @pyqtSlot(str)
+    def on_burst_failed(self, message):
+        QMessageBox.warning(self, "警告", f"连拍失败: {message}")
+
+    def closeEvent(self, event):
+        # 连拍最多几秒，等它结束再销毁窗口 (QThread 运行中被销毁会崩溃)
+        if self.burst_thread is not None:
+            self.burst_thread.wait()
+        super().closeEvent(event)
+
+    @pyqtSlot()
+    def load_frame_files(self):
+        """从图片 (可多选) 或录像文件加载样本帧"""
+        paths, _ = QFileDialog.getOpenFileNames(
+            self, "选择样本图片或录像", os.getcwd(),
+            "样本 (*.png *.jpg *.jpeg *.bmp *.mp4 *.avi *.mkv);;所有文件 (*)"
+        )
+        if not paths:
+            return
+        frames = load_frames_from_files(paths)
+        if not frames:
+            QMessageBox.warning(self, "警告", "未能从所选文件中读取任何帧")
+            return
+        self.set_frames(frames)
+
+    # ================= 标注 & 自动拟合 =================
+
+    @pyqtSlot(int, int, int)
+    def add_mark(self, x, y, label):
+        """在当前帧上以画笔半径标记像素"""
+        if self.stack is None:
+            return
+        if not (0 <= x < self.stack.width and 0 <= y < self.stack.height):
+            return
+        marks = self.labels.get(self.current_index)
+        if marks is None:
+            marks = np.zeros((self.stack.height, self.stack.width), dtype=np.uint8)
+            self.labels[self.current_index] = marks
+        cv2.circle(marks, (x, y), MARK_RADIUS, int(label), -1)
+        self._show_original(self.current_index)
+
+    @pyqtSlot()
+    def clear_marks(self):
+        self.labels = {}
+        self.show_frame(self.current_index)
+
+    @pyqtSlot()
+    def load_labeled_set(self):
+        directory = QFileDialog.getExistingDirectory(self, "选择标注集目录", os.getcwd())
+        if not directory:
+            return
+        frames, labels = hsv_fit.load_labeled_set(directory)
+        if not frames:
+            QMessageBox.warning(self, "警告", "目录中没有有效的 xxx.png + xxx_mask.png 标注样本")
+            return
+        self.set_frames(frames)
+        # set_frames 可能统一缩放了尺寸，标注图同步缩放
+        size = (self.stack.width, self.stack.height)
+        self.labels = {
+            i: lab if lab.shape[::-1] == size else cv2.resize(lab, size, interpolation=cv2.INTER_NEAREST)
+            for i, lab in enumerate(labels)
+        }
+        self.show_frame(self.current_index)
+
+    @pyqtSlot()
+    def save_labeled_set(self):
+        if not self.labels:
+            QMessageBox.warning(self, "警告", "当前没有任何标注")
+            return
+        directory = QFileDialog.getExistingDirectory(self, "选择导出目录", os.getcwd())
+        if not directory:
+            return
+        indices = sorted(self.labels)
+        hsv_fit.save_labeled_set(directory,
+                                 [self.stack.frames[i] for i in indices],
+                                 [self.labels[i] for i in indices])
+
+    @pyqtSlot()
+    def auto_fit(self):
+        """对已标注帧做直方图分析 + 网格搜索 (当前进程内，几十毫秒)，结果写回滑块和配置"""
+        if not self.labels:
+            QMessageBox.warning(self, "警告", "请先在原图上标注目标(左键)和背景(右键)，或加载标注集")
+            return
+
+        indices = sorted(self.labels)
+        h = self.stack.height
+        hsv_frames = [self.stack.hsv[i * h:(i + 1) * h] for i in indices]
+        target, background = hsv_fit.collect_pixels(hsv_frames, [self.labels[i] for i in indices])
+        if len(target) == 0:
+            QMessageBox.warning(self, "警告", "没有标注任何目标像素 (左键)")
+            return
+
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            result = hsv_fit.fit_bounds(target, background)
+        finally:
+            QApplication.restoreOverrideCursor()
+
+        for i, name in enumerate(('H', 'S', 'V')):
+            self.sliders[f"{name}_min"].setValue(result["lower"][i])
+            self.sliders[f"{name}_max"].setValue(result["upper"][i])
+        self.cfg.set_color(self.color_key, result["lower"], result["upper"])
+        self.update_preview()
+
+        message = (f"下限: {result['lower']}  上限: {result['upper']}\n"
+                   f"召回率: {result['recall']:.1%}  误报率: {result['false_positive_rate']:.2%}\n"
+                   f"耗时: {result['elapsed']:.2f}s (点击保存应用写入配置文件)")
+        if result["hue_wraps"]:
+            # inRange 只支持单个 H 区间，跨越 0/180 的颜色只能取覆盖两端的宽区间
+            QMessageBox.warning(self, "自动拟合完成 (色相跨越 0/180)",
+                                message + "\n\n目标颜色跨越色相 0/180 (如红色)，单个 H 区间无法准确表示，"
+                                          "误报率可能偏高。建议改用不跨越红色的提示颜色。")
+        else:
+            QMessageBox.information(self, "自动拟合完成", message)
+
+    # ================= 预览 =================
+
+    def _current_bounds(self):
+        lower = np.array([
+            self.sliders['H_min'].value(),
+            self.sliders['S_min'].value(),
+            self.sliders['V_min'].value()
+        ], dtype=np.uint8)
+        upper = np.array([
+            self.sliders['H_max'].value(),
+            self.sliders['S_max'].value(),
+            self.sliders['V_max'].value()
+        ], dtype=np.uint8)
+        return lower, upper
+
+    @pyqtSlot()
+    def schedule_preview(self):
+        """滑块变化时重启防抖定时器"""
+        self.preview_timer.start()
+
+    @pyqtSlot()
+    def update_preview(self):
+        if self.stack is None:
+            return
+        
+        # 1. 对整个帧栈执行一次 inRange (HSV 已缓存)
+        lower, upper = self._current_bounds()
+        self.coverage = self.stack.apply(lower, upper)
+        
+        # 2. 刷新覆盖率统计
+        self._refresh_coverage()
+        
+        # 3. 显示当前帧
+        self.show_frame(self.current_index)
+        
+    def _refresh_coverage(self):
+        cov = self.coverage
+        empty = int(np.count_nonzero(cov == 0))
+        self.lbl_summary.setText(
+            f"共 {len(cov)} 帧 | 覆盖率 最小 {cov.min():.1%} / 平均 {cov.mean():.1%} / 最大 {cov.max():.1%}"
+            f" | 无命中帧: {empty}"
+        )
+
+        self.list_coverage.blockSignals(True)
+        self.list_coverage.clear()
+        self.list_coverage.addItems([f"帧 {i + 1}: {c:.2%}" for i, c in enumerate(cov)])
+        self.list_coverage.setCurrentRow(self.current_index)
+        self.list_coverage.blockSignals(False)
+
+    @pyqtSlot(int)
+    def _on_coverage_row(self, row):
+        if row >= 0:
+            self.frame_slider.setValue(row)
+
+    @pyqtSlot(int)
+    def show_frame(self, index):
+        if self.stack is None or not (0 <= index < self.stack.count):
+            return
+        self.current_index = index
+        self.lbl_frame.setText(f"{index + 1}/{self.stack.count}")
+        self._show_original(index)
+
+        mask = self.stack.frame_mask(index)
+        if mask is None:
+            return
+        # 显示结果 (Mask 是灰度图)
+        mask = np.ascontiguousarray(mask)
+        h, w = mask.shape
+        bytes_per_line = w
+        q_img = QImage(mask.data, w, h, bytes_per_line, QImage.Format.Format_Grayscale8)
+        self.lbl_result.setPixmap(QPixmap.fromImage(q_img.copy()))
+
+    def _show_original(self, index):
+        """显示原图，并叠加标注 (绿=目标, 红=背景)"""
+        img = self.stack.frames[index]
+        marks = self.labels.get(index)
+        if marks is not None:
+            img = img.copy()
+            img[marks == hsv_fit.LABEL_TARGET] = (0, 255, 0)
+            img[marks == hsv_fit.LABEL_BACKGROUND] = (0, 0, 255)
+        self._set_image(self.lbl_original, img)
+
+    def _set_image(self, label, cv_img):
+        """将 OpenCV 图像显示到 Label"""
+        # BGR -> RGB
+        rgb_img = cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
+        h, w, ch = rgb_img.shape
+        bytes_per_line = ch * w
+        q_img = QImage(rgb_img.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
+        label.setPixmap(QPixmap.fromImage(q_img.copy()))
+
+    def save_settings(self):
+        lower = [
+            self.sliders['H_min'].value(),
+            self.sliders['S_min'].value(),
+            self.sliders['V_min'].value()
+        ]
+        upper = [
+            self.sliders['H_max'].value(),
+            self.sliders['S_max'].value(),
+            self.sliders['V_max'].value()
+        ]
+        
+        self.cfg.set_color(self.color_key, lower, upper)
+        self.cfg.save_config()
+        QMessageBox.information(self, "成功", f"颜色 [{self.color_key}] 配置已保存！")
+        self.close()
@@ -1,32 +1,34 @@
-import sys
-import traceback
-from PyQt6.QtWidgets import QApplication
-
-# 确保能找到包
-sys.path.append(".")
-
-from gui.main_window import MainWindow
-
-def main():
-    # 高分屏适配 (High DPI Scaling)
-    try:
-        from PyQt6.QtCore import Qt
-        QApplication.setHighDpiScaleFactorRoundingPolicy(Qt.HighDpiScaleFactorRoundingPolicy.PassThrough)
-    except Exception:
-        pass
-
-    app = QApplication(sys.argv)
-    
-    try:
-        window = MainWindow()
-        window.show()
-        sys.exit(app.exec())
-        
-    except Exception as e:
-        # 严重错误捕获，防止直接闪退看不到报错
-        print("❌ 致命错误:")
-        traceback.print_exc()
-        input("按 Enter 键退出...")
-
-if __name__ == "__main__":
+import sys
+import traceback
+from PyQt6.QtWidgets import QApplication, QMessageBox
+
+# 确保能找到包
+sys.path.append(".")
+
+from gui.main_window import MainWindow
+
+def main():
+    # 高分屏适配 (High DPI Scaling)
+    try:
+        from PyQt6.QtCore import Qt
+        QApplication.setHighDpiScaleFactorRoundingPolicy(Qt.HighDpiScaleFactorRoundingPolicy.PassThrough)
+    except Exception:
+        pass
+
+    app = QApplication(sys.argv)
+    
+    try:
+        window = MainWindow()
+        window.show()
+        sys.exit(app.exec())
+        
+    except Exception as e:
+        # 严重错误捕获，防止直接闪退看不到报错
+        print("❌ 致命错误:")
+        traceback.print_exc()
+        # 例如 settings.json 无效：没有控制台窗口时也要让用户看到原因
+        QMessageBox.critical(None, "致命错误", str(e))
+        input("按 Enter 键退出...")
+
+if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,78 +1,427 @@
-import json
-import os
-import numpy as np
-
-class ConfigManager:
-    def __init__(self, config_path="config/settings.json"):
-        self.config_path = config_path
-        self.config = {}
-        self.load_config()
-
-    def load_config(self):
-        """加载配置文件"""
-        if not os.path.exists(self.config_path):
-            raise FileNotFoundError(f"配置文件未找到: {self.config_path}")
-        
-        try:
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                self.config = json.load(f)
-        except json.JSONDecodeError as e:
-            print(f"配置文件格式错误: {e}")
-            self.config = {}
-
-    def save_config(self):
-        """保存当前配置到文件"""
-        try:
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=4)
-            print("配置已保存")
-        except Exception as e:
-            print(f"保存配置失败: {e}")
-
-    def get(self, section, key=None, default=None):
-        """
-        获取配置项
-        :param section: 一级键 (e.g., 'game_params')
-        :param key: 二级键 (e.g., 'cast_duration'), 如果为None则返回整个section
-        :param default: 默认值
-        """
-        sec_data = self.config.get(section, {})
-        if key is None:
-            return sec_data
-        return sec_data.get(key, default)
-
-    def set(self, section, key, value):
-        """更新配置项"""
-        if section not in self.config:
-            self.config[section] = {}
-        self.config[section][key] = value
-
-    def get_color_bounds(self, color_name):
-        """
-        获取颜色的HSV阈值，并自动转换为 numpy array
-        :param color_name: e.g., 'yellow' -> 读取 'yellow_lower' 和 'yellow_upper'
-        :return: (lower_np, upper_np)
-        """
-        colors = self.config.get('colors', {})
-        lower = colors.get(f"{color_name}_lower")
-        upper = colors.get(f"{color_name}_upper")
-        
-        if lower and upper:
-            return (
-                np.array(lower, dtype=np.uint8),
-                np.array(upper, dtype=np.uint8)
-            )
-        return None, None
-
-    def set_color(self, color_name, lower, upper):
-        """
-        更新颜色阈值
-        :param color_name: 'yellow' or 'cursor'
-        :param lower: list [h, s, v]
-        :param upper: list [h, s, v]
-        """
-        if 'colors' not in self.config:
-            self.config['colors'] = {}
-            
-        self.config['colors'][f"{color_name}_lower"] = lower
-        self.config['colors'][f"{color_name}_upper"] = upper
\ No newline at end of file
+import copy
+import json
+import os
+import threading
+import time
+
+# 热重载时检查文件 mtime 的最小间隔 (秒)，避免热路径上每次都 stat 文件
+RELOAD_CHECK_INTERVAL = 0.5
+
+# 数值参数的默认值与合法范围: key -> (默认值, 最小值, 最大值)
+GAME_PARAM_SPEC = {
+    "cast_duration": (0.5, 0.0, 10.0),
+    "hit_cooldown": (0.02, 0.0, 5.0),
+    "cursor_timeout": (1.0, 0.0, 30.0),
+    "confidence_common": (0.8, 0.0, 1.0),
+    "confidence_text": (0.7, 0.0, 1.0),
+    "minigame_poll_interval": (0.0, 0.0, 0.1),
+}
+HUMANIZATION_SPEC = {
+    "click_offset_pixels": (5, 0, 100),
+    "reaction_delay_min": (0.05, 0.0, 5.0),
+    "reaction_delay_max": (0.15, 0.0, 5.0),
+    "cast_variance": (0.1, 0.0, 1.0),
+}
+MULTI_CLIENT_SPEC = {
+    "max_clients": (4, 1, 16),
+    "qte_idle_poll_interval": (0.05, 0.0, 1.0),
+    "focus_settle": (0.05, 0.0, 1.0),
+}
+
+
+class Settings:
+    """
+    配置快照 (只读)
+    由 ConfigManager 把 JSON 编译而来：数值已校验、ROI 已转为 int 元组、
+    颜色阈值已校验，第一次取用时转换为 numpy 数组并缓存 (numpy 导入较慢，不拖慢界面启动)。
+    热路径直接读属性，不再做字典查找。
+    配置变化时整体替换快照，而不是原地修改。
+    """
+    __slots__ = (
+        "window_title", "backend", "rois", "roi_space", "colors", "images",
+        "ui_scale", "base_resolution", "probe_workers", "cv_threads", "template_crop",
+        "roi_learning",
+        "cast_duration", "hit_cooldown", "cursor_timeout",
+        "confidence_common", "confidence_text", "minigame_poll_interval",
+        "enable_random_delay", "click_offset_pixels",
+        "reaction_delay_min", "reaction_delay_max", "cast_variance", "minigame_band",
+        "multi_client", "max_clients", "qte_idle_poll_interval", "focus_settle",
+        "metrics_enabled", "metrics_host", "metrics_port", "metrics_token",
+        "version", "_color_arrays",
+    )
+
+    def __init__(self, config, version=0):
+        put = lambda name, value: object.__setattr__(self, name, value)
+
+        put("version", version)
+        put("window_title", str(config.get("window_title") or "BrownDust II"))
+        backend = config.get("backend") or "auto"
+        if backend not in ("auto", "win32", "x11", "null"):
+            raise ValueError(f"未知的输入/窗口后端: {backend}")
+        put("backend", backend)
+
+        # ROI: name -> (x, y, w, h)
+        rois = {}
+        for name, roi in (config.get("rois") or {}).items():
+            if roi is None:
+                continue
+            if len(roi) != 4 or int(roi[2]) <= 0 or int(roi[3]) <= 0:
+                raise ValueError(f"ROI [{name}] 格式错误: {roi}")
+            rois[name] = tuple(int(v) for v in roi)
+        put("rois", rois)
+
+        # ROI 坐标系：screen = 屏幕绝对坐标 (旧配置)，client = 相对游戏客户区左上角
+        roi_space = config.get("roi_space") or "screen"
+        if roi_space not in ("screen", "client"):
+            raise ValueError(f"未知的 ROI 坐标系: {roi_space}")
+        put("roi_space", roi_space)
+
+        # 颜色: name -> ((h, s, v), (h, s, v))，numpy 数组在 color_bounds 中按需生成
+        colors = {}
+        color_cfg = config.get("colors") or {}
+        for key in color_cfg:
+            if not key.endswith("_lower"):
+                continue
+            name = key[:-len("_lower")]
+            lower = color_cfg.get(f"{name}_lower")
+            upper = color_cfg.get(f"{name}_upper")
+            if not lower or not upper:
+                continue
+            bounds = []
+            for values in (lower, upper):
+                if len(values) != 3 or any(not 0 <= int(v) <= 255 for v in values):
+                    raise ValueError(f"颜色 [{name}] 阈值错误: {values}")
+                bounds.append(tuple(int(v) for v in values))
+            colors[name] = tuple(bounds)
+        put("colors", colors)
+        put("_color_arrays", {})
+
+        put("images", dict(config.get("images") or {}))
+
+        # 模板制作时的分辨率 (2K) 与 UI 缩放 (None = 自动识别)
+        vision = config.get("vision") or {}
+        base = vision.get("base_resolution") or [2560, 1440]
+        if len(base) != 2 or min(base) <= 0:
+            raise ValueError(f"base_resolution 格式错误: {base}")
+        put("base_resolution", (int(base[0]), int(base[1])))
+        ui_scale = vision.get("ui_scale")
+        if ui_scale is not None:
+            ui_scale = self._number(vision, "ui_scale", (1.0, 0.25, 4.0))
+        put("ui_scale", ui_scale)
+
+        # 状态检测线程数 / OpenCV 内部线程数 (0 = 自动)
+        put("probe_workers", self._number(vision, "probe_workers", (0, 0, 16)))
+        put("cv_threads", self._number(vision, "cv_threads", (0, 0, 64)))
+
+        # 模板裁剪到核心区域 (去掉平坦的背景边缘)
+        put("template_crop", bool(vision.get("template_crop", True)))
+
+        # 匹配位置统计与 ROI 收紧：off / suggest (只给建议) / apply (自动写入 rois)
+        roi_learning = vision.get("roi_learning") or "suggest"
+        if roi_learning not in ("off", "suggest", "apply"):
+            raise ValueError(f"未知的 roi_learning 模式: {roi_learning}")
+        put("roi_learning", roi_learning)
+
+        game = config.get("game_params") or {}
+        for key, spec in GAME_PARAM_SPEC.items():
+            put(key, self._number(game, key, spec))
+        put("minigame_band", bool(game.get("minigame_band", True)))
+
+        human = config.get("humanization") or {}
+        put("enable_random_delay", bool(human.get("enable_random_delay", True)))
+        for key, spec in HUMANIZATION_SPEC.items():
+            put(key, self._number(human, key, spec))
+        if self.reaction_delay_min > self.reaction_delay_max:
+            raise ValueError("reaction_delay_min 不能大于 reaction_delay_max")
+
+        # 多窗口 (多开) 调度
+        multi = config.get("multi_client") or {}
+        put("multi_client", bool(multi.get("enabled", False)))
+        for key, spec in MULTI_CLIENT_SPEC.items():
+            put(key, self._number(multi, key, spec))
+
+        # 本地指标端点 (Prometheus 文本格式)
+        metrics = config.get("metrics") or {}
+        put("metrics_enabled", bool(metrics.get("enabled", False)))
+        put("metrics_host", str(metrics.get("host") or "127.0.0.1"))
+        put("metrics_port", self._number(metrics, "port", (9101, 0, 65535)))
+        # 远程启停口令 (空 = 不接受远程命令)
+        put("metrics_token", str(metrics.get("token") or ""))
+
+    @staticmethod
+    def _number(section, key, spec):
+        default, lo, hi = spec
+        value = section.get(key, default)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"参数 [{key}] 必须是数字: {value!r}")
+        if isinstance(default, int) and value != int(value):
+            raise ValueError(f"参数 [{key}] 必须是整数: {value!r}")
+        if not lo <= value <= hi:
+            raise ValueError(f"参数 [{key}] 超出范围 [{lo}, {hi}]: {value}")
+        return type(default)(value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Settings 是只读快照，请通过 ConfigManager.set 修改")
+
+    def roi(self, name):
+        """获取 ROI 元组，未配置返回 None"""
+        return self.rois.get(name)
+
+    def color_bounds(self, color_name):
+        """获取颜色阈值 (lower_np, upper_np，只读 uint8 数组，同一快照内复用)，未配置返回 (None, None)"""
+        arrays = self._color_arrays.get(color_name)
+        if arrays is None:
+            bounds = self.colors.get(color_name)
+            if bounds is None:
+                return (None, None)
+            import numpy as np
+            arrays = []
+            for values in bounds:
+                arr = np.array(values, dtype=np.uint8)
+                arr.flags.writeable = False
+                arrays.append(arr)
+            arrays = tuple(arrays)
+            self._color_arrays[color_name] = arrays
+        return arrays
+
+
+def _update_rois(config, rois):
+    """把 {名称: ROI 或 None} 合并进 config["rois"] (None = 删除)"""
+    target = config.setdefault("rois", {})
+    for name, roi in rois.items():
+        if roi is None:
+            target.pop(name, None)
+        else:
+            target[name] = [int(v) for v in roi]
+
+
+class ConfigManager:
+    def __init__(self, config_path="config/settings.json"):
+        self.config_path = config_path
+        self.config = {}
+        self._settings = None
+        self._version = 0
+        self._mtime = None
+        self._next_check = 0.0
+        self._dirty = False # 有通过 set* 修改、尚未保存到文件的内容
+        self._lock = threading.Lock()
+        self.load_config()
+
+    def load_config(self):
+        """
+        加载配置文件
+        :raises FileNotFoundError: 文件不存在
+        :raises ValueError: 首次加载时文件格式错误或校验失败 (不会带着空配置继续运行)
+        """
+        if not os.path.exists(self.config_path):
+            raise FileNotFoundError(f"配置文件未找到: {self.config_path}")
+        with self._lock:
+            self._load()
+        
+    def _load(self):
+        """
+        读取并校验文件，通过后一起替换字典、快照和 mtime (调用方持有 self._lock)
+        热重载时文件写了一半 / 写错了：保留上一份有效配置，被拒绝的内容不会进入内存
+        :return: 是否加载了新配置
+        """
+        mtime = None
+        try:
+            mtime = os.path.getmtime(self.config_path)
+            with open(self.config_path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+            if not isinstance(config, dict):
+                raise ValueError("顶层必须是 JSON 对象")
+            settings = Settings(config, self._version + 1)
+        except (OSError, ValueError, TypeError) as e:
+            if self._settings is None:
+                raise ValueError(f"配置文件无效 ({self.config_path}): {e}") from e
+            print(f"配置文件无效，沿用上一份配置: {e}")
+            if mtime is not None:
+                self._mtime = mtime # 同一次修改只提示一次
+            return False
+        self.config = config
+        self._mtime = mtime
+        self._version = settings.version
+        # 单次引用赋值：读线程要么看到旧快照，要么看到新快照
+        self._settings = settings
+        self._dirty = False
+        return True
+
+    def _edit(self, change):
+        """
+        在配置字典的副本上执行 change(config)，校验通过后整体替换字典与快照
+        校验失败时原配置保持不变，并抛出 ValueError (被拒绝的值不会留在内存中，也不会被保存)
+        :return: change 的返回值
+        """
+        with self._lock:
+            config = copy.deepcopy(self.config)
+            result = change(config)
+            try:
+                settings = Settings(config, self._version + 1)
+            except (ValueError, TypeError) as e:
+                print(f"配置校验失败，修改未生效: {e}")
+                raise ValueError(str(e)) from e
+            self.config = config
+            self._version = settings.version
+            self._settings = settings
+            self._dirty = True
+        return result
+
+    @property
+    def settings(self):
+        """
+        当前配置快照
+        每隔 RELOAD_CHECK_INTERVAL 秒检查一次文件 mtime，
+        settings.json 被外部修改时自动重新加载
+        """
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + RELOAD_CHECK_INTERVAL
+            self._check_reload()
+        return self._settings
+
+    def _check_reload(self):
+        with self._lock:
+            try:
+                mtime = os.path.getmtime(self.config_path)
+            except OSError:
+                return
+            if mtime == self._mtime:
+                return
+            if self._dirty:
+                # 重新加载会丢掉界面中尚未保存的修改：跳过本次变化 (只提示一次)，保存时以内存中的配置为准
+                self._mtime = mtime
+                print("检测到配置文件变化，但有未保存的修改，跳过热重载 (保存时将覆盖文件)")
+                return
+            print("检测到配置文件变化，重新加载")
+            self._load()
+
+    def save_config(self):
+        """保存当前配置到文件 (内存中的配置已通过校验)"""
+        with self._lock:
+            try:
+                with open(self.config_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.config, f, indent=4)
+                # 自己写入的文件不需要再触发热重载
+                self._mtime = os.path.getmtime(self.config_path)
+                self._dirty = False
+                print("配置已保存")
+            except (OSError, TypeError, ValueError) as e:
+                print(f"保存配置失败: {e}")
+
+    def save_rois(self, rois):
+        """
+        更新若干 ROI，并只把这些 ROI 写入文件 (可在工作线程中调用，例如 ROI 自学习)
+        文件中的其余内容保持磁盘上的版本，界面中尚未保存的其他修改仍只留在内存中，不会被一并写入
+        :param rois: {名称: [x, y, w, h] 或 None (删除该项，恢复为未配置)}
+        :return: 是否写入了文件 (内存与文件的 ROI 坐标系不一致时只更新内存)
+        :raises ValueError: ROI 不合法，配置不变
+        """
+        with self._lock:
+            config = copy.deepcopy(self.config)
+            _update_rois(config, rois)
+            try:
+                settings = Settings(config, self._version + 1)
+            except (ValueError, TypeError) as e:
+                print(f"配置校验失败，修改未生效: {e}")
+                raise ValueError(str(e)) from e
+
+            written = False
+            pending = True # 文件中是否有尚未热重载的外部修改
+            try:
+                pending = os.path.getmtime(self.config_path) != self._mtime
+                with open(self.config_path, 'r', encoding='utf-8') as f:
+                    on_disk = json.load(f)
+                if on_disk.get("roi_space", "screen") == config.get("roi_space", "screen"):
+                    _update_rois(on_disk, rois)
+                    with open(self.config_path, 'w', encoding='utf-8') as f:
+                        json.dump(on_disk, f, indent=4)
+                    written = True
+                else:
+                    print("ROI 坐标系与 settings.json 不一致 (有未保存的 ROI 修改)，ROI 只更新到内存")
+            except (OSError, ValueError) as e:
+                print(f"保存 ROI 失败，只更新到内存: {e}")
+
+            self.config = config
+            self._version = settings.version
+            self._settings = settings
+            if not written:
+                self._dirty = True
+            elif not pending:
+                # 文件在写入前与内存一致：自己写入的文件不需要再触发热重载
+                self._mtime = os.path.getmtime(self.config_path)
+            elif not self._dirty:
+                # 写入前文件已被外部修改：重新加载，外部修改与新 ROI 一起生效
+                self._load()
+            # 其余情况 (有未保存的修改) 保持 _mtime 不变，由 _check_reload 按未保存修改的规则处理
+        return written
+
+    def get(self, section, key=None, default=None):
+        """
+        获取配置项
+        :param section: 一级键 (e.g., 'game_params')
+        :param key: 二级键 (e.g., 'cast_duration'), 如果为None则返回整个section
+        :param default: 默认值
+        """
+        sec_data = self.config.get(section, {})
+        if key is None:
+            return sec_data
+        return sec_data.get(key, default)
+
+    def set(self, section, key, value):
+        """更新配置项 (值不合法时抛出 ValueError，配置不变)"""
+        def change(config):
+            config.setdefault(section, {})[key] = value
+        self._edit(change)
+
+    def set_roi(self, name, roi, client_origin=None):
+        """
+        保存一个在屏幕上框选的 ROI
+        已知游戏客户区位置时按窗口相对坐标保存；旧的屏幕坐标配置会在此时整体迁移
+        :param roi: 屏幕坐标 [x, y, w, h]
+        :param client_origin: 游戏客户区左上角的屏幕坐标，未找到窗口时为 None
+        :return: 实际保存的坐标；无法换算时返回 None
+        :raises ValueError: ROI 不合法 (宽高 <= 0)，配置不变
+        """
+        space = self.config.get("roi_space", "screen")
+        if client_origin is None and space == "client":
+            return None # 已是窗口相对坐标，但找不到窗口无法换算
+
+        def change(config):
+            rois = config.setdefault("rois", {})
+            if client_origin is None:
+                rois[name] = list(roi)
+                return rois[name]
+            ox, oy = client_origin
+            if space == "screen":
+                # 首次拿到窗口位置：把已有的屏幕坐标 ROI 一并换算
+                for key, r in rois.items():
+                    if r:
+                        rois[key] = [r[0] - ox, r[1] - oy, r[2], r[3]]
+                config["roi_space"] = "client"
+            rois[name] = [roi[0] - ox, roi[1] - oy, roi[2], roi[3]]
+            return rois[name]
+        return self._edit(change)
+
+    def get_color_bounds(self, color_name):
+        """
+        获取颜色的HSV阈值 (预编译的只读 numpy array)
+        :param color_name: e.g., 'yellow' -> 读取 'yellow_lower' 和 'yellow_upper'
+        :return: (lower_np, upper_np)
+        """
+        return self.settings.color_bounds(color_name)
+
+    def set_color(self, color_name, lower, upper):
+        """
+        更新颜色阈值
+        :param color_name: 'yellow' or 'cursor'
+        :param lower: list [h, s, v]
+        :param upper: list [h, s, v]
+        :raises ValueError: 阈值不合法，配置不变
+        """
+        def change(config):
+            colors = config.setdefault('colors', {})
+            colors[f"{color_name}_lower"] = lower
+            colors[f"{color_name}_upper"] = upper
+        self._edit(change)
+            
\ No newline at end of file